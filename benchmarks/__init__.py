@@ -0,0 +1,4 @@
+"""
+Benchmarks of bla on scalable families of models (see `benchmarks.models`).
+Changes to the proofer should come with numbers of `python -m benchmarks.run`.
+"""
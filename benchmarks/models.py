@@ -0,0 +1,204 @@
+"""
+Scalable families of models.
+
+Every family generates the source of a model with `n` as its size parameter.
+Programs are parsed from their source (see `bla.parse`), so models are written
+to a module file and imported, as if they were written by hand.
+"""
+from dataclasses import dataclass, field
+from types import ModuleType
+from typing import Any, Callable
+import atexit
+import importlib.util
+import os
+import shutil
+import tempfile
+
+
+@dataclass
+class Model:
+    progs: list[Callable]
+    domain: dict[str, Any]
+    ok: bool  # expected verdict
+    options: dict[str, Any] = field(default_factory=dict)  # of `proof`
+
+
+def _load(name: str, src: str) -> ModuleType:
+    directory = tempfile.mkdtemp(prefix="bla-bench-")
+    atexit.register(shutil.rmtree, directory, ignore_errors=True)
+    path = os.path.join(directory, f"{name}.py")
+    with open(path, "w") as f:
+        f.write(src)
+    spec = importlib.util.spec_from_file_location(name, path)
+    assert spec is not None and spec.loader is not None
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def _indent(lines: list[str], n: int = 1) -> str:
+    return "\n".join("    " * n + ln for ln in lines)
+
+
+def filter_lock(n: int) -> Model:
+    """Peterson's filter lock of `n` processes"""
+    progs = []
+    for i in range(n):
+        others = [k for k in range(n) if k != i]
+        body = []
+        for lvl in range(1, n):
+            higher = " or ".join(f"level_{k} >= {lvl}" for k in others)
+            body += [
+                f"level_{i} = {lvl}",
+                f"victim_{lvl} = {i}",
+                f"while ({higher}) and victim_{lvl} == {i}:",
+                "    pass",
+            ]
+        body += [
+            "assert not cs_used",
+            "cs_used = True",
+            "cs_used = False",
+            f"level_{i} = 0",
+        ]
+        progs.append(f"def p{i}():\n{_indent(body)}\n")
+    mod = _load(f"filter_lock_{n}", "\n\n".join(progs))
+    domain: dict[str, Any] = {f"level_{i}": range(n) for i in range(n)}
+    domain |= {f"victim_{lvl}": range(n) for lvl in range(1, n)}
+    domain["cs_used"] = False
+    return Model([getattr(mod, f"p{i}") for i in range(n)], domain, ok=True)
+
+
+def bakery(n: int) -> Model:
+    """Lamport's bakery of `n` processes, each enters once, tickets are bounded"""
+    progs = []
+    for i in range(n):
+        others = [k for k in range(n) if k != i]
+        # Tickets of others are read one by one
+        body = [f"choosing_{i} = True", f"max_{i} = 0"]
+        for k in others:
+            body.append(f"max_{i} = number_{k} if number_{k} > max_{i} else max_{i}")
+        body += [f"number_{i} = 1 + max_{i}", f"choosing_{i} = False"]
+        for k in others:
+            body += [
+                f"while choosing_{k}:",
+                "    pass",
+                f"while number_{k} != 0 and (number_{k}, {k}) < (number_{i}, {i}):",
+                "    pass",
+            ]
+        body += [
+            "assert not cs_used",
+            "cs_used = True",
+            "cs_used = False",
+            f"number_{i} = 0",
+        ]
+        progs.append(f"def p{i}():\n{_indent(body)}\n")
+    mod = _load(f"bakery_{n}", "\n\n".join(progs))
+    domain: dict[str, Any] = {f"choosing_{i}": False for i in range(n)}
+    domain |= {f"number_{i}": range(n + 1) for i in range(n)}
+    domain |= {f"max_{i}": range(n + 1) for i in range(n)}
+    domain["cs_used"] = False
+    return Model([getattr(mod, f"p{i}") for i in range(n)], domain, ok=True)
+
+
+def die_hard(n: int) -> Model:
+    """
+    Jugs of `2n + 1` and `3n + 2` gallons, `examples/die_hard_3.py` if `n == 1`.
+    Capacities are coprime, so every amount is reachable. Checks that after
+    every move one of the jugs is empty or full.
+    """
+    s, l = 2 * n + 1, 3 * n + 2
+    src = f"""
+def fill_small():
+    while True:
+        small = {s}
+
+
+def fill_large():
+    while True:
+        large = {l}
+
+
+def empty_small():
+    while True:
+        small = 0
+
+
+def empty_large():
+    while True:
+        large = 0
+
+
+def small_to_large():
+    while True:
+        small, large = (
+            (0, small + large) if small + large <= {l} else (small + large - {l}, {l})
+        )
+
+
+def large_to_small():
+    while True:
+        small, large = (
+            (small + large, 0) if small + large <= {s} else ({s}, small + large - {s})
+        )
+
+
+def check():
+    while True:
+        assert small == 0 or small == {s} or large == 0 or large == {l}
+"""
+    mod = _load(f"die_hard_{n}", src)
+    names = [
+        "fill_small",
+        "fill_large",
+        "empty_small",
+        "empty_large",
+        "small_to_large",
+        "large_to_small",
+        "check",
+    ]
+    domain = dict(small=range(s + 1), large=range(l + 1))
+    return Model([getattr(mod, name) for name in names], domain, ok=True)
+
+
+def store(n: int) -> Model:
+    """
+    Eventually consistent store of `n` replicas, see `examples/inconsistency.py`.
+    A writer bumps the version on the primary, replicas catch up with it,
+    readers check that replicas never run ahead of the primary.
+    """
+    versions = 3
+    progs = [
+        "def writer():\n"
+        + _indent([f"primary = {v}" for v in range(1, versions)])
+        + "\n"
+    ]
+    for i in range(n):
+        progs.append(
+            f"def replica_{i}():\n"
+            + _indent(
+                [
+                    "while True:",
+                    f"    if primary > replica_{i}:",
+                    f"        replica_{i} = primary",
+                ]
+            )
+            + "\n"
+        )
+        progs.append(
+            f"def reader_{i}():\n"
+            + _indent(["while True:", f"    assert replica_{i} <= primary"])
+            + "\n"
+        )
+    mod = _load(f"store_{n}", "\n\n".join(progs))
+    names = ["writer"] + [f"{r}_{i}" for i in range(n) for r in ("replica", "reader")]
+    domain: dict[str, Any] = {"primary": range(versions)}
+    domain |= {f"replica_{i}": range(versions) for i in range(n)}
+    return Model([getattr(mod, name) for name in names], domain, ok=True)
+
+
+FAMILIES: dict[str, Callable[[int], Model]] = {
+    "filter_lock": filter_lock,
+    "bakery": bakery,
+    "die_hard": die_hard,
+    "store": store,
+}
@@ -0,0 +1,200 @@
+"""
+Runs the benchmark suite and compares results to the baseline.
+
+    python -m benchmarks.run [--only SUBSTR] [--tolerance 0.25] [--update]
+
+Every case runs in its own process, so peak RSS is the one of the case.
+Exits with 1 if a case got slower or bigger than `--tolerance` allows, explored
+a different number of states or got an unexpected verdict.
+
+Rates are relative to the speed of the machine: the baseline keeps the rate of
+a calibration loop (see `calibrate`) on the machine it was recorded on, and
+rates measured elsewhere are scaled by the ratio of calibration rates, when
+compared and when stored, so the baseline holds on other machines too.
+"""
+from dataclasses import dataclass, asdict
+from typing import Any
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+
+from benchmarks.models import FAMILIES
+
+# (family, size), about 10s in total
+SUITE = [
+    ("filter_lock", 3),
+    ("filter_lock", 4),
+    ("bakery", 3),
+    ("bakery", 4),
+    ("die_hard", 4),
+    ("die_hard", 16),
+    ("store", 2),
+    ("store", 3),
+]
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+@dataclass
+class Measurement:
+    ok: bool
+    states: int  # unique states
+    rate: float  # expanded states per second
+    peak_rss: int  # bytes
+    parse: float  # seconds
+    wall: float  # seconds of `proof`, parsing included
+
+
+def calibrate(n: int = 200_000, repeat: int = 5) -> float:
+    """
+    Iterations per second of a loop of what exploration mostly does: tuple
+    arithmetic, hashing and dict insertions. Best of `repeat`.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        seen: dict[int, int] = {}
+        m = (0, 1, 2, 3)
+        for i in range(n):
+            m = m[1:] + (i,)
+            seen[hash(m)] = i
+        best = min(best, time.perf_counter() - start)
+    return n / best
+
+
+def measure(family: str, n: int) -> Measurement:
+    from bla import proof
+    from bla.memory import make_mem_map
+    from bla.parse import parse_program
+    from bla.progress import Stats
+
+    model = FAMILIES[family](n)
+
+    start = time.perf_counter()
+    mm = make_mem_map(model.domain)
+    for fn in model.progs:
+        parse_program(fn, mm)
+    parse = time.perf_counter() - start
+
+    stats: list[Stats] = []
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        ok = proof(model.progs, model.domain, observer=stats.append, **model.options)
+    wall = time.perf_counter() - start
+    assert ok == model.ok, f"Expected {'OK' if model.ok else 'FAIL'}, got {ok}"
+
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024  # KiB
+    return Measurement(ok, stats[-1].unique, stats[-1].rate, peak_rss, parse, wall)
+
+
+def run_case(case: str) -> Any:
+    """Result of `--case CASE` run in its own process"""
+    res = subprocess.run(
+        [sys.executable, "-m", "benchmarks.run", "--case", case],
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    if res.returncode:
+        raise Exception(f"{case} failed:\n{res.stdout}{res.stderr}")
+    return json.loads(res.stdout)
+
+
+def compare(
+    got: Measurement, base: Measurement, speed: float, tolerance: float
+) -> list[str]:
+    """`speed`: of this machine relative to the baseline's, see `calibrate`"""
+    problems = []
+    if got.states != base.states:
+        problems.append(f"states {base.states:,} -> {got.states:,}")
+    expected = base.rate * speed
+    if got.rate < expected * (1 - tolerance):
+        problems.append(f"slower {expected:,.0f} -> {got.rate:,.0f} states/s")
+    if got.peak_rss > base.peak_rss * (1 + tolerance):
+        problems.append(
+            f"bigger {base.peak_rss / 2**20:,.1f} -> {got.peak_rss / 2**20:,.1f} MiB"
+        )
+    return problems
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run")
+    parser.add_argument("--only", help="run cases containing the substring")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--update", action="store_true", help="update the baseline")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="allowed relative loss of speed or memory (default 0.25)",
+    )
+    # FAMILY:N or "calibration", internal
+    parser.add_argument("--case", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.case == "calibration":
+        print(json.dumps(calibrate()))
+        return 0
+    if args.case:
+        family, n = args.case.split(":")
+        print(json.dumps(asdict(measure(family, int(n)))))
+        return 0
+
+    try:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        baseline = {"results": {}}
+    cases = [f"{family}:{n}" for family, n in SUITE]
+    if args.only:
+        cases = [c for c in cases if args.only in c]
+
+    # In its own process too, the peak RSS of a process is inherited by the
+    # processes it starts
+    calibration = run_case("calibration")
+    # Rates of the baseline are of a machine of this calibration, a new
+    # baseline is of this machine
+    speed = calibration / baseline.setdefault("calibration", calibration)
+    print(f"Calibration: {calibration:,.0f} loops/s, {speed:.2f}x the baseline")
+
+    ok = True
+    print(
+        f"{'case':16} {'states':>10} {'states/s':>10} {'RSS MiB':>8} "
+        f"{'parse s':>8} {'wall s':>8}"
+    )
+    for case in cases:
+        got = Measurement(**run_case(case))
+        print(
+            f"{case:16} {got.states:>10,} {got.rate:>10,.0f} "
+            f"{got.peak_rss / 2**20:>8.1f} {got.parse:>8.3f} {got.wall:>8.2f}",
+            end="",
+        )
+        base = baseline["results"].get(case)
+        problems = (
+            compare(got, Measurement(**base), speed, args.tolerance)
+            if base
+            else ["new"]
+        )
+        print("" if not problems else f"  {'; '.join(problems)}")
+        if base and problems:
+            ok = False
+        baseline["results"][case] = asdict(got) | {"rate": got.rate / speed}
+
+    if args.update:
+        baseline["machine"] = f"{platform.machine()} {platform.processor()}".strip()
+        baseline["python"] = platform.python_version()
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+        return 0
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
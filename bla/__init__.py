@@ -1 +1,6 @@
-from bla.ux import proof, ShortStacktrace
+from bla.ux import proof, check_domains, ShortStacktrace
+from bla.symmetry import Symmetry
+from bla.liveness import HALTS_ASSERT, Eventually
+from bla.progress import StderrProgress, JsonLines
+from bla.template import instances, array
+from bla.explore import Limits, exploration, explore_async
@@ -0,0 +1,5 @@
+import sys
+
+from bla.batch import main
+
+sys.exit(main())
@@ -0,0 +1,229 @@
+"""
+Batch runner of model scripts:
+
+    python -m bla [PATH...] [-j N] [--timeout S] [--max-states N]
+                  [--golden DIR [--update]] [--junit FILE] [--json FILE]
+
+Model scripts (e.g. `examples/*.py`, directories are searched for `*.py`) call
+`proof` when run. They run in a pool of warm worker processes, bla and its
+dependencies are imported once per worker rather than once per model, and
+results are printed as models finish. Output of a model (stdout, then stderr)
+is compared to `DIR/<name>.out` if `--golden` is given, as
+`tests/golden/run_tests.py` does.
+
+A model fails if any of its proofs fails (see `bla.ux.verdicts`). With
+`--golden` the output decides instead: expected outputs record expected
+failures, and a changed verdict changes the output.
+
+A model that runs longer than `--timeout` seconds or explores more than
+`--max-states` unique states (see `bla.progress.StateBudget`) is stopped. The
+vectorized engine checks the budget between BFS levels; proofs with `workers`
+aren't observed, they are rejected.
+Exits with 1 unless all models passed.
+"""
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, asdict, field
+from typing import Any
+from xml.etree import ElementTree as ET
+import argparse
+import contextlib
+import difflib
+import glob
+import io
+import json
+import multiprocessing as mp
+import os
+import runpy
+import signal
+import sys
+import time
+
+from bla.progress import BudgetExceeded
+
+PASS, FAIL, ERROR, TIMEOUT, BUDGET = "pass", "fail", "error", "timeout", "budget"
+
+
+@dataclass
+class Result:
+    name: str
+    path: str
+    status: str
+    seconds: float
+    output: str
+    message: str = ""  # diff of the output, error, ...
+    verdicts: list[bool] = field(default_factory=list)  # of proofs, in order
+
+
+class _Timeout(Exception):
+    pass
+
+
+def _alarm(signum: int, frame: Any) -> None:
+    raise _Timeout()
+
+
+def _warm() -> None:
+    import bla.ux  # noqa: F401, imports the proofer and its dependencies
+
+    signal.signal(signal.SIGALRM, _alarm)
+
+
+def discover(paths: list[str]) -> list[str]:
+    res = []
+    for p in paths:
+        if os.path.isdir(p):
+            res += sorted(glob.glob(os.path.join(p, "*.py")))
+        else:
+            res.append(p)
+    return res
+
+
+def run_model(path: str, timeout: float, max_states: int) -> Result:
+    """Runs the model script `path` in this process, capturing its output"""
+    from bla.ux import verdicts
+
+    name = os.path.splitext(os.path.basename(path))[0]
+    out, err = io.StringIO(), io.StringIO()
+    if max_states:
+        os.environ["BLA_MAX_STATES"] = str(max_states)
+    # As if run with `python path`
+    argv, sys_path = sys.argv, list(sys.path)
+    sys.argv = [path]
+    sys.path.insert(0, os.path.dirname(os.path.abspath(path)))
+
+    status, message = PASS, ""
+    start = time.perf_counter()
+    if timeout:
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    with verdicts() as oks:
+        try:
+            with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+                runpy.run_path(path, run_name="__main__")
+        except _Timeout:
+            status, message = TIMEOUT, f"Exceeded {timeout}s"
+        except BudgetExceeded as e:
+            status, message = BUDGET, str(e)
+        except SystemExit as e:
+            if e.code:
+                status, message = ERROR, f"Exited with {e.code}"
+        except BaseException as e:
+            status, message = ERROR, f"{type(e).__name__}: {e}"
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            sys.argv, sys.path[:] = argv, sys_path
+    if status == PASS and not all(oks):
+        status, message = FAIL, f"{oks.count(False)} of {len(oks)} proofs failed"
+    seconds = time.perf_counter() - start
+    output = out.getvalue() + err.getvalue()
+    return Result(name, path, status, seconds, output, message, oks)
+
+
+def compare(res: Result, golden: str, update: bool) -> Result:
+    """
+    Compares output of a model to its expectation in `golden` directory, which
+    decides whether the model passed when its proofs ran
+    """
+    if res.status not in (PASS, FAIL):
+        return res
+    res.status, res.message = PASS, ""
+    path = os.path.join(golden, f"{res.name}.out")
+    try:
+        with open(path) as f:
+            expected = f.read()
+    except FileNotFoundError:
+        expected = None
+    if expected == res.output:
+        return res
+    if update:
+        with open(path, "w") as f:
+            f.write(res.output)
+        res.message = f"Updated {path}"
+        return res
+    res.status = FAIL
+    if expected is None:
+        res.message = f"{path} is not found"
+    else:
+        diff = difflib.unified_diff(
+            expected.splitlines(keepends=True),
+            res.output.splitlines(keepends=True),
+            fromfile=path,
+            tofile=res.path,
+        )
+        res.message = "".join(diff)
+    return res
+
+
+def junit(results: list[Result]) -> ET.ElementTree:
+    suite = ET.Element(
+        "testsuite",
+        name="bla",
+        tests=str(len(results)),
+        failures=str(sum(r.status == FAIL for r in results)),
+        errors=str(sum(r.status not in (PASS, FAIL) for r in results)),
+        time=f"{sum(r.seconds for r in results):.3f}",
+    )
+    for r in results:
+        case = ET.SubElement(
+            suite,
+            "testcase",
+            classname=os.path.dirname(r.path) or ".",
+            name=r.name,
+            time=f"{r.seconds:.3f}",
+        )
+        if r.status == FAIL:
+            # The diff of the output or the number of failed proofs
+            summary = r.message.splitlines()[0] if r.message else ""
+            ET.SubElement(case, "failure", message=summary).text = r.message
+        elif r.status != PASS:
+            ET.SubElement(case, "error", type=r.status, message=r.message)
+        ET.SubElement(case, "system-out").text = r.output
+    return ET.ElementTree(suite)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m bla")
+    parser.add_argument("paths", nargs="*", default=["."], metavar="PATH")
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=os.cpu_count(), help="worker processes"
+    )
+    parser.add_argument("--timeout", type=float, default=0, help="seconds per model")
+    parser.add_argument(
+        "--max-states", type=int, default=0, help="unique states per proof"
+    )
+    parser.add_argument("--golden", metavar="DIR", help="expected outputs")
+    parser.add_argument("--update", action="store_true", help="update expected outputs")
+    parser.add_argument("--junit", metavar="FILE", help="write JUnit XML report")
+    parser.add_argument("--json", metavar="FILE", help="write JSON report")
+    args = parser.parse_args(argv)
+
+    paths = discover(args.paths)
+    results: list[Result] = []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(
+        max_workers=max(1, min(args.jobs or 1, len(paths))),
+        mp_context=mp.get_context("fork"),
+        initializer=_warm,
+    ) as pool:
+        futures = [
+            pool.submit(run_model, p, args.timeout, args.max_states) for p in paths
+        ]
+        for fut in as_completed(futures):
+            res = fut.result()
+            if args.golden:
+                res = compare(res, args.golden, args.update)
+            results.append(res)
+            print(f"{res.status.upper():7} {res.name} ({res.seconds:.2f}s)", flush=True)
+            if res.message:
+                print(res.message.rstrip("\n"), flush=True)
+
+    results.sort(key=lambda r: paths.index(r.path))
+    passed = sum(r.status == PASS for r in results)
+    wall = time.perf_counter() - start
+    print(f"{passed}/{len(results)} passed in {wall:.2f}s")
+    if args.junit:
+        junit(results).write(args.junit, encoding="unicode", xml_declaration=True)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump([asdict(r) for r in results], f, indent=2)
+            f.write("\n")
+    return 0 if passed == len(results) else 1
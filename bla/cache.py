@@ -0,0 +1,182 @@
+"""
+Content-addressed cache of proof results.
+
+A result (verdict, rendered output and the outcome of the exploration it's
+rendered from) is keyed by sources of all programs, the memory layout, options
+that affect the result, the renderer with its configuration and the version of
+bla itself (hash of its sources). Unchanged proofs are answered from the cache
+without exploring anything, the renderer renders the restored outcome. Opt-in,
+see `bla.ux.proof` (`result_cache=` or `BLA_RESULT_CACHE` environment variable).
+
+Entries are inspected and evicted with:
+
+    python -m bla.cache [--dir DIR] list
+    python -m bla.cache [--dir DIR] show KEY
+    python -m bla.cache [--dir DIR] evict (KEY... | --all | --older-than DAYS)
+"""
+from typing import Any
+from dataclasses import dataclass, asdict
+from functools import cache
+from hashlib import sha256
+import argparse
+import base64
+import json
+import os
+import pickle
+import sys
+import time
+
+from bla.core import Prog
+from bla.memory import MemMap
+
+ENV = "BLA_RESULT_CACHE"
+DEFAULT_DIR = os.path.join(os.path.expanduser("~"), ".cache", "bla", "results")
+
+
+@cache
+def bla_version() -> str:
+    """Hash of bla's own sources"""
+    h = sha256()
+    root = os.path.dirname(os.path.abspath(__file__))
+    for name in sorted(os.listdir(root)):
+        if name.endswith(".py"):
+            with open(os.path.join(root, name), "rb") as f:
+                h.update(name.encode() + b"\0" + f.read())
+    return h.hexdigest()
+
+
+def _describe(obj: Any) -> Any:
+    """Stable (address free) description of an option value"""
+    match obj:
+        case None | bool() | int() | float() | str():
+            return obj
+        case list() | tuple():
+            return [_describe(o) for o in obj]
+        case dict():
+            return {str(k): _describe(v) for k, v in obj.items()}
+        case _ if hasattr(obj, "__name__"):  # functions, classes
+            return obj.__name__
+        case _ if not hasattr(obj, "__dict__"):
+            return type(obj).__name__
+        case _:
+            return [type(obj).__name__, _describe(vars(obj))]
+
+
+def result_key(progs: list[Prog], mm: MemMap, options: dict[str, Any]) -> str:
+    srcs = [getattr(getattr(p, "ctx", None), "src", p.name) for p in progs]
+    # Instances of a template share the source, see `bla.template`
+    params = [repr(getattr(getattr(p, "ctx", None), "params", None)) for p in progs]
+    layout = [
+        (ref.name, type(t).__name__, repr(t._values), repr(t.init()))
+        for ref, t in ((ref, mm.type(ref)) for ref in mm._addr)
+    ]
+    desc = [bla_version(), srcs, params, layout, _describe(options)]
+    return sha256(json.dumps(desc, sort_keys=True).encode()).hexdigest()
+
+
+@dataclass
+class Result:
+    ok: bool
+    output: str  # rendered by the renderer
+    progs: list[str]
+    created: float
+    # Pickled (base64) fields of `ProofCtx` to render it again from, see
+    # `bla.proofer.outcome`
+    outcome: str = ""
+
+    @staticmethod
+    def of(ok: bool, output: str, progs: list[str], fields: dict[str, Any]) -> "Result":
+        data = base64.b64encode(pickle.dumps(fields, protocol=pickle.HIGHEST_PROTOCOL))
+        return Result(ok, output, progs, time.time(), data.decode())
+
+    def fields(self) -> dict[str, Any]:
+        return pickle.loads(base64.b64decode(self.outcome))
+
+
+class ResultCache:
+    def __init__(self, directory: str | None = None):
+        self.directory = directory or os.environ.get(ENV) or DEFAULT_DIR
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key: str) -> Result | None:
+        try:
+            with open(self._path(key)) as f:
+                return Result(**json.load(f))
+        except (FileNotFoundError, ValueError, TypeError):
+            return None
+
+    def put(self, key: str, result: Result) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = self._path(key) + f".{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(asdict(result), f)
+        os.replace(tmp, self._path(key))
+
+    def keys(self) -> list[str]:
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return sorted(n[: -len(".json")] for n in names if n.endswith(".json"))
+
+    def evict(self, key: str) -> bool:
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            return False
+        return True
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m bla.cache")
+    parser.add_argument("--dir", help=f"cache directory (${ENV} or {DEFAULT_DIR})")
+    cmds = parser.add_subparsers(dest="cmd", required=True)
+    cmds.add_parser("list", help="list entries")
+    show = cmds.add_parser("show", help="print rendered result of an entry")
+    show.add_argument("key")
+    evict = cmds.add_parser("evict", help="remove entries")
+    evict.add_argument("keys", nargs="*")
+    evict.add_argument("--all", action="store_true")
+    evict.add_argument("--older-than", type=float, metavar="DAYS")
+    args = parser.parse_args(argv)
+
+    rc = ResultCache(args.dir)
+    match args.cmd:
+        case "list":
+            for key in rc.keys():
+                res = rc.get(key)
+                if res is not None:
+                    created = time.strftime(
+                        "%Y-%m-%d %H:%M", time.localtime(res.created)
+                    )
+                    verdict = "OK" if res.ok else "FAIL"
+                    print(f"{key[:16]}  {created}  {verdict:4}  {','.join(res.progs)}")
+        case "show":
+            matches = [k for k in rc.keys() if k.startswith(args.key)]
+            if len(matches) != 1:
+                print(f"{len(matches)} entries match {args.key}", file=sys.stderr)
+                return 1
+            res = rc.get(matches[0])
+            assert res is not None
+            print(res.output, end="")
+        case "evict":
+            if args.all:
+                keys = rc.keys()
+            elif args.older_than is not None:
+                deadline = time.time() - args.older_than * 86400
+                keys = [
+                    k
+                    for k in rc.keys()
+                    if (r := rc.get(k)) is None or r.created < deadline
+                ]
+            else:
+                keys = [k for k in rc.keys() if any(k.startswith(p) for p in args.keys)]
+            n = sum(rc.evict(k) for k in keys)
+            print(f"Evicted {n} entries")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,61 @@
+from bla.memory import MemMap, Memory
+from bla.core import State, Prog
+
+
+class StateCodec:
+    """
+    Packs a State into a single int.
+
+    Mixed radix: program counters are the low digits (radix is `len(ops) + 1`
+    to account for halted programs), memory (see `MemMap.encode`) is the high part.
+    """
+
+    def __init__(self, progs: list[Prog], mm: MemMap):
+        self._mm = mm
+        self._pos_radix = [len(p.ops) + 1 for p in progs]
+
+        self._pos_weight: list[int] = []
+        w = 1
+        for r in self._pos_radix:
+            self._pos_weight.append(w)
+            w *= r
+        self.pos_size = w
+
+    @property
+    def size(self) -> int:
+        """Upper bound (exclusive) of encoded states."""
+        return self.pos_size * self._mm.size
+
+    def pos_weight(self, prog_idx: int) -> int:
+        return self._pos_weight[prog_idx]
+
+    def pack_pos(self, pos: tuple[int, ...]) -> int:
+        return sum(p * w for p, w in zip(pos, self._pos_weight))
+
+    def unpack_pos(self, code: int) -> tuple[int, ...]:
+        pos = []
+        for r in self._pos_radix:
+            code, p = divmod(code, r)
+            pos.append(p)
+        return tuple(pos)
+
+    def pack(self, pos_code: int, mem_code: int) -> int:
+        return mem_code * self.pos_size + pos_code
+
+    def unpack(self, key: int) -> tuple[int, int]:
+        """Returns (pos_code, mem_code)"""
+        mem_code, pos_code = divmod(key, self.pos_size)
+        return pos_code, mem_code
+
+    def encode(self, state: State) -> int:
+        return self.pack(self.pack_pos(state.pos), self._mm.encode(state.val))
+
+    def decode(self, key: int) -> State:
+        pos_code, mem_code = self.unpack(key)
+        return State(pos=self.unpack_pos(pos_code), val=self._mm.decode(mem_code))
+
+    def encode_mem(self, mem: Memory) -> int:
+        return self._mm.encode(mem)
+
+    def decode_mem(self, mem_code: int) -> Memory:
+        return self._mm.decode(mem_code)
@@ -0,0 +1,197 @@
+"""
+Compiles a Prog into a single generated Python function:
+
+    step(pc, m) -> (next_pc, m, atomic)
+
+Expressions are inlined, labels are resolved to positions, atomicity of every
+transition is precomputed and domain checks of assignments are inlined.
+Semantics (including error messages) match `Prog.run`.
+"""
+from typing import Any
+
+from bla import ops
+from bla.memory import VarType
+from bla.core import Prog, FailedAssert, Step
+
+
+def _not_bool(val: Any) -> None:
+    assert isinstance(val, bool)
+
+
+def _invalid(val: Any) -> FailedAssert:
+    return FailedAssert(f"Invalid value {val}")
+
+
+class _Gen:
+    def __init__(self, prog: Prog, tables: Any = None):
+        self.prog = prog
+        self.tables = tables
+        self.ns: dict[str, Any] = {
+            "FailedAssert": FailedAssert,
+            "_not_bool": _not_bool,
+            "_invalid": _invalid,
+        }
+
+    def bind(self, prefix: str, obj: Any) -> str:
+        name = f"_{prefix}{len(self.ns)}"
+        self.ns[name] = obj
+        return name
+
+    def resolve(self, pos: int, lbl: str | None) -> tuple[int, bool]:
+        """Returns `next_pc, atomic` of transition from `pos`, see `Prog.run`"""
+        prog = self.prog
+        if lbl is None:
+            nxt = pos + 1
+        else:
+            assert lbl in prog.labels, f"Label {lbl} not found"
+            nxt = prog.labels[lbl]
+        atomic = nxt < len(prog.ops) and prog.atomic[nxt] and prog.atomic[pos]
+        return nxt, atomic
+
+    def ret(self, pos: int, lbl: str | None) -> str:
+        nxt, atomic = self.resolve(pos, lbl)
+        return f"return {nxt}, m, {atomic}"
+
+    def expr(self, e: Any) -> str:
+        if isinstance(e, (ops.EvalExpr, ops.Const, ops.Var)):
+            return f"({e.src})"
+        return f"{self.bind('e', e)}(m)"  # opaque callable
+
+    def check(self, vt: VarType, var: str) -> list[str]:
+        if type(vt).validate is VarType.validate:
+            dom = self.bind("d", frozenset(vt._domain))
+            return [f"if {var} not in {dom}: raise _invalid({var})"]
+        validate = self.bind("v", vt.validate)
+        return [
+            "try:",
+            f"    {validate}({var})",
+            "except AssertionError as e:",
+            "    raise FailedAssert(str(e))",
+        ]
+
+    def pred(self, p: Any) -> list[str]:
+        """Evaluates predicate into `c`, checks that it's bool"""
+        if isinstance(p, ops.EvalPredicate):
+            return [f"c = {self.expr(p)}", "if c.__class__ is not bool: _not_bool(c)"]
+        # Const and Var predicates are known to be bool, see `_parse_predicate`
+        return [f"c = {self.expr(p)}"]
+
+    def lookup(self, pos: int, op: Any) -> list[str]:
+        """Outcome of the op from its table (see `bla.tables`), if it's there"""
+        table = self.tables[pos] if self.tables else None
+        if table is None:
+            return []
+        assert op.reads is not None
+        # As `itemgetter` of reads
+        key = [f"m[{a}]" for a in sorted(op.reads)]
+        lookup = key[0] if len(key) == 1 else f"({''.join(k + ', ' for k in key)})"
+        lines = [
+            f"o = {self.bind('t', table)}.get({lookup})",
+            "if o is not None:",
+            "    if o.__class__ is str: raise FailedAssert(o)",
+        ]
+        addrs = getattr(op, "addrs", [])
+        if len(addrs) == 1:
+            a = addrs[0]
+            lines += [f"    m = m[:{a}] + o[1] + m[{a + 1}:]"]
+        elif addrs:
+            lines += ["    nm = list(m)"]
+            lines += [f"    nm[{a}] = o[1][{i}]" for i, a in enumerate(addrs)]
+            lines += ["    m = tuple(nm)"]
+        return lines + ["    return o[0], m, o[2]"]
+
+    def op(self, pos: int, op: Any) -> list[str]:
+        return self.lookup(pos, op) + self.eval_op(pos, op)
+
+    def eval_op(self, pos: int, op: Any) -> list[str]:
+        match op:
+            case ops.Mov():
+                return self.mov(pos, op)
+            case ops.Cond():
+                jump, nxt = self.ret(pos, op.lbl), self.ret(pos, None)
+                on_true, on_false = (nxt, jump) if op.negate else (jump, nxt)
+                return self.pred(op.pred) + [f"if c: {on_true}", on_false]
+            case ops.Goto():
+                return [self.ret(pos, op.lbl)]
+            case ops.Assert():
+                msg = self.bind("msg", op.msg)
+                return self.pred(op.pred) + [
+                    f"if not c: raise FailedAssert({msg})",
+                    self.ret(pos, None),
+                ]
+            case _:  # unknown op, call it and resolve label at runtime
+                fn = self.bind("op", op)
+                targets = {
+                    lbl: self.resolve(pos, lbl) for lbl in [None, *self.prog.labels]
+                }
+                tbl = self.bind("t", targets)
+                return [
+                    f"lbl, m = {fn}(m)",
+                    f"nxt, atomic = {tbl}[lbl]",
+                    "return nxt, m, atomic",
+                ]
+
+    def mov(self, pos: int, op: ops.Mov) -> list[str]:
+        lines = []
+        if op.tpl:
+            n = len(op.refs)
+            lines += [
+                f"r = list({self.expr(op.expr)})",
+                f"assert len(r) == {n}, "
+                f'f"unexpected ({{len(r)}}) many values to unpack (expected {n})"',
+            ]
+            vals = [f"r[{i}]" for i in range(n)]
+        else:
+            lines += [f"r = {self.expr(op.expr)}"]
+            vals = ["r"]
+
+        for i, (ref, val) in enumerate(zip(op.refs, vals)):
+            lines += [f"v{i} = {val}"]
+            if op.checked:
+                lines += self.check(op.mm.type(ref), f"v{i}")
+
+        if len(op.addrs) == 1:
+            a = op.addrs[0]
+            lines += [f"m = m[:{a}] + (v0,) + m[{a + 1}:]"]
+        else:
+            lines += ["nm = list(m)"]
+            lines += [f"nm[{addr}] = v{i}" for i, addr in enumerate(op.addrs)]
+            lines += ["m = tuple(nm)"]
+        return lines + [self.ret(pos, None)]
+
+    def dispatch(self, lo: int, hi: int, indent: str) -> list[str]:
+        """Balanced binary if-tree over pc in [lo, hi)"""
+        if hi - lo == 1:
+            return [indent + ln for ln in self.op(lo, self.prog.ops[lo])]
+        mid = (lo + hi) // 2
+        return (
+            [f"{indent}if pc < {mid}:"]
+            + self.dispatch(lo, mid, indent + "    ")
+            + self.dispatch(mid, hi, indent)
+        )
+
+    def source(self) -> str:
+        lines = ["def step(pc, m):"]
+        if self.prog.ops:
+            lines += self.dispatch(0, len(self.prog.ops), "    ")
+        else:
+            lines += ["    assert False"]
+        return "\n".join(lines) + "\n"
+
+
+def compile_prog(prog: Prog, tables: Any = None, cache: Any = None) -> Step:
+    """
+    `tables`: precomputed outcomes of ops to look up, see `bla.tables`.
+    `cache`: keeps code of step functions, see `bla.progcache`.
+    """
+    gen = _Gen(prog, tables)
+    src = gen.source()
+    filename = f"<bla:{prog.name}>"
+    if cache is not None:
+        code = cache.code(src, filename)
+    else:
+        code = compile(src, filename=filename, mode="exec")
+    exec(code, gen.ns)
+    step = gen.ns["step"]
+    step.__bla_source__ = src
+    return step
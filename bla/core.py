@@ -14,6 +14,8 @@ Label = str
 Op = Callable[[Memory], tuple[Label | None, Memory]]
 Expr = Callable[[Memory], Any]
 Predicate = Callable[[Memory], bool]
+# (pos, memory) -> (next pos, next memory, is next op in the same atomic block)
+Step = Callable[[int, Memory], tuple[int, Memory, bool]]
 
 
 class FailedAssert(Exception):
@@ -66,5 +68,13 @@ class Prog:
 
         return nxt_pos, vals, atomic
 
+    def successors(self, pos: int) -> list[int]:
+        """Positions the op at `pos` may lead to (including the halted `len(ops)`)"""
+        branches = getattr(self.ops[pos], "branches", None)
+        if branches is None:  # unknown op, can jump anywhere
+            branches = [None, *self.labels]
+        nxt = {pos + 1 if lbl is None else self.labels[lbl] for lbl in branches}
+        return sorted(nxt)
+
     def render_op(self, pos) -> str:
         raise NotImplementedError()
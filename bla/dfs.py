@@ -0,0 +1,102 @@
+"""
+Depth-first exploration.
+
+Keeps only the set of visited (packed) states, see `bla.visited`, no parent links:
+the counterexample is the DFS stack itself. Stack frames hold just the state and
+a cursor over its programs, successors are produced one at a time. Finds deep
+violations sooner than BFS, but the counterexample is not necessarily the
+shortest one.
+
+With an approximate visited set (`BitState`, `HashCompact`) some states may be
+skipped, but a found counterexample is always a real execution.
+"""
+from bla.core import State
+from bla.proofer import ProofCtx, _schedule, _decode, _step, _Failed, init_key
+from bla.visited import Visited, visited_set
+
+
+def run_dfs(ctx: ProofCtx, init_state: State, visited: Visited | None = None) -> None:
+    """
+    Runs until either all reachable states are visited or assert failure occurs.
+    Affects ctx: sets failure and omission, `ctx.parent` only holds the
+    failure's chain.
+    """
+    # Frames of the stack: state, programs to run from it, cursor, is it reduced
+    keys: list[int] = []
+    progs: list[list[int]] = []
+    cursor: list[int] = []
+    reduced: list[bool] = []
+    on_stack: set[int] = set()
+
+    def push(key: int, nxt_progs: list[int] | None) -> None:
+        ps, red = _schedule(
+            ctx, ctx.codec.unpack_pos(ctx.codec.unpack(key)[0]), nxt_progs
+        )
+        keys.append(key)
+        progs.append(ps)  # shared lists, not copied
+        cursor.append(0)
+        reduced.append(red)
+        if ctx.por is not None:
+            on_stack.add(key)
+
+    def pop() -> None:
+        on_stack.discard(keys.pop())
+        progs.pop()
+        cursor.pop()
+        reduced.pop()
+
+    key = init_key(ctx, init_state)
+    if visited is None:
+        visited = visited_set(ctx.codec.size)
+    visited.add(key)
+    if ctx.profiler is not None:
+        ctx.profiler.seen = visited.__contains__
+    push(key, None)
+
+    mon = ctx.monitor
+    poll = mon.poll_every if mon is not None else 0
+    expanded = 1
+
+    def stats() -> dict[str, int]:
+        assert visited is not None
+        n = len(keys)
+        return dict(unique=len(visited), queue=n, depth=n, memory=visited.nbytes())
+
+    try:
+        while keys:
+            key, ps = keys[-1], progs[-1]
+            state = _decode(ctx, key)
+            # Advance the top frame until a new state is found (or it's exhausted)
+            for i in range(cursor[-1], len(ps)):
+                try:
+                    succ = _step(ctx, state, ps[i])
+                except _Failed as f:
+                    ctx.failure = f.failure
+                    for parent, child in zip([None, *keys], keys):
+                        ctx.parent[child] = parent
+                    return
+                if succ is None:  # halted
+                    continue
+
+                nxt_key, nxt_progs = succ
+                if reduced[-1] and nxt_key in on_stack:
+                    # Cycle proviso: reduced expansion must not close a cycle,
+                    # expand the state fully instead.
+                    pop()
+                    push(key, ctx.all_progs)
+                    break
+
+                if visited.add(nxt_key):
+                    cursor[-1] = i + 1
+                    push(nxt_key, nxt_progs)
+                    expanded += 1
+                    if expanded == poll and mon is not None:
+                        poll += mon.poll_every
+                        mon.poll(expanded, **stats())
+                    break
+            else:
+                pop()
+    finally:
+        ctx.omission = visited.omission()
+        if mon is not None:
+            mon.report(expanded, done=True, **stats())
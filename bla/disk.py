@@ -0,0 +1,225 @@
+"""
+Disk-backed BFS for state spaces larger than RAM.
+
+ * Visited set: open-addressing hash table in a memory-mapped file, mapping
+   a state to its parent (so counterexamples can be rebuilt).
+ * Frontier: append-only segment files, one per BFS level, read sequentially.
+ * Delayed duplicate detection: successors of a level are appended to a
+   "pending" segment without lookups; at the end of the level pending states
+   are checked against (and inserted into) the table in one sequential pass.
+
+Packed states (see `StateCodec`) have to fit 64 bits.
+"""
+from array import array
+from typing import Iterator
+import mmap
+import os
+import shutil
+import tempfile
+
+from bla.core import State
+from bla.proofer import ProofCtx, _expand, _Failed, init_key
+
+_MASK = (1 << 64) - 1
+_MUL = 0x9E3779B97F4A7C15
+_CHUNK = 1 << 14  # records per read/write
+
+
+class DiskTable:
+    """
+    Hash table `key -> parent` in a memory-mapped file.
+    Slot is two words: `key + 1` (0 is empty) and `parent + 1` (0 is no parent).
+    """
+
+    def __init__(self, path: str, bits: int = 16):
+        self._path = path
+        self._len = 0
+        self._open(path, bits)
+
+    def _open(self, path: str, bits: int) -> None:
+        self._bits = bits
+        self._mask = (1 << bits) - 1
+        self._shift = 64 - bits
+        self._limit = (1 << bits) * 7 // 10
+        size = 16 << bits
+        self._file = open(path, "w+b")
+        self._file.truncate(size)
+        self._mm = mmap.mmap(self._file.fileno(), size)
+        self._slots = memoryview(self._mm).cast("Q")
+
+    def close(self) -> None:
+        self._slots.release()
+        self._mm.close()
+        self._file.close()
+
+    def __len__(self) -> int:
+        return self._len
+
+    def nbytes(self) -> int:
+        return len(self._slots) * self._slots.itemsize
+
+    def _slot(self, key: int) -> int:
+        slots, mask = self._slots, self._mask
+        i = ((key * _MUL) & _MASK) >> self._shift
+        v = key + 1
+        while True:
+            s = slots[2 * i]
+            if s == 0 or s == v:
+                return 2 * i
+            i = (i + 1) & mask
+
+    def __contains__(self, key: int) -> bool:
+        return self._slots[self._slot(key)] != 0
+
+    def parent(self, key: int) -> int | None:
+        i = self._slot(key)
+        assert self._slots[i], f"Unknown state {key}"
+        p = self._slots[i + 1]
+        return p - 1 if p else None
+
+    def add(self, key: int, parent: int | None) -> bool:
+        """Adds key, returns False if it was already present"""
+        i = self._slot(key)
+        if self._slots[i]:
+            return False
+        self._slots[i] = key + 1
+        self._slots[i + 1] = 0 if parent is None else parent + 1
+        self._len += 1
+        if self._len > self._limit:
+            self._grow()
+        return True
+
+    def _grow(self) -> None:
+        old_slots, old_mm, old_file = self._slots, self._mm, self._file
+        tmp = self._path + ".grow"
+        self._open(tmp, self._bits + 1)
+        for i in range(0, len(old_slots), 2):
+            if old_slots[i]:
+                j = self._slot(old_slots[i] - 1)
+                self._slots[j] = old_slots[i]
+                self._slots[j + 1] = old_slots[i + 1]
+        old_slots.release()
+        old_mm.close()
+        old_file.close()
+        os.replace(tmp, self._path)
+
+
+class Segment:
+    """Append-only file of fixed-width records of 64-bit words"""
+
+    def __init__(self, path: str, width: int):
+        self._path = path
+        self._width = width
+        self._file = open(path, "wb")
+        self._buf = array("Q")
+        self.count = 0
+
+    def append(self, *rec: int) -> None:
+        self._buf.extend(rec)
+        self.count += 1
+        if len(self._buf) >= _CHUNK * self._width:
+            self._flush()
+
+    def _flush(self) -> None:
+        self._buf.tofile(self._file)
+        del self._buf[:]
+
+    def close(self) -> None:
+        self._flush()
+        self._file.close()
+
+    def read(self) -> Iterator[tuple[int, ...]]:
+        """Reads all records and removes the file"""
+        w = self._width
+        with open(self._path, "rb") as f:
+            while True:
+                buf = array("Q")
+                try:
+                    buf.fromfile(f, _CHUNK * w)
+                except EOFError:
+                    pass  # partial chunk
+                if not buf:
+                    break
+                for i in range(0, len(buf), w):
+                    yield tuple(buf[i : i + w])
+        os.remove(self._path)
+
+
+def run_disk(ctx: ProofCtx, init_state: State, directory: str | None = None) -> None:
+    """
+    Runs BFS keeping visited states and frontier on disk (in `directory`,
+    a temporary one by default). Affects ctx: sets failure, `ctx.parent` only
+    holds the failure's chain.
+    """
+    assert ctx.codec.size < _MASK, "States don't fit 64 bits, can't store on disk"
+    tmp = tempfile.mkdtemp(prefix="bla-", dir=directory)
+    table = DiskTable(os.path.join(tmp, "visited"))
+    try:
+        _run_levels(ctx, init_state, table, tmp)
+        if ctx.failure is not None:
+            key = ctx.codec.encode(ctx.failure.state)
+            while True:
+                parent = table.parent(key)
+                ctx.parent[key] = parent
+                if parent is None:
+                    break
+                key = parent
+    finally:
+        table.close()
+        shutil.rmtree(tmp)
+
+
+def _run_levels(ctx: ProofCtx, init_state: State, table: DiskTable, tmp: str) -> None:
+    # Records: frontier (key, restricted prog + 1), pending (key, parent, restricted prog + 1)
+    level = 0
+    key = init_key(ctx, init_state)
+    table.add(key, None)
+    if ctx.profiler is not None:
+        ctx.profiler.seen = table.__contains__
+    frontier = Segment(os.path.join(tmp, f"frontier.{level}"), 2)
+    frontier.append(key, 0)
+    frontier.close()
+
+    mon = ctx.monitor
+    poll = mon.poll_every if mon is not None else 0
+    expanded = left = 0
+
+    def stats() -> dict[str, int]:
+        return dict(unique=len(table), queue=left, depth=level, memory=table.nbytes())
+
+    while frontier.count:
+        pending = Segment(os.path.join(tmp, f"pending.{level}"), 3)
+        left = frontier.count
+        for key, restricted in frontier.read():
+            expanded, left = expanded + 1, left - 1
+            if expanded == poll and mon is not None:
+                poll += mon.poll_every
+                mon.poll(expanded, **stats())
+            nxt_progs = [restricted - 1] if restricted else None
+            try:
+                succs, reduced = _expand(ctx, key, nxt_progs)
+                if reduced and any(k in table for k, _ in succs):
+                    # Cycle proviso, see `_run`
+                    succs, _ = _expand(ctx, key, ctx.all_progs)
+            except _Failed as f:
+                ctx.failure = f.failure
+                pending.close()
+                for _ in pending.read():
+                    pass  # drop
+                break
+            for nxt_key, nxt_nxt_progs in succs:
+                ip = nxt_nxt_progs[0] + 1 if nxt_nxt_progs else 0
+                pending.append(nxt_key, key, ip)
+        if ctx.failure is not None:
+            break
+        pending.close()
+
+        level += 1
+        frontier = Segment(os.path.join(tmp, f"frontier.{level}"), 2)
+        for key, parent, restricted in pending.read():
+            if table.add(key, parent):
+                frontier.append(key, restricted)
+        frontier.close()
+
+    if mon is not None:
+        mon.report(expanded, done=True, **stats())
@@ -0,0 +1,173 @@
+"""
+Budgeted, resumable exploration.
+
+`run_proof` blocks until the state space is exhausted. `Exploration` runs the
+same breadth-first search (see `proofer.bfs`) in steps: it pauses every
+`every` expanded states, at every BFS level and as soon as an expanded state
+reaches one of its `Limits`, and returns control to the caller. The caller may inspect `coverage()`, resume
+the exploration (with raised limits, too) or drop it:
+
+    ex = exploration([p0, p1], D, Limits(max_states=10**6, deadline=t))
+    cov = ex.run()
+    if cov.ok is None:  # neither a failure nor a complete coverage
+        ex.limits.max_states *= 2
+        cov = ex.run()
+
+`explore_async` runs an exploration as a coroutine that yields to the event
+loop at every pause, so a service can run many of them concurrently and cancel
+them. Pauses are `every` expansions apart, lower it to keep the loop responsive.
+"""
+from dataclasses import dataclass
+from typing import Any, Callable, Iterator
+import asyncio
+import time
+
+from bla.memory import MemMap, make_mem_map
+from bla.core import Prog
+from bla.parse import parse_program
+from bla.template import Instance
+from bla.progress import dict_size
+from bla.proofer import ProofCtx, RunFailure, Progress, bfs, init_state, make_ctx
+
+
+@dataclass
+class Limits:
+    max_states: int | None = None  # unique states, exceeded by a state's successors
+    max_depth: int | None = None  # states deeper (in steps) aren't discovered
+    deadline: float | None = None  # `time.monotonic()` to stop at
+    max_memory: int | None = None  # bytes of visited states, see `dict_size`
+
+
+@dataclass(frozen=True)
+class Coverage:
+    expanded: int  # states expanded
+    unique: int  # distinct states seen
+    queue: int  # seen states that weren't expanded yet
+    depth: int  # current BFS level
+    elapsed: float  # seconds spent exploring
+    done: bool  # the state space is exhausted, or it stopped at a failure
+    stopped: str | None  # the limit it has reached (name of `Limits` field), "cancelled"
+    failure: RunFailure | None
+
+    @property
+    def complete(self) -> bool:
+        """Whether every reachable state was expanded"""
+        return self.done and not self.queue
+
+    @property
+    def ok(self) -> bool | None:
+        """Verdict, `None` if unknown yet"""
+        if self.failure is not None:
+            return False
+        return True if self.complete else None
+
+
+class Exploration:
+    """
+    Breadth-first exploration of `progs` in steps of `every` expanded states,
+    `options` are of `make_ctx`.
+    """
+
+    def __init__(
+        self,
+        progs: list[Prog],
+        mm: MemMap,
+        limits: Limits | None = None,
+        every: int = 10_000,
+        **options: Any,
+    ):
+        assert every > 0, "Expected a positive number of states per step"
+        self.ctx: ProofCtx = make_ctx(progs, mm, **options)
+        self.limits = limits or Limits()
+        self._bfs = bfs(self.ctx, init_state(self.ctx), every, self._reached)
+        self._progress: Progress = (0, 1, 0)
+        self._elapsed = 0.0
+        self._done = False
+        self._stopped: str | None = None
+
+    def _exceeded(self) -> str | None:
+        """Name of the limit the exploration has reached"""
+        lim = self.limits
+        if lim.max_states is not None and len(self.ctx.parent) >= lim.max_states:
+            return "max_states"
+        if lim.max_depth is not None and self._progress[2] >= lim.max_depth:
+            return "max_depth"
+        if lim.deadline is not None and time.monotonic() >= lim.deadline:
+            return "deadline"
+        if lim.max_memory is not None and dict_size(self.ctx.parent) >= lim.max_memory:
+            return "max_memory"
+        return None
+
+    def _reached(self) -> bool:
+        return self._exceeded() is not None
+
+    def __iter__(self) -> Iterator[Coverage]:
+        """
+        Resumes the exploration, yields coverage at every pause until it's done
+        or reaches a limit
+        """
+        if self._stopped == "cancelled":
+            return
+        self._stopped = None
+        while not self._done:
+            self._stopped = self._exceeded()
+            if self._stopped is not None:
+                return
+            start = time.monotonic()
+            try:
+                self._progress = next(self._bfs)
+            except StopIteration:
+                self._done = True
+            self._elapsed += time.monotonic() - start
+            yield self.coverage()
+
+    def run(self) -> Coverage:
+        """Resumes the exploration until it's done or reaches a limit"""
+        for _ in self:
+            pass
+        return self.coverage()
+
+    def cancel(self) -> None:
+        """Stops the exploration for good, what's explored is kept"""
+        self._bfs.close()
+        self._stopped = "cancelled"
+
+    def coverage(self) -> Coverage:
+        expanded, queue, depth = self._progress
+        return Coverage(
+            expanded=expanded,
+            unique=len(self.ctx.parent),
+            queue=0 if self._done and self.ctx.failure is None else queue,
+            depth=depth,
+            elapsed=self._elapsed,
+            done=self._done,
+            stopped=self._stopped,
+            failure=self.ctx.failure,
+        )
+
+
+def exploration(
+    fns: list[Callable | Instance],
+    domain: dict[str, Any],
+    limits: Limits | None = None,
+    every: int = 10_000,
+    **options: Any,
+) -> Exploration:
+    """`Exploration` of program functions (see `bla.ux.proof`)"""
+    mm = make_mem_map(domain)
+    progs = [parse_program(fn, mm) for fn in fns]
+    return Exploration(progs, mm, limits, every, **options)
+
+
+async def explore_async(ex: Exploration) -> Coverage:
+    """
+    Runs `ex` yielding to the event loop at every pause. When cancelled, the
+    exploration is cancelled too.
+    """
+    try:
+        for _ in ex:
+            await asyncio.sleep(0)
+    except asyncio.CancelledError:
+        ex.cancel()
+        raise
+    return ex.coverage()
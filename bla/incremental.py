@@ -0,0 +1,114 @@
+"""
+Incremental re-verification.
+
+A transition of a program depends only on its own position and the memory, so
+the explored state graph factors into per-program transition tables:
+`(pos, memory code) -> (next pos, next memory code, atomic)`. `TransitionCache`
+persists them in a directory, keyed by the program's source, the memory
+layout and the version of bla (see `bla.cache.bla_version`). After an edit tables of unchanged programs are reused: their edges are
+looked up without decoding memory or running ops, only changed programs are
+executed again. Failed transitions aren't cached.
+
+If no program has changed, the exploration isn't repeated at all: the outcome
+of the last one (failures, parent chains of their states, lasso) is stored too,
+keyed by all programs and the options of `run_proof` that affect it, and is
+restored without loading the tables. Tables hold a transition per explored
+state and program, so they're as large as the state space; entries of edited
+programs aren't removed, remove the directory to reclaim the space.
+"""
+from typing import Any
+from hashlib import sha256
+import json
+import os
+import pickle
+
+from bla.cache import _describe, bla_version
+from bla.core import Prog
+from bla.memory import MemMap
+from bla.proofer import outcome, restore
+
+_FORMAT = 1
+
+
+def program_hash(prog: Prog, mm: MemMap) -> str | None:
+    """Key of the program's transitions, `None` if its source is unknown"""
+    ctx = getattr(prog, "ctx", None)
+    src = getattr(ctx, "src", None)
+    if src is None:
+        return None
+    layout = [(ref.name, mm.type(ref)._values) for ref in mm._addr]
+    # Semantics of ops (and which assignments are checked) depend on bla
+    key: tuple = (_FORMAT, bla_version(), src, layout)
+    params = getattr(ctx, "params", None)
+    if params:  # instance of a template, see `bla.template`
+        key += (params,)
+    return sha256(repr(key).encode()).hexdigest()
+
+
+def model_hash(keys: list[str | None], options: dict[str, Any]) -> str | None:
+    """Key of the outcome of exploring programs of `keys` with `options`"""
+    if None in keys:
+        return None
+    desc = [_FORMAT, bla_version(), keys, _describe(options)]
+    return sha256(json.dumps(desc, sort_keys=True).encode()).hexdigest()
+
+
+class TransitionCache:
+    """
+    Transition tables of `progs` and the outcome of exploring them with
+    `options` persisted in `directory`
+    """
+
+    def __init__(
+        self, directory: str, progs: list[Prog], mm: MemMap, options: dict[str, Any]
+    ):
+        self.directory = directory
+        self.keys = [program_hash(p, mm) for p in progs]
+        self.model = model_hash(self.keys, options)
+        self.tables: list[dict[int, int] | None] = []
+        self._loaded: list[int] = []
+
+    def _path(self, key: str, kind: str = "pickle") -> str:
+        return os.path.join(self.directory, f"{key}.{kind}")
+
+    def _load(self, path: str) -> Any:
+        try:
+            with open(path, "rb") as f:
+                return pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return None
+
+    def _write(self, path: str, obj: Any) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = path + f".{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    def restore(self, ctx: Any) -> bool:
+        """Restores the outcome of the last exploration into `ProofCtx`"""
+        if self.model is None:
+            return False
+        fields = self._load(self._path(self.model, "outcome"))
+        if fields is None:
+            return False
+        restore(ctx, fields)
+        return True
+
+    def load(self) -> list[dict[int, int] | None]:
+        """Transition tables of programs, see `ProofCtx.trans`"""
+        for key in self.keys:
+            table = self._load(self._path(key)) if key is not None else None
+            table = {} if key is not None and table is None else table
+            self.tables.append(table)
+            self._loaded.append(len(table) if table is not None else 0)
+        return self.tables
+
+    def save(self, ctx: Any) -> None:
+        """Writes tables that got new transitions and the outcome of `ProofCtx`"""
+        for key, table, loaded in zip(self.keys, self.tables, self._loaded):
+            if key is None or table is None or len(table) == loaded:
+                continue
+            self._write(self._path(key), table)
+        if self.model is not None:
+            self._write(self._path(self.model, "outcome"), outcome(ctx))
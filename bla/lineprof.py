@@ -0,0 +1,109 @@
+"""
+Per-source-line profiler of models.
+
+Records, per program and op, how many times the op was executed, time spent
+in it (expression evaluation included) and how many successor states the
+transitions starting with it produced: new ones versus already seen. `report`
+annotates the source of programs with these numbers, `dump_stats` writes them
+in `pstats` format (`python -m pstats FILE`).
+
+Transitions are attributed to the op they start with, an atomic block counts
+as a single transition of its first op. Whether a state is new is asked from
+the visited states of the engine (`seen`), and steps the engine re-runs
+outside of the exploration (e.g. to find a fair cycle in `bla.liveness`) are
+run `paused`, so every transition of the exploration is counted once.
+"""
+from typing import Any, Callable
+import marshal
+import time
+
+from bla.core import Prog, Step
+from bla.memory import Memory
+
+
+class Profiler:
+    def __init__(self, progs: list[Prog]):
+        self.progs = progs
+        self.count = [[0] * len(p.ops) for p in progs]
+        self.time = [[0.0] * len(p.ops) for p in progs]
+        self.new = [[0] * len(p.ops) for p in progs]
+        self.dup = [[0] * len(p.ops) for p in progs]
+        # Whether the engine has visited the state, set by the engine
+        self.seen: Callable[[int], bool] = lambda key: False
+        self.paused = False
+
+    def timed(self, ip: int, step: Step) -> Step:
+        """Wraps step of program `ip` to count and time executed ops"""
+        count, spent = self.count[ip], self.time[ip]
+        clock = time.perf_counter
+
+        def step_timed(pos: int, m: Memory) -> tuple[int, Memory, bool]:
+            if self.paused:
+                return step(pos, m)
+            t = clock()
+            try:
+                return step(pos, m)
+            finally:
+                spent[pos] += clock() - t
+                count[pos] += 1
+
+        return step_timed
+
+    def produced(self, ip: int, pos: int, key: int) -> None:
+        """Transition of program `ip` from `pos` has led to the state `key`"""
+        if self.paused:
+            return
+        if self.seen(key):
+            self.dup[ip][pos] += 1
+        else:
+            self.new[ip][pos] += 1
+
+    def _lines(self, ip: int) -> tuple[list[str], dict[int, list[int]]]:
+        """Source lines of the program and positions of ops on every line"""
+        prog = self.progs[ip]
+        ctx: Any = getattr(prog, "ctx", None)
+        if ctx is None:
+            lines = [f"op {pos}" for pos in range(len(prog.ops))]
+            return lines, {pos: [pos] for pos in range(len(prog.ops))}
+        ops_of: dict[int, list[int]] = {}
+        for pos, ln in enumerate(ctx.line_mapping):
+            ops_of.setdefault(ln, []).append(pos)
+        return ctx.src.rstrip("\n").split("\n"), ops_of
+
+    def _line_stats(self, ip: int, ops: list[int]) -> tuple[int, float, int, int]:
+        return (
+            sum(self.count[ip][p] for p in ops),
+            sum(self.time[ip][p] for p in ops),
+            sum(self.new[ip][p] for p in ops),
+            sum(self.dup[ip][p] for p in ops),
+        )
+
+    def report(self) -> str:
+        """Sources of programs annotated with per-line numbers"""
+        out = []
+        header = f"{'count':>10} {'time ms':>9} {'new':>8} {'dup':>8} | source"
+        for ip in range(len(self.progs)):
+            lines, ops_of = self._lines(ip)
+            out += [header]
+            for ln, line in enumerate(lines):
+                if ln in ops_of:
+                    count, spent, new, dup = self._line_stats(ip, ops_of[ln])
+                    stats = f"{count:>10,} {spent * 1e3:>9.1f} {new:>8,} {dup:>8,}"
+                else:
+                    stats = " " * 38
+                out.append(f"{stats} | {line}")
+            out.append("")
+        return "\n".join(out)
+
+    def dump_stats(self, path: str) -> None:
+        """Writes per-line numbers as `pstats` data, one "function" per line"""
+        stats: dict[tuple[str, int, str], tuple[int, int, float, float, dict]] = {}
+        for ip, prog in enumerate(self.progs):
+            lines, ops_of = self._lines(ip)
+            for ln, ops in ops_of.items():
+                count, spent, _, _ = self._line_stats(ip, ops)
+                if count:
+                    func = (f"<bla:{prog.name}>", ln, lines[ln].strip())
+                    stats[func] = (count, count, spent, spent, {})
+        with open(path, "wb") as f:
+            marshal.dump(stats, f)
@@ -0,0 +1,336 @@
+"""
+Liveness checking: every execution eventually reaches a goal state, e.g. all
+programs halt (`HALTS_ASSERT`) or a memory predicate holds (`Eventually`).
+
+A violation is an execution avoiding the goal forever: a run ending (all
+programs halted) outside of the goal, or a cycle of non-goal states. Cycles are
+found on the fly by Tarjan's SCC algorithm, in linear time; when a component is
+complete it's checked for a cycle, exploration stops at the first bad one. The
+counterexample is a lasso: a path to the cycle and the cycle itself.
+
+The same depth-first search checks asserts, and all properties at once: it's
+the only exploration of the state space, see `run_liveness`.
+
+With weak fairness for a program, runs where it's continuously enabled yet
+never scheduled don't count. A component has a fair cycle iff every fair
+program is either disabled (halted, or locked out by an atomic block) in some
+of its states or makes a step inside of it.
+"""
+from typing import Callable
+from collections import deque
+import ast
+
+from bla import ops
+from bla.core import State, FailedAssert
+from bla.progress import dict_size
+from bla.proofer import ProofCtx, Decoded, _decode, _step, _Failed, RunFailure, init_key
+
+
+class LivenessFailure(FailedAssert):
+    pass
+
+
+class Liveness:
+    """Property "eventually goal", see `Halts` and `Eventually`"""
+
+    def goal(self, ctx: ProofCtx) -> Callable[[Decoded], bool]:
+        raise NotImplementedError()
+
+    def message(self) -> str:
+        raise NotImplementedError()
+
+
+class Halts(Liveness):
+    """All programs eventually halt"""
+
+    def goal(self, ctx: ProofCtx) -> Callable[[Decoded], bool]:
+        n_ops = ctx.n_ops
+        return lambda state: all(p >= n for p, n in zip(state[2], n_ops))
+
+    def message(self) -> str:
+        return "doesn't halt"
+
+
+HALTS_ASSERT = Halts()
+
+
+class Eventually(Liveness):
+    """Memory predicate `expr` (e.g. `"done_0 and done_1"`) eventually holds"""
+
+    def __init__(self, expr: str):
+        self.expr = expr
+
+    def goal(self, ctx: ProofCtx) -> Callable[[Decoded], bool]:
+        pred = ops.EvalPredicate.from_ast(
+            ast.parse(self.expr, mode="eval").body, ctx.mm
+        )
+        return lambda state: pred(state[3])
+
+    def message(self) -> str:
+        return f"never {self.expr}"
+
+
+def run_liveness(
+    ctx: ProofCtx, init_state: State, props: list[Liveness], fair: list[int]
+) -> None:
+    """
+    Explores the state space once, checking asserts and searching for an
+    execution that never reaches the goal of one of `props`, assuming weak
+    fairness of programs `fair`. Affects ctx: sets failure, either `ctx.lasso`
+    or (for a failed assert or a finite execution) `ctx.parent`.
+
+    States are paired with a mask of properties whose goal was reached on the
+    way to them, so that goals don't cut off the exploration of asserts: the
+    mask only grows along transitions, hence it's the same in all states of a
+    component, which violates every property the mask doesn't have.
+    """
+    assert ctx.canonizer is None, "Symmetry is not supported with liveness"
+    goals = [prop.goal(ctx) for prop in props]
+    n = len(props)
+    restricted: dict[int, list[int]] = {}  # states inside of atomic blocks
+    self_loops: set[int] = set()
+
+    def reached(state: Decoded) -> int:
+        """Mask of properties whose goal holds in the state"""
+        return sum(1 << i for i, goal in enumerate(goals) if goal(state))
+
+    def enabled(pk: int, state: Decoded) -> list[int]:
+        """Programs to explore from the state"""
+        pos = state[2]
+        ps = restricted.get(pk, ctx.all_progs)
+        return [ip for ip in ps if pos[ip] < ctx.n_ops[ip]]
+
+    def fail(prop: int, last: int, ip: int) -> None:
+        ctx.failure = RunFailure(
+            ctx.codec.decode(last), ip, LivenessFailure(props[prop].message())
+        )
+
+    # Keys of the product are `key << n | mask`
+    index: dict[int, int] = {}
+    low: dict[int, int] = {}  # states of incomplete components
+    component: list[int] = []
+    # Call stack frames: state, mask of its successors, programs to run from
+    # it, cursor
+    keys: list[int] = []
+    masks: list[int] = []
+    progs: list[list[int]] = []
+    cursor: list[int] = []
+
+    mon = ctx.monitor
+    poll = mon.poll_every if mon is not None else 0
+
+    def stats() -> dict[str, int]:
+        return dict(
+            unique=len(index), queue=len(keys), depth=len(keys), memory=dict_size(index)
+        )
+
+    def push(pk: int, nxt_progs: list[int] | None) -> None:
+        nonlocal poll
+        if nxt_progs is not None:
+            restricted[pk] = nxt_progs
+        index[pk] = low[pk] = len(index)
+        component.append(pk)
+        keys.append(pk)
+        state = _decode(ctx, pk >> n)
+        masks.append(pk & ((1 << n) - 1) | reached(state))
+        progs.append(enabled(pk, state))
+        cursor.append(0)
+        if len(index) == poll and mon is not None:
+            poll += mon.poll_every
+            mon.poll(len(index), **stats())
+
+    def path() -> list[tuple[int, int]]:
+        """Steps along the call stack"""
+        return [(k >> n, ps[c - 1]) for k, ps, c in zip(keys, progs, cursor)][:-1]
+
+    def chain() -> None:
+        """Sets `ctx.parent` to the call stack"""
+        steps = _simple(path() + [(keys[-1] >> n, -1)])
+        for (parent, _), (child, _) in zip([(None, -1), *steps], steps):
+            ctx.parent[child] = parent
+
+    prof = ctx.profiler
+    # Product state every state was first expanded as, when profiled with
+    # properties: states are new or seen and profiled once, not once per mask
+    # they're reached with (see `bla.lineprof`)
+    expanded_as: dict[int, int] = {}
+    if prof is not None:
+        prof.seen = expanded_as.__contains__ if n else index.__contains__
+
+    push(init_key(ctx, init_state) << n, None)
+    try:
+        while keys:
+            pk, ps, mask = keys[-1], progs[-1], masks[-1]
+            if prof is not None:
+                prof.paused = n > 0 and expanded_as.setdefault(pk >> n, pk) != pk
+            if not ps and mask != (1 << n) - 1:
+                # All programs halted outside of a goal
+                chain()
+                fail(next(i for i in range(n) if not mask >> i & 1), pk >> n, -1)
+                return
+
+            state = _decode(ctx, pk >> n)
+            for i in range(cursor[-1], len(ps)):
+                try:
+                    succ = _step(ctx, state, ps[i])
+                except _Failed as f:
+                    chain()
+                    ctx.failure = f.failure
+                    return
+                assert succ is not None
+                nxt_pk = succ[0] << n | mask
+                if nxt_pk not in index:
+                    cursor[-1] = i + 1
+                    push(nxt_pk, succ[1])
+                    break
+                if nxt_pk == pk:
+                    self_loops.add(pk)
+                elif nxt_pk in low:
+                    low[pk] = min(low[pk], index[nxt_pk])
+            else:
+                if low[pk] == index[pk]:
+                    members = []
+                    while True:
+                        k = component.pop()
+                        members.append(k)
+                        if k == pk:
+                            break
+                    cycle = None
+                    if mask != (1 << n) - 1 and (len(members) > 1 or pk in self_loops):
+
+                        def succ_of(k: int, ip: int) -> int:
+                            nxt = _step(ctx, _decode(ctx, k >> n), ip)
+                            assert nxt is not None
+                            return nxt[0] << n | mask
+
+                        if prof is not None:
+                            prof.paused = True  # steps of the exploration again
+                        cycle = _fair_cycle(
+                            pk,
+                            members,
+                            fair,
+                            lambda k: enabled(k, _decode(ctx, k >> n)),
+                            succ_of,
+                        )
+                    if cycle is not None:
+                        prefix, loop = _lasso(path(), [(k >> n, ip) for k, ip in cycle])
+                        ctx.lasso, ctx.loop = prefix + loop, len(prefix)
+                        fail(
+                            next(i for i in range(n) if not mask >> i & 1),
+                            *ctx.lasso[-1],
+                        )
+                        return
+                    for k in members:
+                        del low[k]
+                keys.pop()
+                masks.pop()
+                progs.pop()
+                cursor.pop()
+                if keys and pk in low:
+                    low[keys[-1]] = min(low[keys[-1]], low[pk])
+    finally:
+        if prof is not None:
+            prof.paused = False
+        if mon is not None:
+            mon.report(len(index), done=True, **stats())
+
+
+def _simple(steps: list[tuple[int, int]]) -> list[tuple[int, int]]:
+    """
+    Steps (state, program) of a path without revisits of states: the same
+    state may be visited with different masks, cut the loop in between.
+    """
+    res: list[tuple[int, int]] = []
+    at: dict[int, int] = {}
+    for key, ip in steps:
+        if key in at:
+            j = at[key]
+            for k, _ in res[j:]:
+                del at[k]
+            del res[j:]
+        at[key] = len(res)
+        res.append((key, ip))
+    return res
+
+
+def _lasso(
+    path: list[tuple[int, int]], cycle: list[tuple[int, int]]
+) -> tuple[list[tuple[int, int]], list[tuple[int, int]]]:
+    """
+    Lasso of a `path` to a `cycle` (steps of both), entering the cycle at its
+    first state on the path.
+    """
+    prefix = _simple(path + cycle[:1])[:-1]
+    at = {key: i for i, (key, _) in enumerate(cycle)}
+    for j, (key, _) in enumerate(prefix):
+        if key in at:
+            return prefix[:j], cycle[at[key] :] + cycle[: at[key]]
+    return prefix, cycle
+
+
+# Step of a program from the state, and the resulting state
+Edge = tuple[int, int, int]
+
+
+def _fair_cycle(
+    root: int,
+    members: list[int],
+    fair: list[int],
+    enabled: Callable[[int], list[int]],
+    succ: Callable[[int, int], int],
+) -> list[tuple[int, int]] | None:
+    """
+    Finds a fair cycle through `root` inside of the component `members`,
+    returns its steps (state, program) or `None`. `succ` is the state a program
+    steps to from a state.
+    """
+    # Internal edges; states where fair programs are disabled
+    adj: dict[int, list[tuple[int, int]]] = {k: [] for k in members}
+
+    stepped: dict[int, Edge] = {}
+    disabled: dict[int, int] = {}
+    for k in members:
+        ps = enabled(k)
+        for ip in fair:
+            if ip not in ps:
+                disabled.setdefault(ip, k)
+        for ip in ps:
+            nxt = succ(k, ip)
+            if nxt in adj:
+                adj[k].append((ip, nxt))
+                stepped.setdefault(ip, (k, ip, nxt))
+
+    if not stepped or any(ip not in stepped and ip not in disabled for ip in fair):
+        return None
+
+    def route(src: int, dst: int) -> list[tuple[int, int]]:
+        """Shortest path inside of the component"""
+        prev: dict[int, tuple[int, int]] = {}
+        q = deque([src])
+        while dst not in prev and src != dst:
+            k = q.popleft()
+            for ip, nxt in adj[k]:
+                if nxt not in prev:
+                    prev[nxt] = (k, ip)
+                    q.append(nxt)
+        res = []
+        while dst != src:
+            dst, ip = prev[dst]
+            res.append((dst, ip))
+        return res[::-1]
+
+    # Visit every fair program's step (or state where it's disabled), return
+    res: list[tuple[int, int]] = []
+    cur = root
+    for ip in fair:
+        if ip in stepped:
+            src, _, dst = stepped[ip]
+            res += route(cur, src) + [(src, ip)]
+            cur = dst
+        else:
+            res += route(cur, disabled[ip])
+            cur = disabled[ip]
+    if not res and cur == root:
+        ip, cur = adj[root][0]
+        res.append((root, ip))
+    return res + route(cur, root)
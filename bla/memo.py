@@ -0,0 +1,81 @@
+"""
+Transition memoization.
+
+An op only depends on the few variables it reads, e.g. `while turn == True`
+reads just `turn`, yet it's re-executed against every memory it's reached
+with. `memoize` caches outcome of an op (next position, values it writes,
+atomicity) by `(pos, values of variables it reads)` in a bounded LRU cache,
+so repeated transitions become dict lookups instead of `eval` calls. Pays off
+for the interpreter and for expensive expressions, compiled steps inline
+simple ones, which is about as cheap as a lookup.
+
+Only ops with evaluated expressions (`EvalExpr`) and known read/write sets are
+cached, trivial ones are cheaper to run than to look up. Failed transitions are
+not cached.
+"""
+from functools import lru_cache
+from operator import itemgetter
+from typing import Any, Callable
+
+from bla import ops
+from bla.core import Prog, Step
+from bla.memory import Memory
+
+
+def _worth(op: Any) -> bool:
+    match op:
+        case ops.Mov():
+            expr = op.expr
+        case ops.Cond() | ops.Assert():
+            expr = op.pred
+        case _:
+            return False
+    return isinstance(expr, ops.EvalExpr) and op.reads is not None
+
+
+def memoize(prog: Prog, step: Step, n_vars: int, maxsize: int) -> Step:
+    """Wraps `step` of `prog` with a cache of at most `maxsize` outcomes"""
+    # Per position: read addresses, projection of memory to them, written addresses
+    reads_of: list[list[int]] = []
+    project: list[Callable[[Memory], Any] | None] = []
+    writes: list[list[int]] = []
+    for op in prog.ops:
+        worth = _worth(op)
+        reads = sorted(getattr(op, "reads")) if worth else []
+        reads_of.append(reads)
+        if worth:
+            project.append(itemgetter(*reads) if reads else lambda m: ())
+            writes.append(list(getattr(op, "addrs", [])))
+        else:
+            project.append(None)
+            writes.append([])
+
+    @lru_cache(maxsize=maxsize)
+    def outcome(pos: int, key: Any) -> tuple[int, tuple[Any, ...], bool]:
+        # Variables the op doesn't read are irrelevant, leave them unset
+        m: list[Any] = [None] * n_vars
+        reads = reads_of[pos]
+        for addr, val in zip(reads, key if len(reads) > 1 else (key,)):
+            m[addr] = val
+        nxt, nm, atomic = step(pos, tuple(m))
+        return nxt, tuple(nm[a] for a in writes[pos]), atomic
+
+    def memo_step(pos: int, m: Memory) -> tuple[int, Memory, bool]:
+        proj = project[pos]
+        if proj is None:
+            return step(pos, m)
+        nxt, vals, atomic = outcome(pos, proj(m))
+        match writes[pos]:
+            case []:
+                pass
+            case [a]:
+                m = m[:a] + vals + m[a + 1 :]
+            case addrs:
+                nm = list(m)
+                for a, v in zip(addrs, vals):
+                    nm[a] = v
+                m = tuple(nm)
+        return nxt, m, atomic
+
+    memo_step.cache_info = outcome.cache_info  # type: ignore[attr-defined]
+    return memo_step
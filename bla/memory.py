@@ -4,10 +4,20 @@ from dataclasses import dataclass
 Memory = tuple[Any, ...]
 
 
+def _ordered(domain: set[Any]) -> tuple[Any, ...]:
+    # Stable order, so packed encodings don't depend on set iteration order
+    try:
+        return tuple(sorted(domain))
+    except TypeError:
+        return tuple(sorted(domain, key=repr))
+
+
 class VarType:
     def __init__(self, domain: Iterable[Any], init: Any):
         assert isinstance(domain, Iterable), "Domain must be iterable"
         self._domain = set(domain)
+        self._values = _ordered(self._domain)
+        self._index = {v: i for i, v in enumerate(self._values)}
 
         self.validate(init)
         self._init = init
@@ -18,6 +28,23 @@ class VarType:
     def validate(self, val: Any) -> None:
         assert val in self._domain, f"Invalid value {val}"
 
+    def accepts(self, val: Any) -> bool:
+        try:
+            self.validate(val)
+        except AssertionError:
+            return False
+        return True
+
+    @property
+    def size(self) -> int:
+        return len(self._values)
+
+    def index(self, val: Any) -> int:
+        return self._index[val]
+
+    def value(self, idx: int) -> Any:
+        return self._values[idx]
+
 
 class BoolType(VarType):
     def __init__(self, domain: Iterable[bool] = [True, False], init: bool = False):
@@ -42,6 +69,9 @@ class MemMap:
     def __init__(self, vars: list[tuple[Reference, VarType]]):
         self._types = [t for _, t in vars]
         self._addr = {ref: i for i, (ref, _) in enumerate(vars)}
+        # For `encode`, most significant variable first
+        self._enc = [(t._index, t.size) for t in reversed(self._types)]
+        self._dec = [(t._values, t.size) for t in self._types]
 
     def init(self) -> Memory:
         return Memory(t.init() for t in self._types)
@@ -50,9 +80,34 @@ class MemMap:
         assert ref in self._addr, f"Unknown variable {ref}"
         return self._addr[ref]
 
+    def type(self, ref: Reference) -> VarType:
+        return self._types[self.addr(ref)]
+
     def validate(self, ref: Reference, val: Any) -> None:
         self._types[self.addr(ref)].validate(val)
 
+    @property
+    def size(self) -> int:
+        """Number of distinct memories, i.e. product of all domain sizes."""
+        n = 1
+        for t in self._types:
+            n *= t.size
+        return n
+
+    def encode(self, mem: Memory) -> int:
+        """Packs memory into an int in [0, size), mixed radix over domain indices."""
+        code = 0
+        for (index, radix), val in zip(self._enc, reversed(mem)):
+            code = code * radix + index[val]
+        return code
+
+    def decode(self, code: int) -> Memory:
+        vals = []
+        for values, radix in self._dec:
+            code, idx = divmod(code, radix)
+            vals.append(values[idx])
+        return tuple(vals)
+
     def dump(self, mem: Memory) -> dict[Reference, Any]:
         return {k: mem[addr] for k, addr in self._addr.items()}
 
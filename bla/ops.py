@@ -3,90 +3,186 @@ from types import CodeType
 import ast
 
 from bla.memory import Reference, MemMap, Memory
-from bla.core import Op, Predicate, FailedAssert, Expr
-
-
-def _assign_mem(mem: Memory, addr: int, value: Any) -> Memory:
-    nv = list(mem)
-    nv[addr] = value
-    return tuple(nv)
-
-
-def mov(mm: MemMap, tgts: Reference | tuple[Reference, ...], expr: Expr) -> Op:
-    match tgts:
-        case Reference() as ref:
-            tpl, refs = False, [ref]
-        case tuple():
-            tpl, refs = True, list(tgts)
-        case _:
-            assert False, f"unexpected targets: {tgts}"
-
-    addrs = [mm.addr(ref) for ref in refs]
-
-    def impl(mem: Memory):
-        res = expr(mem)
-        if tpl:
+from bla.core import Label, Predicate, FailedAssert, Expr
+
+
+class Mov:
+    def __init__(
+        self,
+        mm: MemMap,
+        tgts: Reference | tuple[Reference, ...],
+        expr: Expr,
+        checked: bool = True,
+    ):
+        match tgts:
+            case Reference() as ref:
+                tpl, refs = False, [ref]
+            case tuple():
+                tpl, refs = True, list(tgts)
+            case _:
+                assert False, f"unexpected targets: {tgts}"
+
+        self.mm = mm
+        self.expr = expr
+        self.tpl = tpl
+        self.refs = refs
+        self.addrs = [mm.addr(ref) for ref in refs]
+        # If False, assigned values are known to be in domain, skip validation
+        self.checked = checked
+        # Memory addresses the op reads and writes, `None` if unknown
+        self.reads: frozenset[int] | None = getattr(expr, "reads", None)
+        self.writes = frozenset(self.addrs)
+        self.branches: list[Label | None] = [None]
+
+    def __call__(self, mem: Memory) -> tuple[Label | None, Memory]:
+        res = self.expr(mem)
+        if self.tpl:
             res = list(res)
             assert len(res) == len(
-                refs
-            ), f"unexpected ({len(res)}) many values to unpack (expected {len(refs)})"
+                self.refs
+            ), f"unexpected ({len(res)}) many values to unpack (expected {len(self.refs)})"
         else:
             res = [res]
 
         nm = list(mem)
         try:
-            for addr, var, val in zip(addrs, refs, res):
-                mm.validate(var, val)
+            for addr, var, val in zip(self.addrs, self.refs, res):
+                if self.checked:
+                    self.mm.validate(var, val)
                 nm[addr] = val
         except AssertionError as e:  # TODO: don't rethrow, make MM to throw correct type
             raise FailedAssert(str(e))
         return None, tuple(nm)
 
-    return impl
+
+class MovConst(Mov):
+    """`A = const`"""
+
+    def __init__(self, mm: MemMap, tgt: Reference, value: Any):
+        super().__init__(mm, tgt, Const(value), checked=not mm.type(tgt).accepts(value))
+        self._addr = self.addrs[0]
+        self._value = value
+
+    def __call__(self, mem: Memory) -> tuple[Label | None, Memory]:
+        if self.checked:  # will fail
+            return super().__call__(mem)
+        a = self._addr
+        return None, mem[:a] + (self._value,) + mem[a + 1 :]
 
 
-def cond(pred: Predicate, lbl: str, negate: bool) -> Op:
-    dst = (lbl, None) if negate else (None, lbl)
+class MovCopy(Mov):
+    """`A = B`"""
 
-    def impl(val: Memory):
-        return (dst[pred(val)], val)
+    def __init__(self, mm: MemMap, tgt: Reference, src: Reference):
+        tt, st = mm.type(tgt), mm.type(src)
+        checked = not all(tt.accepts(v) for v in st._domain)
+        super().__init__(mm, tgt, Var(mm.addr(src)), checked=checked)
+        self._addr = self.addrs[0]
+        self._src = mm.addr(src)
 
-    return impl
+    def __call__(self, mem: Memory) -> tuple[Label | None, Memory]:
+        if self.checked:
+            return super().__call__(mem)
+        a = self._addr
+        return None, mem[:a] + (mem[self._src],) + mem[a + 1 :]
 
 
-def goto(lbl: str) -> Op:
-    def impl(val: Memory):
-        return lbl, val
+class Cond:
+    def __init__(self, pred: Predicate, lbl: Label, negate: bool):
+        self.pred = pred
+        self.lbl = lbl
+        self.negate = negate
+        self._dst = (lbl, None) if negate else (None, lbl)
+        self.reads: frozenset[int] | None = getattr(pred, "reads", None)
+        self.writes: frozenset[int] = frozenset()
+        self.branches: list[Label | None] = [None, lbl]
 
-    return impl
+    def __call__(self, val: Memory) -> tuple[Label | None, Memory]:
+        return (self._dst[self.pred(val)], val)
 
 
-def assert_op(pred: Predicate, msg: str):
-    def impl(val: Memory):
-        if not pred(val):
-            raise FailedAssert(msg)
+class Goto:
+    def __init__(self, lbl: Label):
+        self.lbl = lbl
+        self.reads: frozenset[int] | None = frozenset()
+        self.writes: frozenset[int] = frozenset()
+        self.branches: list[Label | None] = [lbl]
+
+    def __call__(self, val: Memory) -> tuple[Label | None, Memory]:
+        return self.lbl, val
+
+
+class Assert:
+    def __init__(self, pred: Predicate, msg: str):
+        self.pred = pred
+        self.msg = msg
+        self.reads: frozenset[int] | None = getattr(pred, "reads", None)
+        self.writes: frozenset[int] = frozenset()
+        self.branches: list[Label | None] = [None]
+
+    def __call__(self, val: Memory) -> tuple[Label | None, Memory]:
+        if not self.pred(val):
+            raise FailedAssert(self.msg)
         return None, val
 
-    return impl
+
+class Const:
+    def __init__(self, value: Any):
+        self.value = value
+        self.src = repr(value)
+        self.reads: frozenset[int] = frozenset()
+
+    def __call__(self, m: Memory) -> Any:
+        return self.value
+
+
+class Var:
+    """`A` or `not A`"""
+
+    def __init__(self, addr: int, negate: bool = False):
+        self.addr = addr
+        self.negate = negate
+        self.src = f"not m[{addr}]" if negate else f"m[{addr}]"
+        self.reads = frozenset([addr])
+
+    def __call__(self, m: Memory) -> Any:
+        return not m[self.addr] if self.negate else m[self.addr]
 
 
 class DereferencerNodeTransformer(ast.NodeTransformer):
     def __init__(self, mm: MemMap, mem_var: str):
         self._mm = mm
         self._mem_var = mem_var
+        self.reads: set[int] = set()
 
-    def visit_Name(self, node: ast.Name) -> ast.expr:
-        addr = self._mm.addr(Reference(node.id))
-        return ast.Subscript(
+    def _deref(self, ref: Reference, node: ast.Name | ast.Subscript) -> ast.expr:
+        addr = self._mm.addr(ref)
+        self.reads.add(addr)
+        deref = ast.Subscript(
             value=ast.Name(id=self._mem_var, ctx=ast.Load()),
             slice=ast.Constant(value=addr),
             ctx=node.ctx,
         )
+        # Takes position of the replaced node, so the AST can be compiled
+        return ast.fix_missing_locations(ast.copy_location(deref, node))
+
+    def visit_Name(self, node: ast.Name) -> ast.expr:
+        return self._deref(Reference(node.id), node)
+
+    def visit_Subscript(self, node: ast.Subscript) -> ast.expr:
+        # `A[index]` with a constant index
+        match node:
+            case ast.Subscript(ast.Name(name), ast.Constant(index)):
+                return self._deref(Reference(f"{name}[{index!r}]"), node)
+        self.generic_visit(node)
+        return node
 
 
 class EvalExpr:
-    def __init__(self, code: CodeType):
+    def __init__(self, code: CodeType, src: str, reads: frozenset[int]):
         self._code = code
+        self.src = src  # dereferenced source, reads memory from `m`
+        self.reads = reads
 
     def __call__(self, m: Memory) -> Any:
         m = m
@@ -94,12 +190,41 @@ class EvalExpr:
 
     @classmethod
     def from_ast(cls, t: ast.expr, mm: MemMap) -> "EvalExpr":
-        deref: ast.Expr = DereferencerNodeTransformer(mm, "m").visit(t)
-        # Doing naive "compile from string" to avoid complex/wrong positioning
-        # filling (lineno etc) in DereferencerNodeTransformer
-        # If it proves to be requires (e.g. better error rendering),
-        # fix DereferencerNodeTransformer and use
-        # >> expression = ast.Expression(deref)
-        # >> code = compile(expression, filename="<bla>", mode="eval")
-        code = compile(ast.unparse(deref), filename="<bla>", mode="eval")
-        return cls(code=code)
+        deref_tr = DereferencerNodeTransformer(mm, "m")
+        deref: ast.expr = deref_tr.visit(t)
+        src = ast.unparse(deref)
+        code = compile(ast.Expression(deref), filename="<bla>", mode="eval")
+        return cls(code=code, src=src, reads=frozenset(deref_tr.reads))
+
+
+class EvalPredicate(EvalExpr):
+    def __call__(self, m: Memory) -> bool:
+        val = eval(self._code)
+        assert isinstance(val, bool)
+        return val
+
+
+class BoundExpr(EvalExpr):
+    """
+    Expression of an instance of a template (see `bla.template`), the code is
+    shared by all instances: it reads memory addresses and values of
+    parameters of the instance from `args`.
+    """
+
+    def __init__(
+        self, code: CodeType, src: str, reads: frozenset[int], args: tuple[Any, ...]
+    ):
+        super().__init__(code=code, src=src, reads=reads)
+        self._args = args
+
+    def __call__(self, m: Memory) -> Any:
+        a = self._args
+        return eval(self._code)
+
+
+class BoundPredicate(BoundExpr, EvalPredicate):
+    def __call__(self, m: Memory) -> bool:
+        a = self._args
+        val = eval(self._code)
+        assert isinstance(val, bool)
+        return val
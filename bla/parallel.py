@@ -0,0 +1,237 @@
+"""
+Parallel level-synchronous BFS.
+
+Every worker process owns a hash partition of the visited set (and parent links
+of its states). Each level, workers expand their own frontier and route
+successors to their owners in batches; owners deduplicate them and form the next
+frontier. The coordinator (the calling process) only synchronizes levels,
+reports progress after each of them and collects the parent chain of the failure
+to rebuild a counterexample.
+
+Workers are forked, so programs (including compiled step functions) are
+inherited rather than pickled; only packed states travel between processes.
+"""
+from typing import Any
+import multiprocessing as mp
+from multiprocessing.queues import Queue
+import pickle
+import queue
+import traceback
+
+from bla.core import State
+from bla.progress import dict_size
+from bla.proofer import ProofCtx, RunFailure, Successor, _expand, _Failed, init_key
+
+_BATCH = 1024
+# Seconds between checks that workers are alive while waiting for them
+_POLL = 1.0
+
+# Set in coordinator before forking workers
+_CTX: ProofCtx | None = None
+
+
+def _owner(key: int, n: int) -> int:
+    return hash((key,)) % n
+
+
+class _Error:
+    """Exception raised in a worker, to re-raise in the coordinator"""
+
+    def __init__(self, exc: BaseException):
+        try:
+            pickle.dumps(exc)
+            self.exc = exc
+        except Exception:
+            self.exc = RuntimeError(repr(exc))
+        self.tb = "".join(traceback.format_exception(exc))
+
+
+class _Worker:
+    def __init__(self, wid: int, inboxes: list[Queue], results: Queue):
+        assert _CTX is not None
+        self.ctx = _CTX
+        self.wid = wid
+        self.n = len(inboxes)
+        self.inboxes = inboxes
+        self.results = results
+        self.parent: dict[int, int | None] = {}
+        self.frontier: list[Successor] = []
+
+    def add(self, key: int, parent: int | None, nxt_progs: list[int] | None) -> None:
+        if key in self.parent:
+            return
+        self.parent[key] = parent
+        self.frontier.append((key, nxt_progs))
+
+    def level(self) -> None:
+        frontier, self.frontier = self.frontier, []
+        out: list[list[tuple[int, int, list[int] | None]]] = [[] for _ in self.inboxes]
+        local = out[self.wid]
+        failure: RunFailure | None = None
+        error: _Error | None = None
+
+        for key, nxt_progs in frontier:
+            try:
+                succs, _ = _expand(self.ctx, key, nxt_progs)
+            except _Failed as f:
+                failure = f.failure
+                break
+            except Exception as e:
+                # Finish the level anyway, other workers wait for it
+                error = _Error(e)
+                break
+            for nxt_key, nxt_nxt_progs in succs:
+                w = _owner(nxt_key, self.n)
+                out[w].append((nxt_key, key, nxt_nxt_progs))
+                if w != self.wid and len(out[w]) >= _BATCH:
+                    self.inboxes[w].put(out[w])
+                    out[w] = []
+
+        for w, batch in enumerate(out):
+            if w != self.wid:
+                if batch:
+                    self.inboxes[w].put(batch)
+                self.inboxes[w].put(None)  # end of level
+
+        for item in local:
+            self.add(*item)
+        ends = 1
+        while ends < self.n:
+            batch = self.inboxes[self.wid].get()
+            if batch is None:
+                ends += 1
+                continue
+            for item in batch:
+                self.add(*item)
+
+        mon = self.ctx.monitor
+        # Unique states, their memory and executed ops of the worker so far
+        totals = (
+            len(self.parent),
+            dict_size(self.parent),
+            list(mon.transitions) if mon is not None else [],
+        )
+        self.results.put(error or (len(self.frontier), failure, totals))
+
+    def serve(self, commands: Queue) -> None:
+        try:
+            while True:
+                cmd, arg = commands.get()
+                match cmd:
+                    case "init":
+                        self.add(arg, None, None)
+                    case "level":
+                        self.level()
+                    case "parent":
+                        self.results.put(self.parent.get(arg))
+                    case "stop":
+                        return
+        except BaseException as e:
+            self.results.put(_Error(e))
+
+
+def _serve(wid: int, inboxes: list[Queue], results: Queue, commands: Queue) -> None:
+    _Worker(wid, inboxes, results).serve(commands)
+
+
+def run_parallel(ctx: ProofCtx, init_state: State, workers: int) -> None:
+    """
+    Explores the state space with `workers` processes.
+    Affects ctx: sets failure, `ctx.parent` only holds the failure's chain.
+    """
+    global _CTX
+    assert ctx.por is None, "Partial-order reduction is not supported with workers"
+    mpc = mp.get_context("fork")
+
+    inboxes = [mpc.Queue() for _ in range(workers)]
+    commands = [mpc.Queue() for _ in range(workers)]
+    results: list[Queue] = [mpc.Queue() for _ in range(workers)]
+
+    _CTX = ctx
+    try:
+        procs = [
+            mpc.Process(
+                target=_serve,
+                args=(w, inboxes, results[w], commands[w]),
+                daemon=True,
+            )
+            for w in range(workers)
+        ]
+        for p in procs:
+            p.start()
+    finally:
+        _CTX = None
+
+    def get(w: int) -> Any:
+        """Result of worker `w`, re-raises its exception"""
+        while True:
+            try:
+                res = results[w].get(timeout=_POLL)
+            except queue.Empty:
+                if not procs[w].is_alive():
+                    raise RuntimeError(
+                        f"Worker {w} exited with code {procs[w].exitcode}"
+                    )
+                continue
+            if isinstance(res, _Error):
+                res.exc.add_note(f"Raised in worker {w}:\n{res.tb}")
+                raise res.exc
+            return res
+
+    def ask(w: int, cmd: str, arg: Any = None) -> Any:
+        commands[w].put((cmd, arg))
+        return get(w)
+
+    mon = ctx.monitor
+    # States expanded by workers, in the last frontier and at its depth
+    expanded, frontier, depth = 0, 1, 0
+    unique = memory = 0
+
+    def stats() -> dict[str, int]:
+        return dict(unique=unique, queue=frontier, depth=depth, memory=memory)
+
+    try:
+        key = init_key(ctx, init_state)
+        commands[_owner(key, workers)].put(("init", key))
+
+        while True:
+            for c in commands:
+                c.put(("level", None))
+            reports = [get(w) for w in range(workers)]
+            expanded += frontier
+            frontier = sum(n for n, _, _ in reports)
+            depth += 1
+            if mon is not None:
+                unique = sum(t[0] for _, _, t in reports)
+                memory = sum(t[1] for _, _, t in reports)
+                mon.transitions[:] = map(sum, zip(*(t[2] for _, _, t in reports)))
+                mon.poll(expanded, **stats())
+            failures = [f for _, f, _ in reports if f is not None]
+            if failures:
+                # Pick deterministically among failures of the same level
+                ctx.failure = min(
+                    failures, key=lambda f: (ctx.codec.encode(f.state), f.prog_idx)
+                )
+                break
+            if not frontier:
+                break
+        if mon is not None:
+            mon.report(expanded, done=True, **stats())
+
+        if ctx.failure is not None:
+            key = ctx.codec.encode(ctx.failure.state)
+            while True:
+                parent = ask(_owner(key, workers), "parent", key)
+                ctx.parent[key] = parent
+                if parent is None:
+                    break
+                key = parent
+    finally:
+        for c in commands:
+            c.put(("stop", None))
+        for p in procs:
+            # Workers may be stuck in a level another worker didn't finish
+            p.join(timeout=_POLL)
+            if p.is_alive():
+                p.terminate()
+                p.join()
@@ -1,11 +1,14 @@
-from typing import Callable, Any
+from typing import Callable, Any, TYPE_CHECKING
 import ast, inspect
 from dataclasses import dataclass, field
 
-from bla import ops
+from bla import ops, ranges
 from bla.memory import MemMap, Reference, Memory
 from bla.core import Prog, Op, Label, Predicate, Sentinel
 
+if TYPE_CHECKING:
+    from bla.template import Template, Instance
+
 
 class BlaSyntaxError(SyntaxError):
     def __init__(self, msg: str, filename: str, lineno: int, offset: int, text: str):
@@ -24,6 +27,9 @@ class _ParseCtx:
     )  # maps from state.pos to src line
     _nxt_label: int = 0
     _atomic_context: bool = False
+    # Set when parsing an instance of the template, see `bla.template`
+    template: "Template | None" = None
+    params: dict[str, Any] = field(default_factory=dict)
 
     _break_lbls: list[Label] = field(default_factory=list)
     _continue_lbls: list[Label] = field(default_factory=list)
@@ -34,7 +40,42 @@ class _ParseCtx:
         self.mm.addr(ref)
         return ref
 
-    def lineno(self, node: ast.stmt) -> int:
+    def index(self, t: ast.expr) -> Any:
+        """Value of the index of `var[index]`, may only refer to parameters"""
+        try:
+            if self.template is not None:
+                return self.template.index(t, self.params)
+            return ast.literal_eval(t)
+        except (ValueError, NameError):
+            raise self.syntax_err(
+                "Index must be a constant (or an expression of parameters)", t
+            )
+
+    def var(self, t: ast.expr) -> Reference | None:
+        """Variable `A` or `A[index]`, `None` if it's not one"""
+        match t:
+            case ast.Name(name) if name not in self.params:
+                return self.ref(name)
+            case ast.Subscript(ast.Name(name), index):
+                return self.ref(f"{name}[{self.index(index)!r}]")
+        return None
+
+    def const(self, t: ast.expr) -> tuple[bool, Any]:
+        """Whether `t` is a constant or a parameter, and its value"""
+        match t:
+            case ast.Constant(value):
+                return True, value
+            case ast.Name(name) if name in self.params:
+                return True, self.params[name]
+        return False, None
+
+    def expr(self, t: ast.expr, cls: type[ops.EvalExpr]) -> ops.EvalExpr:
+        if self.template is not None:
+            # Shares code with other instances
+            return self.template.expr(t, cls, self)
+        return cls.from_ast(t, self.mm)
+
+    def lineno(self, node: ast.stmt | ast.expr) -> int:
         return node.lineno - self.line_offset
 
     def uniq_label(self) -> str:
@@ -49,7 +90,7 @@ class _ParseCtx:
         self.stmts.append(op)
         self.line_mapping.append(self.lineno(node))
 
-    def syntax_err(self, msg: str, node: ast.stmt) -> BlaSyntaxError:
+    def syntax_err(self, msg: str, node: ast.stmt | ast.expr) -> BlaSyntaxError:
         lines = self.src.split("\n")
         lineno = self.lineno(node)
         text = lines[lineno] if 0 <= lineno < len(lines) else ast.unparse(node)
@@ -65,44 +106,54 @@ class _ParseCtx:
 
 
 def _parse_predicate(t: ast.expr, ctx: _ParseCtx) -> Predicate:
-    # TODO: use shorthand for `const` and `A`
-    #  to avoid costly(?) expressions eval
-    expr = ops.EvalExpr.from_ast(t, ctx.mm)
-
-    def pred(mem: Memory) -> bool:  # TODO: move somewhere
-        val = expr(mem)
-        assert isinstance(val, bool)
-        return val
-
-    return pred
+    # Shorthands for `const`, `A` and `not A` to avoid expressions eval
+    is_const, value = ctx.const(t)
+    if is_const and isinstance(value, bool):
+        return ops.Const(value)
+    match t:
+        case ast.UnaryOp(ast.Not(), operand) if (ref := ctx.var(operand)):
+            return ops.Var(ctx.mm.addr(ref), negate=True)
+        case _ if (ref := ctx.var(t)) and all(
+            isinstance(v, bool) for v in ctx.mm.type(ref)._domain
+        ):
+            return ops.Var(ctx.mm.addr(ref))
+    return ctx.expr(t, ops.EvalPredicate)
 
 
 def _parse_assign(t: ast.Assign, ctx: _ParseCtx):
     if len(t.targets) != 1:
         raise ctx.syntax_err("Assignments in form 'a=b=c' are not supported", t)
 
-    # TODO: use shorthand for `A = const` and `A = B`
-    #  to avoid costly(?) expressions eval
-    expr = ops.EvalExpr.from_ast(t.value, ctx.mm)
     err = ctx.syntax_err('Only "flat" assignments are supported', t)
 
-    tgts: Reference | tuple[Reference, ...] | None = None
+    # Shorthands for `A = const` and `A = B` to avoid expressions eval
+    tgt = ctx.var(t.targets[0])
+    is_const, value = ctx.const(t.value)
+    if tgt is not None and is_const:
+        ctx.add_op(ops.MovConst(ctx.mm, tgt, value), t)
+        return
+    src = ctx.var(t.value)
+    if tgt is not None and src is not None:
+        ctx.add_op(ops.MovCopy(ctx.mm, tgt, src), t)
+        return
+
+    expr = ctx.expr(t.value, ops.EvalExpr)
+
+    tgts: Reference | tuple[Reference, ...] | None = tgt
     match t.targets[0]:
-        case ast.Name(name):
-            tgts = ctx.ref(name)
         case ast.Tuple():
             refs = []
             for el in t.targets[0].elts:
-                match el:
-                    case ast.Name(name):
-                        refs.append(ctx.ref(name))
-                    case _:
-                        raise err
+                ref = ctx.var(el)
+                if ref is None:
+                    raise err
+                refs.append(ref)
             if refs:
                 tgts = tuple(refs)
     if not tgts:
         raise err
-    ctx.add_op(ops.mov(ctx.mm, tgts, expr), t)
+    checked = not ranges.in_domain(ctx.mm, tgts, expr)
+    ctx.add_op(ops.Mov(ctx.mm, tgts, expr, checked=checked), t)
 
 
 def _parse_if(t: ast.If, ctx: _ParseCtx):
@@ -112,14 +163,14 @@ def _parse_if(t: ast.If, ctx: _ParseCtx):
 
     else_lbl = ctx.uniq_label()
     pred = _parse_predicate(t.test, ctx)
-    if_op = ops.cond(pred, else_lbl, negate=True)
+    if_op = ops.Cond(pred, else_lbl, negate=True)
 
     ctx.add_op(if_op, t)
     _parse_body(t.body, ctx)
 
     if t.orelse:  # if: ... else: ...
         end_lbl = ctx.uniq_label()
-        ctx.add_op(ops.goto(end_lbl), t.body[-1])
+        ctx.add_op(ops.Goto(end_lbl), t.body[-1])
 
         ctx.add_sentinel(else_lbl)
         _parse_body(t.orelse, ctx)
@@ -140,13 +191,13 @@ def _parse_while(t: ast.While, ctx: _ParseCtx):
     end_lbl = ctx.uniq_label()
 
     ctx.add_sentinel(begin_lbl)
-    ctx.add_op(ops.cond(pred, end_lbl, negate=True), t)
+    ctx.add_op(ops.Cond(pred, end_lbl, negate=True), t)
 
     ctx._continue_lbls.append(begin_lbl)
     ctx._break_lbls.append(end_lbl)
 
     _parse_body(t.body, ctx)
-    ctx.add_op(ops.goto(begin_lbl), t)
+    ctx.add_op(ops.Goto(begin_lbl), t)
     ctx.add_sentinel(end_lbl)
 
     ctx._break_lbls.pop()
@@ -184,25 +235,25 @@ def _parse_atomic_context(body: list[ast.stmt], ctx: _ParseCtx):
 def _parse_assert(t: ast.Assert, ctx: _ParseCtx):
     msg = ast.unparse(t)
     pred = _parse_predicate(t.test, ctx)
-    ctx.add_op(ops.assert_op(pred, msg=msg), t)
+    ctx.add_op(ops.Assert(pred, msg=msg), t)
 
 
 def _parse_break(t: ast.Break, ctx: _ParseCtx):
     if not ctx._break_lbls:
         raise ctx.syntax_err("'break' outside loop", t)
-    ctx.add_op(ops.goto(ctx._break_lbls[-1]), t)
+    ctx.add_op(ops.Goto(ctx._break_lbls[-1]), t)
 
 
 def _parse_continue(t: ast.Continue, ctx: _ParseCtx):
     if not ctx._continue_lbls:
         raise ctx.syntax_err("'continue' outside loop", t)
-    ctx.add_op(ops.goto(ctx._continue_lbls[-1]), t)
+    ctx.add_op(ops.Goto(ctx._continue_lbls[-1]), t)
 
 
 def _parse_return(t: ast.Return, ctx: _ParseCtx):
     if t.value:
         raise ctx.syntax_err("'return' can not be used with value", t)
-    ctx.add_op(ops.goto(ctx._end_lbl), t)
+    ctx.add_op(ops.Goto(ctx._end_lbl), t)
 
 
 def _parse_stmt(t: ast.stmt, ctx: _ParseCtx):
@@ -240,7 +291,11 @@ def _check_empty_args(args: ast.arguments) -> None:
         raise Exception(f"Expected no arguments, got {args.__dict__}")
 
 
-def parse_program(f: Callable, mm: MemMap) -> Prog:
+def parse_program(f: "Callable | Instance", mm: MemMap) -> Prog:
+    from bla.template import Instance
+
+    if isinstance(f, Instance):
+        return f.parse(mm)
     src = inspect.getsource(f)
     t = ast.parse(src)
     match t.body:
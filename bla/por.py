@@ -0,0 +1,84 @@
+"""
+Partial-order reduction: ample sets built from static read/write sets of ops.
+
+In a state where some program `p` is about to run an op `t` that
+ * is not part of an atomic block,
+ * is independent of every op other programs can still reach (from their current
+   positions): neither writes what the other reads or writes,
+it's enough to only explore `t` from that state. Any path where other programs
+go first can be reordered to run `t` first; `t` doesn't affect whether their ops
+fail. If `t` fails itself, that failure is found right away.
+
+The explorer is responsible for the cycle proviso: reduced expansion that leads back
+into already visited states has to be replaced by full expansion (see `_run`),
+otherwise `t`s of a cycle could postpone other programs forever.
+"""
+from bla.memory import MemMap
+from bla.core import Prog
+
+
+class AmpleSets:
+    def __init__(self, progs: list[Prog], mm: MemMap):
+        self._n_ops = [len(p.ops) for p in progs]
+        everything = (1 << len(mm.init())) - 1
+
+        def mask(addrs: frozenset[int] | None) -> int:
+            if addrs is None:
+                return everything
+            return sum(1 << a for a in addrs)
+
+        self._reads = [
+            [mask(getattr(op, "reads", None)) for op in p.ops] for p in progs
+        ]
+        self._writes = [
+            [mask(getattr(op, "writes", None)) for op in p.ops] for p in progs
+        ]
+
+        # Union of reads/writes of all ops reachable from the position
+        self._future_reads: list[list[int]] = []
+        self._future_writes: list[list[int]] = []
+        self._candidate: list[list[bool]] = []
+        for ip, p in enumerate(progs):
+            fr, fw = [], []
+            for k in range(len(p.ops)):
+                reach = self._reachable(p, k)
+                fr.append(self._union(self._reads[ip], reach))
+                fw.append(self._union(self._writes[ip], reach))
+            self._future_reads.append(fr)
+            self._future_writes.append(fw)
+
+            self._candidate.append([not a for a in p.atomic])
+
+    @staticmethod
+    def _reachable(prog: Prog, pos: int) -> set[int]:
+        seen, todo = {pos}, [pos]
+        while todo:
+            for nxt in prog.successors(todo.pop()):
+                if nxt < len(prog.ops) and nxt not in seen:
+                    seen.add(nxt)
+                    todo.append(nxt)
+        return seen
+
+    @staticmethod
+    def _union(masks: list[int], idx: set[int]) -> int:
+        res = 0
+        for i in idx:
+            res |= masks[i]
+        return res
+
+    def ample(self, pos: tuple[int, ...]) -> list[int] | None:
+        """Returns single program to expand in state with given positions, if any"""
+        n_ops = self._n_ops
+        for p, k in enumerate(pos):
+            if k >= n_ops[p] or not self._candidate[p][k]:
+                continue
+            r, w = self._reads[p][k], self._writes[p][k]
+            for q, j in enumerate(pos):
+                if q == p or j >= n_ops[q]:
+                    continue
+                fw = self._future_writes[q][j]
+                if w & (self._future_reads[q][j] | fw) or r & fw:
+                    break
+            else:
+                return [p]
+        return None
@@ -0,0 +1,303 @@
+"""
+Persistent cache of parsed and compiled programs.
+
+Parsing a program takes `inspect.getsource`, `ast.parse`, a compilation and a
+range analysis (see `bla.ranges`) per expression, and compiling its step
+function (see `bla.compile`) one more `compile()`. For small models that's most
+of the time of a proof. `ProgramCache` keeps both in a directory:
+
+- programs (ops, labels, line mapping and source, code objects of expressions
+  marshalled) keyed by the code object of the function, a hash of its file,
+  the memory layout and the version of bla, so the source is read but not
+  parsed on a hit. Hashing the whole file rather than the function's source
+  (`inspect.getsource` tokenizes the file) is cheaper, but any edit of the
+  file invalidates all of its programs;
+- code objects of step functions keyed by their generated source.
+
+Opt-in, see `bla.ux.proof` (`program_cache=` or `BLA_PROGRAM_CACHE`
+environment variable). Programs with ops of unknown types aren't cached.
+Entries are touched when used, unused ones are evicted with:
+
+    python -m bla.progcache [--dir DIR] list
+    python -m bla.progcache [--dir DIR] evict (--all | --older-than DAYS)
+"""
+from hashlib import sha256
+from types import CodeType
+from typing import Any, Callable
+import argparse
+import marshal
+import os
+import pickle
+import sys
+import time
+
+from bla import ops
+from bla.cache import bla_version
+from bla.core import Prog, Sentinel
+from bla.memory import MemMap, Reference
+from bla.parse import _ParseCtx, PrettyProg, parse_program
+from bla.template import Instance
+
+ENV = "BLA_PROGRAM_CACHE"
+_FORMAT = 2
+# Marshalled code is specific to the interpreter version
+_TAG = sys.implementation.cache_tag
+
+
+class _Unknown(Exception):
+    """Op or expression that can't be cached"""
+
+
+def _expr(e: Any) -> tuple:
+    match e:
+        case ops.Const():
+            return ("const", e.value)
+        case ops.Var():
+            return ("var", e.addr, e.negate)
+        case ops.BoundExpr():
+            code = marshal.dumps(e._code)
+            pred = isinstance(e, ops.EvalPredicate)
+            return ("bound", pred, code, e.src, sorted(e.reads), e._args)
+        case ops.EvalExpr():
+            code = marshal.dumps(e._code)
+            pred = isinstance(e, ops.EvalPredicate)
+            return ("eval", pred, code, e.src, sorted(e.reads))
+    raise _Unknown(e)
+
+
+def _load_expr(desc: tuple) -> Any:
+    match desc:
+        case ("const", value):
+            return ops.Const(value)
+        case ("var", addr, negate):
+            return ops.Var(addr, negate)
+        case ("bound", pred, code, src, reads, args):
+            bound = ops.BoundPredicate if pred else ops.BoundExpr
+            return bound(marshal.loads(code), src, frozenset(reads), args)
+        case ("eval", pred, code, src, reads):
+            evaluated = ops.EvalPredicate if pred else ops.EvalExpr
+            return evaluated(marshal.loads(code), src, frozenset(reads))
+    assert False, f"Unexpected expression {desc}"
+
+
+def _op(op: Any) -> tuple:
+    # Subclasses first
+    match op:
+        case ops.MovConst():
+            return ("mov_const", op.refs[0].name, op._value)
+        case ops.MovCopy():
+            src = next(ref for ref, a in op.mm._addr.items() if a == op._src)
+            return ("mov_copy", op.refs[0].name, src.name)
+        case ops.Mov():
+            names = [ref.name for ref in op.refs]
+            return ("mov", names if op.tpl else names[0], _expr(op.expr), op.checked)
+        case ops.Cond():
+            return ("cond", _expr(op.pred), op.lbl, op.negate)
+        case ops.Goto():
+            return ("goto", op.lbl)
+        case ops.Assert():
+            return ("assert", _expr(op.pred), op.msg)
+    raise _Unknown(op)
+
+
+def _load_op(desc: tuple, mm: MemMap) -> Any:
+    match desc:
+        case ("mov_const", name, value):
+            return ops.MovConst(mm, Reference(name), value)
+        case ("mov_copy", name, src):
+            return ops.MovCopy(mm, Reference(name), Reference(src))
+        case ("mov", list() as names, expr, checked):
+            tgts = tuple(Reference(n) for n in names)
+            return ops.Mov(mm, tgts, _load_expr(expr), checked)
+        case ("mov", str() as name, expr, checked):
+            return ops.Mov(mm, Reference(name), _load_expr(expr), checked)
+        case ("cond", pred, lbl, negate):
+            return ops.Cond(_load_expr(pred), lbl, negate)
+        case ("goto", lbl):
+            return ops.Goto(lbl)
+        case ("assert", pred, msg):
+            return ops.Assert(_load_expr(pred), msg)
+    assert False, f"Unexpected op {desc}"
+
+
+def describe(prog: Prog) -> dict[str, Any]:
+    """Picklable description of a parsed program, raises `_Unknown`"""
+    ctx: _ParseCtx = getattr(prog, "ctx")
+    stmts: list[Any] = []
+    for stmt in ctx.stmts:
+        match stmt:
+            case str():
+                stmts.append(stmt)
+            case Sentinel():
+                # Values are `object()`s, they don't survive pickling
+                stmts.append(("sentinel", stmt.name))
+            case _:
+                stmts.append(_op(stmt))
+    return dict(
+        name=ctx.prog_name,
+        src=ctx.src,
+        line_offset=ctx.line_offset,
+        line_mapping=ctx.line_mapping,
+        params=ctx.params,
+        stmts=stmts,
+    )
+
+
+def load(desc: dict[str, Any], mm: MemMap) -> Prog:
+    """Program of `describe`"""
+    stmts: list[Any] = []
+    for s in desc["stmts"]:
+        match s:
+            case str():
+                stmts.append(s)
+            case ("sentinel", name):
+                stmts.append(Sentinel[name])
+            case _:
+                stmts.append(_load_op(s, mm))
+    ctx = _ParseCtx(
+        prog_name=desc["name"],
+        src=desc["src"],
+        mm=mm,
+        line_offset=desc["line_offset"],
+        stmts=stmts,
+        line_mapping=desc["line_mapping"],
+        params=desc["params"],
+    )
+    return PrettyProg(ctx)
+
+
+class ProgramCache:
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def _path(self, key: str, kind: str) -> str:
+        return os.path.join(self.directory, f"{key}.{kind}{_FORMAT}")
+
+    def _read(self, path: str) -> bytes | None:
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        os.utime(path)  # used, see `evict`
+        return data
+
+    def _write(self, path: str, data: bytes) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = path + f".{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def _key(self, f: Callable | Instance, mm: MemMap) -> str | None:
+        fn, args = (f.template.fn, f.args) if isinstance(f, Instance) else (f, ())
+        code = getattr(fn, "__code__", None)
+        if code is None:
+            return None
+        try:
+            with open(code.co_filename, "rb") as src:
+                file_hash = sha256(src.read()).hexdigest()
+        except OSError:
+            return None
+        layout = [
+            (ref.name, repr(t._values), repr(t.init()))
+            for ref, t in zip(mm._addr, mm._types)
+        ]
+        desc = (
+            _FORMAT,
+            _TAG,
+            bla_version(),
+            marshal.dumps(code),
+            file_hash,
+            args,
+            layout,
+        )
+        return sha256(repr(desc).encode()).hexdigest()
+
+    def program(self, f: Callable | Instance, mm: MemMap) -> Prog:
+        """Parsed program `f`, see `parse_program`"""
+        key = self._key(f, mm)
+        if key is None:
+            return parse_program(f, mm)
+        path = self._path(key, "prog")
+        data = self._read(path)
+        if data is not None:
+            try:
+                return load(pickle.loads(data), mm)
+            except (EOFError, pickle.UnpicklingError, ValueError):
+                pass  # corrupted, parse again
+        prog = parse_program(f, mm)
+        try:
+            desc = describe(prog)
+        except _Unknown:
+            return prog
+        self._write(path, pickle.dumps(desc, protocol=pickle.HIGHEST_PROTOCOL))
+        return prog
+
+    def code(self, src: str, filename: str) -> CodeType:
+        """Code object of a module `src`, see `compile_prog`"""
+        key = sha256(f"{_TAG}\0{filename}\0{src}".encode()).hexdigest()
+        path = self._path(key, "code")
+        data = self._read(path)
+        if data is not None:
+            try:
+                return marshal.loads(data)
+            except (EOFError, ValueError, TypeError):
+                pass
+        code = compile(src, filename=filename, mode="exec")
+        self._write(path, marshal.dumps(code))
+        return code
+
+    def entries(self) -> list[str]:
+        """Paths of cached programs and step functions"""
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        kinds = (f".prog{_FORMAT}", f".code{_FORMAT}")
+        return sorted(
+            os.path.join(self.directory, n) for n in names if n.endswith(kinds)
+        )
+
+    def evict(self, unused_for: float = 0) -> int:
+        """Removes entries unused for `unused_for` seconds, returns their number"""
+        deadline = time.time() - unused_for
+        n = 0
+        for path in self.entries():
+            try:
+                if os.stat(path).st_mtime <= deadline:
+                    os.remove(path)
+                    n += 1
+            except FileNotFoundError:
+                pass
+        return n
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m bla.progcache")
+    parser.add_argument("--dir", help=f"cache directory (${ENV})")
+    cmds = parser.add_subparsers(dest="cmd", required=True)
+    cmds.add_parser("list", help="print the number and size of entries")
+    evict = cmds.add_parser("evict", help="remove entries")
+    which = evict.add_mutually_exclusive_group(required=True)
+    which.add_argument("--all", action="store_true")
+    which.add_argument("--older-than", type=float, metavar="DAYS", help="unused for")
+    args = parser.parse_args(argv)
+
+    directory = args.dir or os.environ.get(ENV)
+    if not directory:
+        parser.error(f"--dir or ${ENV} is required")
+    pc = ProgramCache(directory)
+    match args.cmd:
+        case "list":
+            paths = pc.entries()
+            size = sum(os.path.getsize(p) for p in paths)
+            print(f"{len(paths)} entries, {size / 1024:.1f} KiB in {directory}")
+        case "evict":
+            n = pc.evict(0 if args.all else args.older_than * 86400)
+            print(f"Evicted {n} entries")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+"""
+Progress reporting of long explorations.
+
+An `Observer` passed to `run_proof` is called periodically (every
+`every_states` expanded states or `every_seconds`, whichever comes first) and
+once at the end with `Stats` of the exploration. Built-in observers:
+`StderrProgress` (a status line) and `JsonLines` (one JSON object per report).
+
+Engines poll the `Monitor` every few hundred states, without an observer
+attached the only overhead is a counter.
+"""
+from typing import IO, Any, Callable, TYPE_CHECKING
+from dataclasses import dataclass, asdict
+import json
+import sys
+import time
+
+from bla.core import Step
+from bla.memory import Memory
+
+if TYPE_CHECKING:
+    from bla.visited import PackedMap
+
+
+@dataclass(frozen=True)
+class Stats:
+    expanded: int  # states expanded
+    unique: int  # distinct states seen
+    queue: int  # states waiting to be expanded (BFS queue, DFS stack)
+    depth: int  # current BFS level, DFS stack depth
+    elapsed: float  # seconds
+    rate: float  # expanded states per second
+    memory: int  # approximate size of visited states storage, bytes
+    transitions: list[int]  # ops executed per program
+    done: bool = False
+
+
+class Observer:
+    every_states: int = 100_000
+    every_seconds: float = 1.0
+
+    def __call__(self, stats: Stats) -> None:
+        raise NotImplementedError()
+
+
+class StderrProgress(Observer):
+    """Status line on stderr, rewritten on every report"""
+
+    def __init__(self, every_seconds: float = 1.0, file: IO[str] | None = None):
+        self.every_seconds = every_seconds
+        self.file = file or sys.stderr
+
+    def __call__(self, stats: Stats) -> None:
+        line = (
+            f"{stats.expanded:,} expanded, {stats.unique:,} unique, "
+            f"queue {stats.queue:,}, depth {stats.depth}, "
+            f"{stats.rate:,.0f} states/s, ~{stats.memory / 2**20:,.1f} MiB, "
+            f"{stats.elapsed:.1f}s"
+        )
+        end = "\n" if stats.done else ""
+        print(f"\r{line}", end=end, file=self.file, flush=True)
+
+
+class JsonLines(Observer):
+    """A JSON object per report, e.g. for dashboards"""
+
+    def __init__(
+        self,
+        file: IO[str] | None = None,
+        every_states: int = 100_000,
+        every_seconds: float = 1.0,
+    ):
+        self.file = file or sys.stderr
+        self.every_states = every_states
+        self.every_seconds = every_seconds
+
+    def __call__(self, stats: Stats) -> None:
+        print(json.dumps(asdict(stats)), file=self.file, flush=True)
+
+
+class BudgetExceeded(Exception):
+    pass
+
+
+class StateBudget(Observer):
+    """
+    Stops the exploration (raises `BudgetExceeded`) once it has seen more than
+    `max_states` unique states, reports are passed on to `observer`
+    """
+
+    every_states = 1000
+
+    def __init__(self, max_states: int, observer: Callable[[Stats], None] | None):
+        self.max_states = max_states
+        self.observer = observer
+        if observer is not None:
+            self.every_seconds = getattr(observer, "every_seconds", self.every_seconds)
+
+    def __call__(self, stats: Stats) -> None:
+        if self.observer is not None:
+            self.observer(stats)
+        if stats.unique > self.max_states:
+            raise BudgetExceeded(f"More than {self.max_states:,} states")
+
+
+class Monitor:
+    """Throttles reports of an engine to the observer"""
+
+    def __init__(self, observer: Callable[[Stats], None], n_progs: int):
+        self.observer = observer
+        self.every_states = getattr(observer, "every_states", Observer.every_states)
+        self.every_seconds = getattr(observer, "every_seconds", Observer.every_seconds)
+        # How often engines call `poll`
+        self.poll_every = max(1, min(self.every_states, 256))
+        self.transitions = [0] * n_progs
+        self.start = self._last_time = time.monotonic()
+        self._last_states = 0
+
+    def count(self, ip: int, step: Step) -> Step:
+        """Wraps step of program `ip` to count executed ops"""
+        transitions = self.transitions
+
+        def counted(pos: int, m: Memory) -> tuple[int, Memory, bool]:
+            transitions[ip] += 1
+            return step(pos, m)
+
+        return counted
+
+    def poll(self, expanded: int, **kw: Any) -> None:
+        now = time.monotonic()
+        if (
+            expanded - self._last_states >= self.every_states
+            or now - self._last_time >= self.every_seconds
+        ):
+            self.report(expanded, **kw)
+
+    def report(
+        self,
+        expanded: int,
+        unique: int,
+        queue: int,
+        depth: int,
+        memory: int,
+        done: bool = False,
+    ) -> None:
+        now = time.monotonic()
+        elapsed = now - self.start
+        self._last_time, self._last_states = now, expanded
+        self.observer(
+            Stats(
+                expanded=expanded,
+                unique=unique,
+                queue=queue,
+                depth=depth,
+                elapsed=elapsed,
+                rate=expanded / elapsed if elapsed > 0 else 0.0,
+                memory=memory,
+                transitions=list(self.transitions),
+                done=done,
+            )
+        )
+
+
+def dict_size(d: "dict[int, Any] | set[int] | PackedMap") -> int:
+    """Approximate size of a dict (`ProofCtx.parent`) or set of ints, bytes"""
+    if not isinstance(d, (dict, set)):
+        return d.nbytes()
+    if not d:
+        return sys.getsizeof(d)
+    key = next(iter(d))
+    per_item = 2 if isinstance(d, dict) else 1
+    return sys.getsizeof(d) + len(d) * per_item * sys.getsizeof(key)
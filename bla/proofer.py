@@ -1,8 +1,20 @@
-from bla.memory import MemMap
-from bla.core import State, FailedAssert, Prog
+from bla.memory import MemMap, Memory
+from bla.core import State, FailedAssert, Prog, Step
+from bla.codec import StateCodec
+from bla.compile import compile_prog
+from bla.por import AmpleSets
+from bla.symmetry import Symmetry, Canonizer
+from bla.progress import Monitor, Observer, Stats, dict_size
+from bla.visited import KeyMap, PackedMap
+from typing import Any, Callable, Generator, TYPE_CHECKING
 from dataclasses import dataclass, field
 from collections import deque
 
+if TYPE_CHECKING:
+    from bla.liveness import Liveness
+    from bla.lineprof import Profiler
+    from bla.progcache import ProgramCache
+
 
 @dataclass(frozen=True)
 class RunFailure:
@@ -11,12 +23,212 @@ class RunFailure:
     error: FailedAssert
 
 
+# Parent of every explored state, `None` for the initial one
+Parents = KeyMap | PackedMap
+
+
 @dataclass
 class ProofCtx:
     progs: list[Prog]
     mm: MemMap
-    parent: dict[State, State | None] = field(default_factory=dict)
+    # Keys are states packed by `codec`, see `StateCodec`; a `PackedMap` if
+    # they fit 64 bits
+    parent: Parents = field(default_factory=KeyMap)
     failure: RunFailure | None = None
+    # Failures of distinct asserts, the first one is `failure`; collected up
+    # to `max_failures` (see `run_proof`), otherwise empty
+    failures: list[RunFailure] = field(default_factory=list)
+    max_failures: int = 1
+    # Transition functions, one per prog; `Prog.run` unless compiled
+    steps: list[Step] = field(default_factory=list)
+    por: AmpleSets | None = None
+    symmetry: list[Symmetry] = field(default_factory=list)
+    # Set if `symmetry` is declared, states in `parent` are canonical
+    canonizer: Canonizer | None = field(init=False)
+    codec: StateCodec = field(init=False)
+    all_progs: list[int] = field(init=False)
+    n_ops: list[int] = field(init=False)
+    # Estimated probability that some reachable state wasn't explored,
+    # non-zero only for approximate modes
+    omission: float = 0.0
+    # Counterexample of a liveness property: steps (state, prog), the last one
+    # leads back to the state of `lasso[loop]`
+    lasso: list[tuple[int, int]] = field(default_factory=list)
+    loop: int = 0
+    # Persisted transition tables per prog (`None` if not cached),
+    # see `bla.incremental`
+    trans: list[dict[int, int] | None] = field(default_factory=list)
+    # Reports progress to an observer, see `bla.progress`
+    monitor: Monitor | None = None
+    # Attributes executed ops and produced states to source lines,
+    # see `bla.lineprof`
+    profiler: "Profiler | None" = None
+
+    def __post_init__(self):
+        self.codec = StateCodec(self.progs, self.mm)
+        if not self.parent and self.codec.size < PackedMap.LIMIT:
+            self.parent = PackedMap()
+        self.canonizer = None
+        if self.symmetry:
+            self.canonizer = Canonizer(self.symmetry, self.progs, self.mm, self.codec)
+        if not self.steps:
+            self.steps = [p.run for p in self.progs]
+        self.all_progs = list(range(len(self.progs)))
+        self.n_ops = [len(p.ops) for p in self.progs]
+
+
+class _Failed(Exception):
+    def __init__(self, failure: RunFailure):
+        self.failure = failure
+
+
+# Successor state and programs allowed to run from it (`None` for all)
+Successor = tuple[int, list[int] | None]
+
+
+def _schedule(
+    ctx: ProofCtx, pos: tuple[int, ...], nxt_progs: list[int] | None
+) -> tuple[list[int], bool]:
+    """Programs to expand in the state and whether it's a reduced set"""
+    if nxt_progs is not None:
+        return nxt_progs, False
+    if ctx.por is not None:
+        ample = ctx.por.ample(pos)
+        if ample is not None:
+            return ample, True
+    return ctx.all_progs, False
+
+
+# Decoded state: (pos code, memory code, pos, memory), see `StateCodec`
+Decoded = tuple[int, int, tuple[int, ...], Memory]
+
+
+def _decode(ctx: ProofCtx, key: int) -> Decoded:
+    pos_code, mem_code = ctx.codec.unpack(key)
+    return (
+        pos_code,
+        mem_code,
+        ctx.codec.unpack_pos(pos_code),
+        ctx.codec.decode_mem(mem_code),
+    )
+
+
+def _macro(step: Step, pos: int, val: Memory) -> tuple[int, Memory, bool]:
+    """
+    Runs op at `pos` and, if it enters an atomic block, the rest of the block:
+    intermediate states can't interleave with other programs, so they're not
+    stored. Returns `atomic=True` only if the block never exits (loops), then
+    the state to continue from inside of the block.
+    """
+    npos, nv, atomic = step(pos, val)
+    # Brent's cycle detection
+    saved, length, power = (npos, nv), 0, 1
+    while atomic:
+        npos, nv, atomic = step(npos, nv)
+        if saved == (npos, nv):
+            break
+        length += 1
+        if length == power:
+            saved, length, power = (npos, nv), 0, power * 2
+    return npos, nv, atomic
+
+
+def atomic_states(
+    ctx: ProofCtx, state: State, ip: int, until: State | None
+) -> list[State]:
+    """
+    Breaks a macro step (see `_macro`) of program `ip` from `state` to `until`
+    (to the failure if `None`) into states the program runs an op from.
+    """
+    res = [state]
+    while True:
+        p = state.pos[ip]
+        try:
+            npos, nv, atomic = ctx.steps[ip](p, state.val)
+        except FailedAssert:
+            assert until is None, "Unexpected failure"
+            return res
+        state = State(state.pos[:ip] + (npos,) + state.pos[ip + 1 :], nv)
+        if state == until or not atomic:
+            return res
+        res.append(state)
+
+
+def _step(ctx: ProofCtx, state: Decoded, ip: int) -> Successor | None:
+    """
+    Runs one (macro) step of program `ip`, returns `None` if it has halted.
+    Raises `_Failed` on assert failure.
+    """
+    pos_code, mem_code, pos, val = state
+    p = pos[ip]
+    if p >= ctx.n_ops[ip]:
+        return None
+
+    codec = ctx.codec
+    table = ctx.trans[ip] if ctx.trans else None
+    n = ctx.n_ops[ip]
+    if table is not None and (t := table.get(mem_code * n + p)) is not None:
+        # Known transition, see `bla.incremental`
+        t, atomic = divmod(t, 2)
+        nxt_mem_code, npos = divmod(t, n + 1)
+        nv = codec.decode_mem(nxt_mem_code) if ctx.canonizer is not None else val
+    else:
+        try:
+            npos, nv, atomic = _macro(ctx.steps[ip], p, val)
+        except FailedAssert as fa:
+            raise _Failed(RunFailure(State(pos, val), ip, fa))
+        # Memory is often left intact
+        nxt_mem_code = mem_code if nv is val else codec.encode_mem(nv)
+        if table is not None:
+            table[mem_code * n + p] = (nxt_mem_code * (n + 1) + npos) * 2 + atomic
+
+    if ctx.canonizer is not None:
+        nxt, perm = ctx.canonizer.canonical(
+            State(pos[:ip] + (npos,) + pos[ip + 1 :], nv)
+        )
+        nxt_key, nxt_ip = codec.encode(nxt), perm[ip]
+    else:
+        # Only the position of `ip` changed
+        nxt_pos_code = pos_code + (npos - p) * codec.pos_weight(ip)
+        nxt_key, nxt_ip = codec.pack(nxt_pos_code, nxt_mem_code), ip
+
+    if ctx.profiler is not None:
+        ctx.profiler.produced(ip, p, nxt_key)
+    return nxt_key, None if not atomic else [nxt_ip]
+
+
+def _expand(
+    ctx: ProofCtx, key: int, nxt_progs: list[int] | None
+) -> tuple[list[Successor], bool]:
+    """
+    Runs one step of every program in `nxt_progs` (all of them if `None`)
+    from the state `key`. Returns successors and whether the expansion was
+    reduced (see `bla.por`). Raises `_Failed` on assert failure.
+    """
+    state = _decode(ctx, key)
+    nxt_progs, reduced = _schedule(ctx, state[2], nxt_progs)
+
+    res = []
+    for ip in nxt_progs:
+        succ = _step(ctx, state, ip)
+        if succ is not None:
+            res.append(succ)
+    return res, reduced
+
+
+def failure_site(ctx: ProofCtx, failure: RunFailure) -> tuple[int, int]:
+    """Program and position of the op that failed"""
+    ip, state = failure.prog_idx, failure.state
+    if ctx.progs[ip].atomic[state.pos[ip]]:
+        # Failed inside of an atomic block, see `_macro`
+        state = atomic_states(ctx, state, ip, None)[-1]
+    return ip, state.pos[ip]
+
+
+def init_key(ctx: ProofCtx, init: State) -> int:
+    if ctx.canonizer is not None:
+        init, _ = ctx.canonizer.canonical(init)
+    return ctx.codec.encode(init)
 
 
 def _run(ctx: ProofCtx, init_state: State):
@@ -24,48 +236,403 @@ def _run(ctx: ProofCtx, init_state: State):
     Runs until either all possible state transitions are exhausted of assert failure occurs.
     Affects ctx.
     """
-    if init_state in ctx.parent:
+    for _ in bfs(ctx, init_state):
+        pass
+
+
+# (expanded states, queue length, depth)
+Progress = tuple[int, int, int]
+
+
+def bfs(
+    ctx: ProofCtx,
+    init_state: State,
+    every: int = 0,
+    pause_if: Callable[[], bool] | None = None,
+) -> Generator[Progress, None, None]:
+    """
+    Breadth-first exploration of `_run`, pauses at the start and at every BFS
+    level, every `every` expanded states (if not 0) and after every expanded
+    state `pause_if()` is true for (e.g. a limit is reached) to yield its
+    progress. The queue is empty after the last one, unless it stopped at a
+    failure.
+    """
+    key = init_key(ctx, init_state)
+    if key in ctx.parent:
         return
 
-    ctx.parent[init_state] = None
+    ctx.parent[key] = None
+    if ctx.profiler is not None:
+        ctx.profiler.seen = ctx.parent.__contains__
     # NOTES: Assumes that init_state is not in atomic context.
-    q: deque[tuple[State, list[int] | None]] = deque([(init_state, None)])
+    q: deque[Successor] = deque([(key, None)])
+
+    mon = ctx.monitor
+    poll = mon.poll_every if mon is not None else 0
+    pause = every
+    # States left in the current BFS level
+    expanded, depth, level_left = 0, 0, 1
+    # Sites of collected failures, see `failure_site`
+    sites: set[tuple[int, int]] = set()
+
+    def stats() -> dict[str, int]:
+        return dict(
+            unique=len(ctx.parent),
+            queue=len(q),
+            depth=depth,
+            memory=dict_size(ctx.parent),
+        )
 
     while q:
-        state, nxt_progs = q.popleft()
+        if expanded == pause:
+            pause += every
+            yield expanded, len(q), depth
+        key, nxt_progs = q.popleft()
+        expanded += 1
+        if expanded == poll and mon is not None:
+            poll += mon.poll_every
+            mon.poll(expanded, **stats())
+        try:
+            succs, reduced = _expand(ctx, key, nxt_progs)
+        except _Failed as f:
+            if ctx.failure is None:
+                ctx.failure = f.failure
+            if ctx.max_failures == 1:
+                break
+            site = failure_site(ctx, f.failure)
+            if site not in sites:
+                # The first one found is the shortest, as BFS
+                sites.add(site)
+                ctx.failures.append(f.failure)
+                if len(ctx.failures) == ctx.max_failures:
+                    break
+            # The failing state isn't expanded
+            succs, reduced = [], False
 
-        if nxt_progs is None:
-            nxt_progs = list(range(len(ctx.progs)))
+        for nxt_key, nxt_progs in succs:
+            if not ctx.parent.add(nxt_key, key):  # Detected cycle
+                if reduced:
+                    # Cycle proviso: reduced expansion must not close a cycle,
+                    # expand the state fully instead.
+                    q.appendleft((key, ctx.all_progs))
+                    level_left += 1
+                continue
 
-        for ip in nxt_progs:
-            prog = ctx.progs[ip]
+            q.append((nxt_key, nxt_progs))
 
-            pos = state.pos[ip]
-            if pos >= len(prog.ops):
-                continue  # halted
+        level_left -= 1
+        if not level_left:
+            depth, level_left = depth + 1, len(q)
+            yield expanded, len(q), depth
+        elif pause_if is not None and pause_if():
+            yield expanded, len(q), depth
+
+    if mon is not None:
+        mon.report(expanded, done=True, **stats())
+    yield expanded, len(q), depth
+
+
+def outcome(ctx: ProofCtx) -> dict[str, Any]:
+    """
+    Fields of `ctx` its failures are rendered from, for caches of results
+    (see `bla.incremental`, `bla.cache`), restored by `restore`
+    """
+    parent: dict[int, int | None] = {}
+    for failure in [ctx.failure, *ctx.failures]:
+        if failure is None:
+            continue
+        # Chain of the failure, see `bla.ux.traceback`
+        key: int | None = ctx.codec.encode(failure.state)
+        while key is not None and key in ctx.parent and key not in parent:
+            parent[key] = ctx.parent[key]
+            key = parent[key]
+    return dict(
+        parent=parent,
+        failure=ctx.failure,
+        failures=ctx.failures,
+        lasso=ctx.lasso,
+        loop=ctx.loop,
+        omission=ctx.omission,
+    )
+
+
+def restore(ctx: ProofCtx, fields: dict[str, Any]) -> None:
+    for name, value in fields.items():
+        setattr(ctx, name, value)
 
-            try:
-                npos, nv, atomic = prog.run(pos, state.val)
-            except FailedAssert as fa:
-                ctx.failure = RunFailure(state, ip, fa)
-                return
 
-            nxt_state = State(
-                pos=tuple(state.pos[:ip] + (npos,) + state.pos[ip + 1 :]), val=nv
-            )
+def init_state(ctx: ProofCtx) -> State:
+    return State(pos=tuple([0] * len(ctx.progs)), val=ctx.mm.init())
 
-            if nxt_state in ctx.parent:  # Detected cycle
+
+def replay(
+    ctx: ProofCtx,
+    keys: list[int],
+    key_of: Callable[[State], int],
+    failure: RunFailure | None = None,
+) -> list[tuple[State, int]]:
+    """
+    Finds concrete execution from the initial state that follows states with
+    given `keys` (as computed by `key_of`) and ends with `failure`
+    (`ctx.failure` by default). Returns (state, index of prog to make a step)
+    pairs.
+    """
+    failure = failure or ctx.failure
+    assert failure is not None
+    state, restricted = init_state(ctx), None
+    all_progs = list(range(len(ctx.progs)))
+    res = []
+    for nxt_key in keys[1:]:
+        for ip in restricted or all_progs:
+            if state.pos[ip] >= len(ctx.progs[ip].ops):
+                continue
+            try:
+                npos, nv, atomic = _macro(ctx.steps[ip], state.pos[ip], state.val)
+            except FailedAssert:
                 continue
+            nxt = State(state.pos[:ip] + (npos,) + state.pos[ip + 1 :], nv)
+            if key_of(nxt) == nxt_key:
+                res.append((state, ip))
+                state, restricted = nxt, [ip] if atomic else None
+                break
+        else:
+            assert False, "Failed to replay the execution"
+
+    # The state may be a permutation of the failure's one (see `bla.symmetry`),
+    # then a symmetric program fails, with an assert in its own variables
+    perm = ctx.canonizer.canonical(state)[1] if ctx.canonizer is not None else None
+    for ip in restricted or all_progs:
+        if state.pos[ip] >= len(ctx.progs[ip].ops):
+            continue
+        try:
+            _macro(ctx.steps[ip], state.pos[ip], state.val)
+        except FailedAssert as fa:
+            if str(fa) == str(failure.error) or (
+                perm is not None and perm[ip] == failure.prog_idx
+            ):
+                res.append((state, ip))
+                return res
+    assert False, "Failed to replay the failure"
+
+
+def make_ctx(
+    progs: list[Prog],
+    mm: MemMap,
+    compiled: bool = True,
+    por: bool = False,
+    symmetry: list[Symmetry] | None = None,
+    memo: int = 0,
+    tables: int = 0,
+    cache_dir: str | None = None,
+    observer: Observer | Callable[[Stats], None] | None = None,
+    profiler: "Profiler | None" = None,
+    failures: int = 1,
+    program_cache: "ProgramCache | None" = None,
+) -> ProofCtx:
+    """Context to explore `progs` in, see `run_proof` for the options"""
+    if tables:
+        from bla.tables import tables_of, tabulate
+
+        tbls = [tables_of(p, mm, tables, cache_dir) for p in progs]
+        steps = [
+            compile_prog(p, t, program_cache) if compiled else tabulate(p, p.run, t)
+            for p, t in zip(progs, tbls)
+        ]
+    else:
+        steps = [
+            compile_prog(p, cache=program_cache) if compiled else p.run for p in progs
+        ]
+    if memo:
+        from bla.memo import memoize
+
+        n_vars = len(mm.init())
+        steps = [memoize(p, s, n_vars, memo) for p, s in zip(progs, steps)]
+    ample = AmpleSets(progs, mm) if por else None
+    monitor = Monitor(observer, len(progs)) if observer is not None else None
+    if monitor is not None:
+        steps = [monitor.count(ip, s) for ip, s in enumerate(steps)]
+    if profiler is not None:
+        assert cache_dir is None, "Cached transitions can't be profiled"
+        steps = [profiler.timed(ip, s) for ip, s in enumerate(steps)]
+    return ProofCtx(
+        progs=progs,
+        mm=mm,
+        steps=steps,
+        por=ample,
+        symmetry=symmetry or [],
+        monitor=monitor,
+        profiler=profiler,
+        max_failures=failures,
+    )
+
+
+def run_proof(
+    progs: list[Prog],
+    mm: MemMap,
+    compiled: bool = True,
+    por: bool = False,
+    symmetry: list[Symmetry] | None = None,
+    workers: int = 1,
+    search: str = "bfs",
+    storage: str = "memory",
+    storage_dir: str | None = None,
+    mode: str = "exact",
+    bitstate_bits: int = 27,
+    memo: int = 0,
+    tables: int = 0,
+    assertions: list["Liveness"] | None = None,
+    fair: bool | list[Callable | str] = False,
+    cache_dir: str | None = None,
+    observer: Observer | Callable[[Stats], None] | None = None,
+    profiler: "Profiler | None" = None,
+    vectorized: bool = False,
+    failures: int = 1,
+    program_cache: "ProgramCache | None" = None,
+) -> ProofCtx:
+    """
+    compiled: run generated step functions (see `bla.compile`)
+        instead of interpreting `Prog.ops`.
+    por: partial-order reduction, explore only one of commuting transitions,
+        see `bla.por`.
+    symmetry: interchangeable programs, explore states up to their permutation,
+        see `bla.symmetry`.
+    workers: number of processes to explore with, see `bla.parallel`.
+    search: "bfs" finds the shortest counterexample,
+        "dfs" uses less memory (see `bla.dfs`).
+    storage: "disk" keeps visited states and BFS frontier in files under
+        `storage_dir` (a temporary directory by default), see `bla.disk`.
+    mode: "bitstate" (a bit array of `2**bitstate_bits` bits, at most 2**40) or
+        "hashcompact" (64-bit fingerprints) store states approximately and
+        may miss some of them, see `ProofCtx.omission`. Searches depth-first,
+        counterexamples are exact.
+    memo: cache up to `memo` op outcomes per program by values of variables
+        they read, see `bla.memo`.
+    tables: precompute outcomes of ops reading at most `tables` combinations
+        of values (persisted in `cache_dir` if set), see `bla.tables`.
+    assertions: liveness properties, e.g. `HALTS_ASSERT`. Checked along with
+        asserts by a single depth-first search (see `bla.liveness`), which
+        replaces `search`; `storage`, `mode`, `workers`, `por`, `vectorized`
+        and `failures` aren't supported.
+    fair: programs (functions or names, all if `True`) assumed weakly fair
+        when checking `assertions`.
+    cache_dir: persist transitions of programs in the directory and reuse
+        them for unchanged programs on later runs, or the outcome if no program
+        has changed, see `bla.incremental`.
+    observer: called periodically with exploration `Stats`,
+        e.g. `StderrProgress()`, see `bla.progress`.
+    profiler: collects per-source-line statistics, see `bla.lineprof`.
+    vectorized: expand whole BFS levels with NumPy, see `bla.vector`.
+    failures: keep exploring after a failed assert, until `failures` distinct
+        asserts (by program and op) failed, all of them if 0. Failing states
+        aren't expanded. See `ProofCtx.failures`.
+    program_cache: keeps compiled step functions, see `bla.progcache`.
+    """
+    assert search in ("bfs", "dfs"), f"Unknown search {search}"
+    assert storage in ("memory", "disk"), f"Unknown storage {storage}"
+    assert mode in ("exact", "bitstate", "hashcompact"), f"Unknown mode {mode}"
+    if failures != 1:
+        assert search == "bfs", "Failures are only collected by BFS"
+        assert mode == "exact", "Failures are only collected in exact mode"
+        assert storage == "memory", "Failures are only collected in memory"
+        assert workers == 1, "Failures are not collected with workers"
+        assert not vectorized, "Failures are not collected when vectorized"
+    if profiler is not None:
+        assert workers == 1, "Profiling is not supported with workers"
+        assert not vectorized, "Profiling is not supported when vectorized"
+    ctx = make_ctx(
+        progs,
+        mm,
+        compiled=compiled,
+        por=por,
+        symmetry=symmetry,
+        memo=memo,
+        tables=tables,
+        cache_dir=cache_dir,
+        observer=observer,
+        profiler=profiler,
+        failures=failures,
+        program_cache=program_cache,
+    )
+    cache = None
+    if cache_dir is not None:
+        from bla.incremental import TransitionCache
+
+        # Options the outcome depends on
+        options = dict(
+            por=por,
+            symmetry=symmetry,
+            workers=workers,
+            search=search,
+            storage=storage,
+            mode=mode,
+            bitstate_bits=bitstate_bits,
+            assertions=assertions,
+            fair=fair,
+            vectorized=vectorized,
+            failures=failures,
+        )
+        cache = TransitionCache(cache_dir, progs, mm, options)
+        if cache.restore(ctx):
+            return ctx
+        if not vectorized:  # levels aren't expanded through the tables
+            ctx.trans = cache.load()
+    if assertions:
+        from bla.liveness import run_liveness
+
+        # The search for violations is the only exploration
+        assert workers == 1, "Liveness is not checked with workers"
+        assert storage == "memory", "Liveness is only checked in memory"
+        assert mode == "exact", "Liveness is only checked in exact mode"
+        assert not por, "Partial-order reduction is not supported with liveness"
+        assert not vectorized, "Liveness is not checked when vectorized"
+        assert failures == 1, "Failures are not collected with liveness"
+        names = [p.name for p in progs]
+        if isinstance(fair, bool):
+            fair_progs = ctx.all_progs if fair else []
+        else:
+            members = [p if isinstance(p, str) else p.__name__ for p in fair]
+            for m in members:
+                assert m in names, f"Unknown program {m}"
+            fair_progs = sorted(names.index(m) for m in members)
+        run_liveness(ctx, init_state(ctx), assertions, fair_progs)
+    elif workers > 1:
+        from bla.parallel import run_parallel
+
+        assert search == "bfs", "Only BFS is supported with workers"
+        assert mode == "exact", "Only exact mode is supported with workers"
+        assert storage == "memory", "Only memory storage is supported with workers"
+        run_parallel(ctx, init_state(ctx), workers)
+    elif storage == "disk":
+        from bla.disk import run_disk
+
+        assert search == "bfs", "Only BFS is supported with disk storage"
+        assert mode == "exact", "Only exact mode is supported with disk storage"
+        run_disk(ctx, init_state(ctx), storage_dir)
+    elif vectorized:
+        from bla.vector import run_vector
 
-            nxt_progs = None if not atomic else [ip]
+        assert search == "bfs", "Only BFS is vectorized"
+        assert mode == "exact", "Only exact mode is vectorized"
+        assert not por, "Partial-order reduction is not vectorized"
+        assert not symmetry, "Symmetry reduction is not vectorized"
+        run_vector(ctx, init_state(ctx))
+    elif mode != "exact":
+        from bla.dfs import run_dfs
+        from bla.visited import BitState, HashCompact
 
-            q.append((nxt_state, nxt_progs))
-            ctx.parent[nxt_state] = state
-    return
+        visited = (
+            BitState(bitstate_bits)
+            if mode == "bitstate"
+            else HashCompact(ctx.codec.size)
+        )
+        run_dfs(ctx, init_state(ctx), visited)
+    elif search == "dfs":
+        from bla.dfs import run_dfs
 
+        run_dfs(ctx, init_state(ctx))
+    else:
+        _run(ctx, init_state(ctx))
 
-def run_proof(progs: list[Prog], mm: MemMap) -> ProofCtx:
-    ctx = ProofCtx(progs=progs, mm=mm)
-    init_state = State(pos=tuple([0] * len(ctx.progs)), val=ctx.mm.init())
-    _run(ctx, init_state)
+    if cache is not None:
+        cache.save(ctx)
     return ctx
@@ -0,0 +1,330 @@
+"""
+Static range analysis of assignments.
+
+Every variable has a finite domain, so the values an expression may evaluate to
+can be over-approximated from the domains of variables it reads, without
+running the program. `values` abstractly evaluates the (dereferenced) source of
+an expression: if it reads few combinations of values, it's evaluated for each
+of them, otherwise small sets of values are tracked exactly, larger sets of
+ints as intervals, tuples element-wise. Anything the analysis doesn't
+understand (calls, subscripts, ...) is unknown.
+
+If every value an assignment may produce is in the domain of its target, the
+assignment can't fail validation and `parse` emits an unchecked `ops.Mov`.
+`report` lists assignments that may fail, with values they may assign. These
+are over-approximations: unless evaluated for each combination, variables are
+independent, e.g. `small + large` is bounded by domains of both, regardless of
+the branch of a conditional expression it's evaluated in.
+"""
+from dataclasses import dataclass
+from itertools import product
+from math import prod
+from typing import Any
+import ast
+import operator
+
+from bla import ops
+from bla.core import Prog
+from bla.memory import MemMap, VarType
+
+# Sets of values are tracked exactly up to this size
+LIMIT = 1024
+
+
+@dataclass(frozen=True)
+class Interval:
+    """Ints in `[lo, hi]`"""
+
+    lo: int
+    hi: int
+
+    def __len__(self) -> int:
+        return self.hi - self.lo + 1
+
+
+# Possible values: a set of them, an interval of ints, a tuple of possible
+# values of elements, or `None` if unknown
+Values = frozenset | Interval | tuple | None
+
+_BOOLS = frozenset([False, True])
+
+_BINOPS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: operator.pow,
+    ast.LShift: operator.lshift,
+    ast.RShift: operator.rshift,
+    ast.BitOr: operator.or_,
+    ast.BitXor: operator.xor,
+    ast.BitAnd: operator.and_,
+    ast.Div: operator.truediv,
+}
+_UNARYOPS = {
+    ast.USub: operator.neg,
+    ast.UAdd: operator.pos,
+    ast.Invert: operator.invert,
+    ast.Not: operator.not_,
+}
+_CMPOPS = {
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+    ast.Is: operator.is_,
+    ast.IsNot: operator.is_not,
+    ast.In: lambda a, b: a in b,
+    ast.NotIn: lambda a, b: a not in b,
+}
+
+
+def _ints(vals: frozenset) -> bool:
+    return all(isinstance(v, int) for v in vals)
+
+
+def _interval(v: Values) -> Interval | None:
+    match v:
+        case Interval():
+            return v
+        case frozenset() if v and _ints(v):
+            return Interval(min(v), max(v))
+    return None
+
+
+def _set(vals: set[Any] | frozenset) -> Values:
+    """Widens too large sets"""
+    if len(vals) <= LIMIT:
+        return frozenset(vals)
+    return _interval(frozenset(vals))
+
+
+def _enum(v: Values) -> frozenset | None:
+    """Values as a set, if there are few enough of them"""
+    match v:
+        case frozenset():
+            return v
+        case Interval() if len(v) <= LIMIT:
+            return frozenset(range(v.lo, v.hi + 1))
+        case tuple():
+            elts = _enums(list(v))
+            return frozenset(product(*elts)) if elts is not None else None
+    return None
+
+
+def _enums(vs: list[Values]) -> list[frozenset] | None:
+    """Sets of values, if there are few enough combinations of them"""
+    sets = []
+    for v in vs:
+        s = _enum(v)
+        if s is None:
+            return None
+        sets.append(s)
+    return sets if prod(len(s) for s in sets) <= LIMIT else None
+
+
+def join(a: Values, b: Values) -> Values:
+    """Values that are possible in either `a` or `b`"""
+    match a, b:
+        case frozenset(), frozenset():
+            return _set(a | b)
+        case tuple(), tuple() if len(a) == len(b):
+            return tuple(join(x, y) for x, y in zip(a, b))
+    ia, ib = _interval(a), _interval(b)
+    if ia is None or ib is None:
+        return None
+    return Interval(min(ia.lo, ib.lo), max(ia.hi, ib.hi))
+
+
+def _apply(fn: Any, args: list[Values]) -> Values:
+    """Applies `fn` to every combination of values, `None` if too many"""
+    sets = _enums(args)
+    if sets is None:
+        return None
+    res = set()
+    for vals in product(*sets):
+        try:
+            res.add(fn(*vals))
+        except Exception:
+            pass  # fails before the value is assigned
+    return _set(res)
+
+
+def _arith(op: ast.operator, a: Interval, b: Interval) -> Interval | None:
+    match op:
+        case ast.Add():
+            return Interval(a.lo + b.lo, a.hi + b.hi)
+        case ast.Sub():
+            return Interval(a.lo - b.hi, a.hi - b.lo)
+        case ast.Mult():
+            corners = [x * y for x in (a.lo, a.hi) for y in (b.lo, b.hi)]
+            return Interval(min(corners), max(corners))
+        case ast.FloorDiv() if b.lo > 0:
+            corners = [x // y for x in (a.lo, a.hi) for y in (b.lo, b.hi)]
+            return Interval(min(corners), max(corners))
+        case ast.Mod() if b.lo > 0:
+            if 0 <= a.lo and a.hi < b.lo:
+                return a
+            return Interval(0, b.hi - 1)
+    return None
+
+
+class _Eval:
+    def __init__(self, mm: MemMap, mem_var: str = "m"):
+        self.types = mm._types
+        self.mem_var = mem_var
+
+    def __call__(self, t: ast.expr) -> Values:
+        match t:
+            case ast.Constant(value):
+                return frozenset([value])
+            case ast.Subscript(ast.Name(name), ast.Constant(int() as addr)) if (
+                name == self.mem_var
+            ):
+                return frozenset(self.types[addr]._domain)
+            case ast.Tuple(elts):
+                return tuple(self(e) for e in elts)
+            case ast.IfExp(test, body, orelse):
+                match _enum(self(test)):
+                    case frozenset() as tv if all(tv):
+                        return self(body)
+                    case frozenset() as tv if not any(tv):
+                        return self(orelse)
+                return join(self(body), self(orelse))
+            case ast.BoolOp(_, operands):
+                # Evaluates to one of operands
+                vals = [self(o) for o in operands]
+                res = vals[0]
+                for v in vals[1:]:
+                    res = join(res, v)
+                return res
+            case ast.UnaryOp(op, operand):
+                v = self(operand)
+                exact = _apply(_UNARYOPS[type(op)], [v])
+                if exact is not None or isinstance(op, ast.Not):
+                    return exact if exact is not None else _BOOLS
+                match op, _interval(v):
+                    case ast.USub(), Interval(lo, hi):
+                        return Interval(-hi, -lo)
+                    case ast.UAdd(), Interval() as i:
+                        return i
+                    case ast.Invert(), Interval(lo, hi):
+                        return Interval(~hi, ~lo)
+                return None
+            case ast.BinOp(left, op, right) if type(op) in _BINOPS:
+                a, b = self(left), self(right)
+                exact = _apply(_BINOPS[type(op)], [a, b])
+                if exact is not None:
+                    return exact
+                ia, ib = _interval(a), _interval(b)
+                if ia is None or ib is None:
+                    return None
+                return _arith(op, ia, ib)
+            case ast.Compare(left, cmpops, comparators):
+                args = [self(left), *(self(c) for c in comparators)]
+                fns = [_CMPOPS[type(op)] for op in cmpops]
+
+                def compare(*vals: Any) -> Any:
+                    res = True
+                    for fn, x, y in zip(fns, vals, vals[1:]):
+                        res = fn(x, y)
+                        if not res:
+                            return res
+                    return res
+
+                exact = _apply(compare, args)
+                return exact if exact is not None else _BOOLS
+        return None
+
+
+def values(e: Any, mm: MemMap) -> Values:
+    """Values expression `e` (see `bla.ops`) may evaluate to"""
+    match e:
+        case ops.Const():
+            return frozenset([e.value])
+        case ops.Var(negate=True):
+            return _apply(operator.not_, [frozenset(mm._types[e.addr]._domain)])
+        case ops.Var():
+            return frozenset(mm._types[e.addr]._domain)
+        case ops.EvalExpr() if prod(mm._types[a].size for a in e.reads) <= LIMIT:
+            # Few combinations of values read, evaluate for each of them
+            reads = sorted(e.reads)
+            res = set()
+            for vals in product(*(mm._types[a]._values for a in reads)):
+                m: list[Any] = [None] * len(mm._types)
+                for a, v in zip(reads, vals):
+                    m[a] = v
+                try:
+                    res.add(e(tuple(m)))
+                except Exception:
+                    pass  # fails before the value is assigned
+            return _set(res)
+        case ops.EvalExpr():
+            return _Eval(mm)(ast.parse(e.src, mode="eval").body)
+    return None  # opaque callable
+
+
+def outside(v: Values, vt: VarType) -> Values:
+    """Values of `v` that `vt` may not accept, `None` if unknown"""
+    vals = _enum(v)
+    if vals is None:
+        return None
+    return frozenset(x for x in vals if not vt.accepts(x))
+
+
+def unpack(v: Values, n: int) -> list[Values]:
+    """Values of elements of `n`-tuples of `v`"""
+    match v:
+        case tuple() if len(v) == n:
+            return list(v)
+        case frozenset() if all(isinstance(x, tuple) and len(x) == n for x in v):
+            return [_set({x[i] for x in v}) for i in range(n)]
+    return [None] * n
+
+
+def _targets(expr: Any, mm: MemMap, tgts: list[VarType], tpl: bool) -> list[Values]:
+    """Per target, values it may be assigned that it may not accept"""
+    v = values(expr, mm)
+    vals = unpack(v, len(tgts)) if tpl else [v]
+    return [outside(v, vt) for v, vt in zip(vals, tgts)]
+
+
+def in_domain(mm: MemMap, tgts: Any, expr: Any) -> bool:
+    """Whether values of `expr` are known to be accepted by targets, see `ops.Mov`"""
+    tpl = isinstance(tgts, tuple)
+    types = [mm.type(ref) for ref in (tgts if tpl else [tgts])]
+    return all(v is not None and not v for v in _targets(expr, mm, types, tpl))
+
+
+@dataclass
+class Finding:
+    prog: str
+    line: str  # source of the assignment
+    target: str
+    values: Values  # possible values out of domain, `None` if unknown
+
+    def __str__(self) -> str:
+        if self.values is None:
+            vals = "unknown values"
+        else:
+            vals = ", ".join(sorted(map(repr, self.values)))  # type: ignore[arg-type]
+        return f"{self.prog}: {self.line.strip()}  # {self.target} = {vals}"
+
+
+def report(progs: list[Prog]) -> list[Finding]:
+    """Assignments of `progs` that may fail validation of the domain"""
+    res = []
+    for prog in progs:
+        for pos, op in enumerate(prog.ops):
+            # Regardless of `op.checked`, the analysis is rerun rather than trusted
+            if not isinstance(op, ops.Mov):
+                continue
+            types = [op.mm.type(ref) for ref in op.refs]
+            bad = _targets(op.expr, op.mm, types, op.tpl)
+            for ref, vals in zip(op.refs, bad):
+                if vals is None or vals:
+                    res.append(Finding(prog.name, prog.render_op(pos), ref.name, vals))
+    return res
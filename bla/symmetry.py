@@ -0,0 +1,142 @@
+"""
+Symmetry reduction: states that differ only by a permutation of interchangeable
+programs (and their variables) are explored once, as their canonical representative.
+
+The representative has blocks of members (position and per-program variables)
+sorted. Members with equal blocks are told apart only by variables holding
+their ids, for these the permutation of them with the smallest encoding is
+picked, so all `k!` permutations are only tried if all blocks are equal.
+"""
+from typing import Any, Callable, Iterator
+from dataclasses import dataclass, field
+import itertools
+
+from bla.memory import MemMap, Reference
+from bla.core import Prog, State
+from bla.codec import StateCodec
+
+
+@dataclass
+class Symmetry:
+    """
+    Declares programs interchangeable: swapping any two of them together with their
+    variables doesn't change the behaviour of the model.
+
+    progs: the programs (functions or their names), `progs[i]` must be `progs[0]`
+        with variables renamed according to `vars` and `ids`.
+    vars: per-program variables, i-th name of every tuple belongs to `progs[i]`,
+        e.g. `[("flag_0", "flag_1")]`.
+    ids: variables holding a program identity, i-th value refers to `progs[i]`,
+        e.g. `{"turn": [0, 1]}`.
+
+    NOTE: Symmetry is not verified beyond the shape of programs, wrong declaration
+    leads to wrong proofs.
+    """
+
+    progs: list[Callable | str]
+    vars: list[tuple[str, ...]] = field(default_factory=list)
+    ids: dict[str, list[Any]] = field(default_factory=dict)
+
+
+class _Group:
+    def __init__(self, sym: Symmetry, progs: list[Prog], mm: MemMap):
+        names = [p.name for p in progs]
+        members = [p if isinstance(p, str) else p.__name__ for p in sym.progs]
+        for m in members:
+            assert m in names, f"Unknown program {m}"
+        self.progs = [names.index(m) for m in members]
+        k = len(self.progs)
+        assert k == len(set(self.progs)), f"Duplicate programs in {members}"
+
+        shape = [type(op) for op in progs[self.progs[0]].ops]
+        for ip in self.progs:
+            assert [type(op) for op in progs[ip].ops] == shape, (
+                f"Programs {members} are not symmetric, "
+                f"{progs[ip].name} differs from {members[0]}"
+            )
+
+        self.vars: list[list[int]] = []
+        for vs in sym.vars:
+            assert len(vs) == k, f"Expected {k} variables, got {vs}"
+            self.vars.append([mm.addr(Reference(v)) for v in vs])
+
+        self.ids: list[tuple[int, list[Any]]] = []
+        for v, vals in sym.ids.items():
+            assert len(vals) == k, f"Expected {k} values of {v}, got {vals}"
+            self.ids.append((mm.addr(Reference(v)), list(vals)))
+
+        self.k = k
+        self._types = [[mm._types[a] for a in addrs] for addrs in self.vars]
+
+    def _block(self, i: int, pos: list[int], mem: list[Any]) -> tuple[int, ...]:
+        """Position and (indexes of values of) variables of i-th member"""
+        vals = [t[i].index(mem[addrs[i]]) for addrs, t in zip(self.vars, self._types)]
+        return (pos[self.progs[i]], *vals)
+
+    def perms(self, pos: list[int], mem: list[Any]) -> Iterator[tuple[int, ...]]:
+        """
+        Permutations (see `apply`) sorting blocks of members, more than one
+        only if members with equal blocks differ by ids
+        """
+        blocks = [self._block(i, pos, mem) for i in range(self.k)]
+        order = sorted(range(self.k), key=blocks.__getitem__)
+        ties = [tuple(g) for _, g in itertools.groupby(order, key=blocks.__getitem__)]
+        choices: Iterator[tuple[tuple[int, ...], ...]] = iter([(tuple(order),)])
+        if self.ids:
+            choices = itertools.product(*(itertools.permutations(t) for t in ties))
+        for choice in choices:
+            perm = [0] * self.k
+            for slot, i in enumerate(m for t in choice for m in t):
+                perm[i] = slot
+            yield tuple(perm)
+
+    def apply(
+        self, perm: tuple[int, ...], pos: list[int], mem: list[Any]
+    ) -> tuple[list[int], list[Any]]:
+        """Moves i-th member (its position and variables) into slot `perm[i]`"""
+        npos, nmem = list(pos), list(mem)
+        for i, j in enumerate(perm):
+            npos[self.progs[j]] = pos[self.progs[i]]
+            for addrs in self.vars:
+                nmem[addrs[j]] = mem[addrs[i]]
+        for addr, vals in self.ids:
+            if mem[addr] in vals:
+                nmem[addr] = vals[perm[vals.index(mem[addr])]]
+        return npos, nmem
+
+
+class Canonizer:
+    def __init__(
+        self, symmetry: list[Symmetry], progs: list[Prog], mm: MemMap, codec: StateCodec
+    ):
+        self._groups = [_Group(sym, progs, mm) for sym in symmetry]
+        self._codec = codec
+        seen: set[int] = set()
+        for g in self._groups:
+            assert not seen.intersection(g.progs), "Symmetry groups must be disjoint"
+            seen.update(g.progs)
+
+    def canonical(self, state: State) -> tuple[State, list[int]]:
+        """
+        Returns the representative of all permutations of the state and where
+        each program went, `perm[ip]`.
+        """
+        pos, mem = list(state.pos), list(state.val)
+        perm = list(range(len(pos)))
+        for g in self._groups:
+            perms = list(g.perms(pos, mem))
+            p = perms[0]
+            if len(perms) > 1:
+
+                def encode(p: tuple[int, ...]) -> int:
+                    npos, nmem = g.apply(p, pos, mem)
+                    return self._codec.encode(State(tuple(npos), tuple(nmem)))
+
+                p = min(perms, key=encode)
+            pos, mem = g.apply(p, pos, mem)
+            slot = {g.progs[i]: g.progs[j] for i, j in enumerate(p)}
+            perm = [slot.get(ip, ip) for ip in perm]
+        return State(tuple(pos), tuple(mem)), perm
+
+    def key(self, state: State) -> int:
+        return self._codec.encode(self.canonical(state)[0])
@@ -0,0 +1,135 @@
+"""
+Precomputed transition tables.
+
+Variables have finite domains, so an op is a finite function of the variables
+it reads. `tabulate` enumerates every op whose read variables have at most
+`limit` combinations of values once, before the search, and records its
+outcome (next position, written values, atomicity, or the message of a failed
+assert/domain check) per combination. During the search these ops are table
+lookups, no expression is evaluated. Tables are built with the interpreter
+(`Prog.run`), compiled steps look outcomes up inline (see `compile_prog`).
+
+Unlike `bla.memo` tables are complete and built eagerly, so they can be
+persisted: with a `directory` they're stored keyed by the program's source,
+memory layout and the version of bla (see `bla.incremental.program_hash`), and
+loaded on later runs of the same version.
+Ops that raise anything but `FailedAssert` aren't tabulated for the values.
+"""
+from itertools import product
+from math import prod
+from operator import itemgetter
+from typing import Any, Callable
+import os
+import pickle
+
+from bla.core import Prog, Step, FailedAssert
+from bla.memory import MemMap, Memory
+from bla.memo import _worth
+from bla.incremental import program_hash
+
+_FORMAT = 1
+
+# (next pos, written values, atomic) or message of the failure
+Outcome = tuple[int, tuple[Any, ...], bool] | str
+# Per position, `None` if not tabulated
+Tables = list[dict[Any, Outcome] | None]
+
+
+def build(prog: Prog, step: Step, mm: MemMap, limit: int) -> Tables:
+    types = mm._types
+    tables: Tables = []
+    for pos, op in enumerate(prog.ops):
+        reads = sorted(getattr(op, "reads")) if _worth(op) else []
+        if not _worth(op) or prod(types[a].size for a in reads) > limit:
+            tables.append(None)
+            continue
+        writes = list(getattr(op, "addrs", []))
+        table: dict[Any, Outcome] = {}
+        for vals in product(*(types[a]._values for a in reads)):
+            # Variables the op doesn't read are irrelevant, leave them unset
+            m: list[Any] = [None] * len(types)
+            for a, v in zip(reads, vals):
+                m[a] = v
+            key = vals[0] if len(reads) == 1 else vals  # as `itemgetter`
+            try:
+                nxt, nm, atomic = step(pos, tuple(m))
+            except FailedAssert as fa:
+                table[key] = str(fa)
+                continue
+            except Exception:
+                continue  # left to the step, to raise it during the search
+            table[key] = (nxt, tuple(nm[a] for a in writes), atomic)
+        tables.append(table)
+    return tables
+
+
+def _load(path: str) -> Tables | None:
+    try:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+        return None
+
+
+def _save(path: str, tables: Tables) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + f".{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(tables, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
+def tables_of(
+    prog: Prog, mm: MemMap, limit: int, directory: str | None = None
+) -> Tables:
+    """Tables of ops of `prog` reading at most `limit` combinations of values"""
+    key = program_hash(prog, mm) if directory is not None else None
+    if directory is None or key is None:
+        return build(prog, prog.run, mm, limit)
+    path = os.path.join(directory, f"{key}.ops{_FORMAT}.{limit}.pickle")
+    tables = _load(path)
+    if tables is None:
+        tables = build(prog, prog.run, mm, limit)
+        _save(path, tables)
+    return tables
+
+
+def tabulate(prog: Prog, step: Step, tables: Tables) -> Step:
+    """
+    Wraps `step` of `prog` to look outcomes up in `tables`. Compiled steps
+    inline lookups instead, see `compile_prog`.
+    """
+    project: list[Callable[[Memory], Any] | None] = []
+    writes: list[list[int]] = []
+    for op, table in zip(prog.ops, tables):
+        if table is None:
+            project.append(None)
+            writes.append([])
+            continue
+        reads = sorted(getattr(op, "reads"))
+        project.append(itemgetter(*reads) if reads else lambda m: ())
+        writes.append(list(getattr(op, "addrs", [])))
+
+    def table_step(pos: int, m: Memory) -> tuple[int, Memory, bool]:
+        proj = project[pos]
+        if proj is None:
+            return step(pos, m)
+        out = tables[pos].get(proj(m))  # type: ignore[union-attr]
+        if out is None:
+            return step(pos, m)
+        if isinstance(out, str):
+            raise FailedAssert(out)
+        nxt, vals, atomic = out
+        match writes[pos]:
+            case []:
+                pass
+            case [a]:
+                m = m[:a] + vals + m[a + 1 :]
+            case addrs:
+                nm = list(m)
+                for a, v in zip(addrs, vals):
+                    nm[a] = v
+                m = tuple(nm)
+        return nxt, m, atomic
+
+    return table_step
@@ -0,0 +1,225 @@
+"""
+Process templates.
+
+Models of N similar processes are written as one program function with
+parameters (e.g. the process id) that index variables:
+
+    def p(i):
+        flag[i] = True
+        turn = 1 - i
+        while flag[1 - i] and turn == 1 - i:
+            pass
+
+    proof(instances(p, 2), {**array("flag", 2, False), "turn": [0, 1]})
+
+Variable `flag[k]` is declared as `"flag[k]"` (see `array`), indexes may only
+depend on parameters and are resolved when the template is instantiated.
+
+The function is parsed once and every expression is compiled once: instances
+share code objects, which read memory addresses and values of parameters from
+a tuple of the instance (see `ops.BoundExpr`). Instantiation only walks the
+statements and resolves addresses.
+"""
+from dataclasses import dataclass
+from types import CodeType
+from typing import Any, Callable
+import ast
+import copy
+import inspect
+import re
+
+from bla import ops
+from bla.core import Prog
+from bla.memory import MemMap
+from bla.parse import _ParseCtx, _parse_body, PrettyProg
+
+# ("param", name), ("var", name) or ("item", name, index)
+Slot = tuple[Any, ...]
+
+
+class _Slots(ast.NodeTransformer):
+    """Replaces parameters and variables with names of slots `__slot{j}`"""
+
+    def __init__(self, params: list[str]):
+        self.params = params
+        self.slots: list[Slot] = []
+
+    def _slot(self, slot: Slot) -> ast.expr:
+        self.slots.append(slot)
+        return ast.Name(id=f"__slot{len(self.slots) - 1}", ctx=ast.Load())
+
+    def visit_Name(self, node: ast.Name) -> ast.expr:
+        if node.id in self.params:
+            return self._slot(("param", node.id))
+        return self._slot(("var", node.id))
+
+    def visit_Subscript(self, node: ast.Subscript) -> ast.expr:
+        match node:
+            case ast.Subscript(ast.Name(name), index):
+                return self._slot(("item", name, index))
+        self.generic_visit(node)
+        return node
+
+
+class _Args(ast.NodeTransformer):
+    """Replaces slots with reads of arguments: `a[j]` or `m[a[j]]`"""
+
+    def __init__(self, slots: list[Slot]):
+        self.slots = slots
+
+    def visit_Name(self, node: ast.Name) -> ast.expr:
+        j = int(node.id.removeprefix("__slot"))
+        arg = ast.Subscript(
+            value=ast.Name(id="a", ctx=ast.Load()),
+            slice=ast.Constant(value=j),
+            ctx=ast.Load(),
+        )
+        if self.slots[j][0] == "param":
+            return ast.copy_location(arg, node)
+        read = ast.Subscript(
+            value=ast.Name(id="m", ctx=ast.Load()), slice=arg, ctx=ast.Load()
+        )
+        return ast.copy_location(read, node)
+
+
+class _Expr:
+    """Expression of a template, compiled once"""
+
+    def __init__(self, t: ast.expr, params: list[str]):
+        tr = _Slots(params)
+        slotted = tr.visit(copy.deepcopy(t))
+        self.slots = tr.slots
+        # Source with slots to fill in, alternating with their indexes
+        self.pieces = re.split(r"__slot(\d+)", ast.unparse(slotted))
+        code = _Args(self.slots).visit(slotted)
+        expression = ast.fix_missing_locations(ast.Expression(code))
+        self.code = compile(expression, filename="<bla>", mode="eval")
+
+    def bind(self, cls: type[ops.EvalExpr], ctx: _ParseCtx) -> ops.EvalExpr:
+        args: list[Any] = []
+        srcs: list[str] = []
+        reads: set[int] = set()
+        for slot in self.slots:
+            match slot:
+                case ("param", name):
+                    value = ctx.params[name]
+                    args.append(value)
+                    srcs.append(f"({value!r})")
+                    continue
+                case ("var", name):
+                    ref = ctx.ref(name)
+                case ("item", name, index):
+                    ref = ctx.ref(f"{name}[{ctx.index(index)!r}]")
+            addr = ctx.mm.addr(ref)
+            reads.add(addr)
+            args.append(addr)
+            srcs.append(f"m[{addr}]")
+        src = "".join(srcs[int(p)] if i % 2 else p for i, p in enumerate(self.pieces))
+        bound = (
+            ops.BoundPredicate if issubclass(cls, ops.EvalPredicate) else ops.BoundExpr
+        )
+        return bound(self.code, src, frozenset(reads), tuple(args))
+
+
+class Template:
+    """Program function with parameters, parsed once, see `instances`"""
+
+    def __init__(self, fn: Callable):
+        self.fn = fn
+        self.name = fn.__name__
+        self._parsed = False
+
+    def _parse(self) -> None:
+        """Parses the function on the first instantiation"""
+        if self._parsed:
+            return
+        self.src = inspect.getsource(self.fn)
+        t = ast.parse(self.src)
+        match t.body:
+            case [ast.FunctionDef(_, args, body)]:
+                pass
+            case _:
+                raise Exception("Expected a single function, got", t.body)
+        if args.vararg or args.kwarg or args.kwonlyargs or args.defaults:
+            raise Exception(f"Expected positional parameters, got {args.__dict__}")
+        self.params = [arg.arg for arg in args.posonlyargs + args.args]
+        self.body = body
+        self.line_offset = t.body[0].lineno
+        # Compiled expressions and indexes by id of their node in `body`
+        self._exprs: dict[int, _Expr] = {}
+        self._indexes: dict[int, CodeType] = {}
+        self._parsed = True
+
+    def __call__(self, *args: Any) -> "Instance":
+        n = self.fn.__code__.co_argcount
+        assert len(args) == n, f"Expected {n} arguments of {self.name}, got {args}"
+        return Instance(self, args)
+
+    def index(self, t: ast.expr, params: dict[str, Any]) -> Any:
+        code = self._indexes.get(id(t))
+        if code is None:
+            code = compile(ast.Expression(t), filename="<bla>", mode="eval")
+            self._indexes[id(t)] = code
+        return eval(code, {"__builtins__": {}}, params)
+
+    def expr(
+        self, t: ast.expr, cls: type[ops.EvalExpr], ctx: _ParseCtx
+    ) -> ops.EvalExpr:
+        e = self._exprs.get(id(t))
+        if e is None:
+            e = self._exprs[id(t)] = _Expr(t, self.params)
+        return e.bind(cls, ctx)
+
+    def parse(self, args: tuple[Any, ...], mm: MemMap) -> Prog:
+        self._parse()
+        ctx = _ParseCtx(
+            prog_name=_name(self.name, args),
+            src=self.src,
+            mm=mm,
+            line_offset=self.line_offset,
+            template=self,
+            params=dict(zip(self.params, args)),
+        )
+        _parse_body(self.body, ctx)
+        ctx.add_sentinel(ctx._end_lbl)
+        return PrettyProg(ctx)
+
+
+def _name(name: str, args: tuple[Any, ...]) -> str:
+    return f"{name}({', '.join(map(repr, args))})"
+
+
+@dataclass(frozen=True)
+class Instance:
+    """Template with values of its parameters, a program for `proof`"""
+
+    template: Template
+    args: tuple[Any, ...]
+
+    @property
+    def __name__(self) -> str:
+        # As programs are referred to by function names, e.g. in `Symmetry`
+        return _name(self.template.name, self.args)
+
+    def parse(self, mm: MemMap) -> Prog:
+        return self.template.parse(self.args, mm)
+
+
+def template(fn: Callable) -> Template:
+    """Template of `fn`, parsed once per function"""
+    # Kept on the function, so that it lives as long as the function does
+    t = getattr(fn, "__bla_template__", None)
+    if t is None:
+        t = fn.__bla_template__ = Template(fn)  # type: ignore[attr-defined]
+    return t
+
+
+def instances(fn: Callable, n: int) -> list[Instance]:
+    """`fn(0), ..., fn(n - 1)`"""
+    t = template(fn)
+    return [t(i) for i in range(n)]
+
+
+def array(name: str, n: int, hint: Any) -> dict[str, Any]:
+    """Domain of variables `name[0], ..., name[n - 1]`"""
+    return {f"{name}[{i}]": hint for i in range(n)}
@@ -1,11 +1,40 @@
-from typing import Callable, Protocol
-
+from typing import Callable, Iterator, Protocol
 from dataclasses import dataclass
+import contextlib
+import io
+import os
+import time
 
 from bla.memory import make_mem_map
-from bla.core import State
+from bla.core import State, FailedAssert
 from bla.parse import parse_program
-from bla.proofer import ProofCtx, run_proof
+from bla.template import Instance
+from bla.proofer import ProofCtx, RunFailure, run_proof, replay, atomic_states
+from bla.proofer import make_ctx, outcome, restore
+from bla.symmetry import Symmetry
+from bla.liveness import Liveness
+from bla.progress import Observer, Stats, StateBudget
+
+
+# Called with the verdict of every `proof`, see `verdicts`
+_listeners: list[Callable[[bool], None]] = []
+
+
+@contextlib.contextmanager
+def verdicts() -> Iterator[list[bool]]:
+    """Collects verdicts of `proof` calls made in the block, see `bla.batch`"""
+    res: list[bool] = []
+    _listeners.append(res.append)
+    try:
+        yield res
+    finally:
+        _listeners.remove(res.append)
+
+
+def _verdict(ok: bool) -> bool:
+    for listener in _listeners:
+        listener(ok)
+    return ok
 
 
 class ProofRenderer(Protocol):
@@ -14,16 +43,143 @@ class ProofRenderer(Protocol):
 
 
 def proof(
-    fns: list[Callable], domain: dict[str, type], render: ProofRenderer | None = None
+    fns: list[Callable | Instance],
+    domain: dict[str, type],
+    render: ProofRenderer | None = None,
+    compiled: bool = True,
+    por: bool = False,
+    symmetry: list[Symmetry] | None = None,
+    workers: int = 1,
+    search: str = "bfs",
+    storage: str = "memory",
+    storage_dir: str | None = None,
+    mode: str = "exact",
+    bitstate_bits: int = 27,
+    memo: int = 0,
+    tables: int = 0,
+    assertions: list[Liveness] | None = None,
+    fair: bool | list[Callable | str] = False,
+    cache_dir: str | None = None,
+    result_cache: str | None = None,
+    observer: Observer | Callable[[Stats], None] | None = None,
+    profile: bool | str = False,
+    vectorized: bool = False,
+    failures: int = 1,
+    program_cache: str | None = None,
 ) -> bool:
+    """
+    fns: program functions, or instances of templates (see `bla.template`).
+    result_cache: directory to reuse results of unchanged proofs from
+        (`$BLA_RESULT_CACHE` if not set), see `bla.cache`.
+    profile: print sources of programs annotated with executed ops, time and
+        produced states per line; if a path, also write them there in `pstats`
+        format. See `bla.lineprof`.
+    Exploration stops with `BudgetExceeded` after `$BLA_MAX_STATES` unique
+    states, if set (not supported with `workers`).
+    failures: report up to `failures` distinct failed asserts (all if 0),
+        each with its shortest counterexample, instead of only the first one.
+    program_cache: directory to keep parsed and compiled programs in
+        (`$BLA_PROGRAM_CACHE` if not set), see `bla.progcache`.
+    """
     render = render or ShortStacktrace()
 
     mm = make_mem_map(domain)
-    progs = [parse_program(fn, mm) for fn in fns]
+    program_cache = program_cache or os.environ.get("BLA_PROGRAM_CACHE")
+    prog_cache = None
+    if program_cache:
+        from bla.progcache import ProgramCache
+
+        prog_cache = ProgramCache(program_cache)
+        progs = [prog_cache.program(fn, mm) for fn in fns]
+    else:
+        progs = [parse_program(fn, mm) for fn in fns]
+
+    # Options that may change the result, the rest only affect performance
+    options = dict(
+        por=por,
+        symmetry=symmetry,
+        search=search,
+        mode=mode,
+        bitstate_bits=bitstate_bits,
+        assertions=assertions,
+        fair=fair,
+        failures=failures,
+    )
+    result_cache = result_cache or os.environ.get("BLA_RESULT_CACHE")
+    max_states = os.environ.get("BLA_MAX_STATES")
+    if max_states:
+        assert workers == 1, "$BLA_MAX_STATES is not enforced with workers"
+        # Raises `BudgetExceeded`, see `bla.batch`
+        observer = StateBudget(int(max_states), observer)
+    profiler = None
+    if profile:
+        from bla.lineprof import Profiler
+
+        profiler = Profiler(progs)
+        result_cache = None  # has to explore
+    if result_cache:
+        from bla.cache import ResultCache, Result, result_key
+
+        cache = ResultCache(result_cache)
+        # Configuration of the renderer too, e.g. of `ShortStacktrace`
+        key = result_key(progs, mm, {**options, "render": render})
+        hit = cache.get(key)
+        if hit is not None and hit.outcome:
+            # Rendered again, from the outcome of the exploration
+            ctx = make_ctx(progs, mm, compiled=False, symmetry=symmetry)
+            restore(ctx, hit.fields())
+            render.render(ctx)
+            return _verdict(ctx.failure is None)
 
-    ctx = run_proof(progs, mm)
-    render.render(ctx)
-    return ctx.failure is None
+    def run() -> ProofCtx:
+        ctx = run_proof(
+            progs,
+            mm,
+            compiled=compiled,
+            workers=workers,
+            storage=storage,
+            storage_dir=storage_dir,
+            memo=memo,
+            tables=tables,
+            cache_dir=cache_dir,
+            observer=observer,
+            profiler=profiler,
+            vectorized=vectorized,
+            program_cache=prog_cache,
+            **options,  # type: ignore[arg-type]
+        )
+        render.render(ctx)
+        if profiler is not None:
+            print(profiler.report())
+            if isinstance(profile, str):
+                profiler.dump_stats(profile)
+        return ctx
+
+    if not result_cache:
+        return _verdict(run().failure is None)
+
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        ctx = run()
+    print(out.getvalue(), end="")
+    ok = ctx.failure is None
+    names = [p.name for p in progs]
+    cache.put(key, Result.of(ok, out.getvalue(), names, outcome(ctx)))
+    return _verdict(ok)
+
+
+def check_domains(fns: list[Callable | Instance], domain: dict[str, type]) -> bool:
+    """
+    Prints assignments of `fns` that may assign values out of domains of their
+    targets, i.e. may fail validation. See `bla.ranges`.
+    """
+    from bla.ranges import report
+
+    mm = make_mem_map(domain)
+    findings = report([parse_program(fn, mm) for fn in fns])
+    for finding in findings:
+        print(finding)
+    return not findings
 
 
 @dataclass(frozen=True)
@@ -32,17 +188,42 @@ class TBFrame:
     prog_idx: int
 
 
-def traceback(ctx: ProofCtx) -> list[TBFrame]:
-    if not ctx.failure:
+def traceback(ctx: ProofCtx, failure: RunFailure | None = None) -> list[TBFrame]:
+    """Steps to `failure` (`ctx.failure` by default), the last step first"""
+    failure = failure or ctx.failure
+    if not failure:
         return []
 
-    chain = [TBFrame(ctx.failure.state, ctx.failure.prog_idx)]
+    if ctx.lasso:
+        chain = [TBFrame(ctx.codec.decode(k), ip) for k, ip in ctx.lasso[::-1]]
+        # The last step closes the loop
+        until: State | None = ctx.codec.decode(ctx.lasso[ctx.loop][0])
+    else:
+        chain = _parent_chain(ctx, failure)
+        until = None
 
+    # Atomic blocks are explored as single steps, break them into ops
+    res: list[TBFrame] = []
+    for frame in chain:
+        if frame.prog_idx == -1:
+            res.append(frame)
+        else:
+            states = atomic_states(ctx, frame.state, frame.prog_idx, until)
+            res += [TBFrame(st, frame.prog_idx) for st in states[::-1]]
+        until = frame.state
+    return res
+
+
+def _parent_chain(ctx: ProofCtx, failure: RunFailure) -> list[TBFrame]:
+    chain = [TBFrame(failure.state, failure.prog_idx)]
+
+    key = ctx.codec.encode(failure.state)
     while True:
         nxt = chain[-1].state
-        cur: State | None = ctx.parent.get(nxt)
-        if cur is None:
+        parent_key = ctx.parent.get(key)
+        if parent_key is None:
             break
+        key, cur = parent_key, ctx.codec.decode(parent_key)
 
         prog_idx = -1
         # find different ellemt
@@ -52,6 +233,12 @@ def traceback(ctx: ProofCtx) -> list[TBFrame]:
                 break
 
         chain.append(TBFrame(cur, prog_idx))
+
+    if ctx.canonizer is not None:
+        # Explored states are canonical, find concrete execution through them
+        keys = [ctx.codec.encode(f.state) for f in chain[::-1]]
+        frames = replay(ctx, keys, key_of=ctx.canonizer.key, failure=failure)
+        chain = [TBFrame(state, prog_idx) for state, prog_idx in frames[::-1]]
     return chain
 
 
@@ -62,11 +249,24 @@ class ShortStacktrace:
     def render(self, ctx: ProofCtx):
         if not ctx.failure:
             print("OK")
+            if ctx.omission:
+                print(f"Approximate: probability of omission {ctx.omission:.2g}")
             return
+        # All distinct failures if collected, see `run_proof(failures=)`
+        for i, failure in enumerate(ctx.failures or [ctx.failure]):
+            if i:
+                print()
+            self.render_failure(ctx, failure)
+
+    def render_failure(self, ctx: ProofCtx, failure: RunFailure):
         from tabulate import tabulate
 
         tbl = []
-        chain = traceback(ctx)[::-1]
+        chain = traceback(ctx, failure)[::-1]
+        loop = len(chain)
+        if ctx.lasso:
+            start = ctx.codec.decode(ctx.lasso[ctx.loop][0])
+            loop = [f.state for f in chain].index(start)
         for i, frame in enumerate(chain):
             state = frame.state
             prog_idx = frame.prog_idx
@@ -74,6 +274,8 @@ class ShortStacktrace:
                 prog = ctx.progs[prog_idx]
                 pos = state.pos[prog_idx]
                 prog_name, prog_line = prog.name, prog.render_op(pos)
+            elif all(p >= n for p, n in zip(state.pos, ctx.n_ops)):
+                prog_name, prog_line = "", "<halted>"
             else:
                 prog_name, prog_line = "???", "???"
 
@@ -82,11 +284,23 @@ class ShortStacktrace:
             )
 
             next = chain[i + 1].state if i + 1 < len(chain) else None
-            if not next or next.val != state.val:
-                # Only render on changes in memory
+            if not next or next.val != state.val or i >= loop:
+                # Only render on changes in memory, and the whole loop
                 tbl.append([i, prog_name, prog_line, vls])
 
             prev = state
 
         print(tabulate(tbl, tablefmt="presto"))
-        print(f"FAIL: {ctx.failure.error}")
+        error = failure.error
+        if ctx.canonizer is not None and chain:
+            # Explored states are canonical, a symmetric program may fail in
+            # the concrete execution, see `replay`
+            last = chain[-1]
+            try:
+                ctx.steps[last.prog_idx](last.state.pos[last.prog_idx], last.state.val)
+            except FailedAssert as fa:
+                error = fa
+        if ctx.lasso:
+            print(f"FAIL: {error}, repeats from step {loop}")
+        else:
+            print(f"FAIL: {error}")
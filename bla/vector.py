@@ -0,0 +1,462 @@
+"""
+Vectorised BFS, requires NumPy.
+
+A BFS level is an array of packed states (see `StateCodec`). Ops are applied
+to all states of the level where their program is at the op at once: state
+digits (positions, domain indices of variables) are extracted with array
+arithmetic, expressions are translated from their source into NumPy
+expressions over columns of variable values, successors are packed back.
+Visited states are a sorted array, deduplicated against with `searchsorted`.
+
+Expressions of ints and bools with arithmetic, comparison, boolean operators
+and conditional expressions are vectorised. Other ops, ops in atomic blocks
+and failing states are run by the scalar `_step`. Reductions (`por`,
+`symmetry`), cached transitions and profiling aren't supported, nor are
+packed states that don't fit into int64.
+"""
+from typing import Any, Callable
+import ast
+
+import numpy as np
+
+from bla import ops
+from bla.core import State, Prog
+from bla.memory import MemMap
+from bla.proofer import ProofCtx, _step, _decode, _Failed, init_key
+
+_INT, _BOOL = "int", "bool"
+# Type of a vectorised expression: _INT, _BOOL or a tuple of them
+VType = Any
+
+
+class _Unsupported(Exception):
+    pass
+
+
+_CMP = {
+    ast.Eq: "np.equal",
+    ast.NotEq: "np.not_equal",
+    ast.Lt: "np.less",
+    ast.LtE: "np.less_equal",
+    ast.Gt: "np.greater",
+    ast.GtE: "np.greater_equal",
+}
+_ARITH = {
+    ast.Add: "np.add",
+    ast.Sub: "np.subtract",
+    ast.Mult: "np.multiply",
+}
+_BITWISE = {
+    ast.BitAnd: "np.bitwise_and",
+    ast.BitOr: "np.bitwise_or",
+    ast.BitXor: "np.bitwise_xor",
+}
+
+
+class _Translator:
+    """Translates dereferenced source (see `EvalExpr.src`) to NumPy"""
+
+    def __init__(self, var_types: list[VType | None]):
+        self.var_types = var_types
+
+    def __call__(self, t: ast.expr) -> tuple[str, VType]:
+        match t:
+            case ast.Constant(bool() as v):
+                return repr(v), _BOOL
+            case ast.Constant(int() as v):
+                return repr(v), _INT
+            case ast.Subscript(ast.Name("m"), ast.Constant(int() as addr)):
+                vt = self.var_types[addr]
+                if vt is None:
+                    raise _Unsupported()
+                return f"m[{addr}]", vt
+            case ast.UnaryOp(ast.Not(), a):
+                return f"np.logical_not({self.typed(a, _BOOL)})", _BOOL
+            case ast.UnaryOp(ast.USub(), a):
+                return f"np.negative({self.typed(a, _INT)})", _INT
+            case ast.UnaryOp(ast.UAdd(), a):
+                return self.typed(a, _INT), _INT
+            case ast.BinOp(a, op, b) if type(op) in _ARITH:
+                return (
+                    f"{_ARITH[type(op)]}({self.typed(a, _INT)}, {self.typed(b, _INT)})",
+                    _INT,
+                )
+            case ast.BinOp(
+                a, ast.FloorDiv() | ast.Mod() as op, ast.Constant(int() as d)
+            ) if (d and not isinstance(d, bool)):
+                fn = "np.floor_divide" if isinstance(op, ast.FloorDiv) else "np.mod"
+                return f"{fn}({self.typed(a, _INT)}, {d})", _INT
+            case ast.BinOp(a, op, b) if type(op) in _BITWISE:
+                sa, ta = self(a)
+                if ta not in (_INT, _BOOL):
+                    raise _Unsupported()
+                return f"{_BITWISE[type(op)]}({sa}, {self.typed(b, ta)})", ta
+            case ast.BoolOp(op, values):
+                fn = "np.logical_and" if isinstance(op, ast.And) else "np.logical_or"
+                res = self.typed(values[0], _BOOL)
+                for e in values[1:]:
+                    res = f"{fn}({res}, {self.typed(e, _BOOL)})"
+                return res, _BOOL
+            case ast.Compare(left, cmp_ops, comparators):
+                terms = []
+                for cmp, right in zip(cmp_ops, comparators):
+                    terms.append(self.compare(left, cmp, right))
+                    left = right
+                res = terms[0]
+                for term in terms[1:]:
+                    res = f"np.logical_and({res}, {term})"
+                return res, _BOOL
+            case ast.IfExp(test, body, orelse):
+                cond = self.typed(test, _BOOL)
+                sb, tb = self(body)
+                so, to = self(orelse)
+                if tb != to:
+                    raise _Unsupported()
+                if isinstance(tb, tuple):
+                    if not (
+                        isinstance(body, ast.Tuple) and isinstance(orelse, ast.Tuple)
+                    ):
+                        raise _Unsupported()
+                    wheres = [
+                        f"np.where({cond}, {self(b)[0]}, {self(o)[0]})"
+                        for b, o in zip(body.elts, orelse.elts)
+                    ]
+                    return f"({', '.join(wheres)},)", tb
+                return f"np.where({cond}, {sb}, {so})", tb
+            case ast.Tuple(elts):
+                items = [self(e) for e in elts]
+                if any(isinstance(vt, tuple) for _, vt in items):
+                    raise _Unsupported()
+                return (
+                    f"({', '.join(s for s, _ in items)},)",
+                    tuple(vt for _, vt in items),
+                )
+        raise _Unsupported()
+
+    def typed(self, t: ast.expr, vt: VType) -> str:
+        s, got = self(t)
+        if got != vt:
+            raise _Unsupported()
+        return s
+
+    def scalar(self, t: ast.expr) -> str:
+        """Int or bool, compared as numbers"""
+        s, vt = self(t)
+        if vt not in (_INT, _BOOL):
+            raise _Unsupported()
+        return s
+
+    def compare(self, a: ast.expr, op: ast.cmpop, b: ast.expr) -> str:
+        if type(op) not in _CMP:
+            raise _Unsupported()
+        if not isinstance(a, ast.Tuple) and not isinstance(b, ast.Tuple):
+            return f"{_CMP[type(op)]}({self.scalar(a)}, {self.scalar(b)})"
+        # Lexicographic comparison of tuple literals
+        if not (isinstance(a, ast.Tuple) and isinstance(b, ast.Tuple)):
+            raise _Unsupported()
+        xs, ys = [self.scalar(e) for e in a.elts], [self.scalar(e) for e in b.elts]
+        if len(xs) != len(ys) or not xs:
+            raise _Unsupported()
+        match op:
+            case ast.Eq() | ast.NotEq():
+                res = _lex_eq(xs, ys)
+                return res if isinstance(op, ast.Eq) else f"np.logical_not({res})"
+            case ast.Lt():
+                return _lex_lt(xs, ys)
+            case ast.Gt():
+                return _lex_lt(ys, xs)
+            case ast.LtE():
+                return f"np.logical_not({_lex_lt(ys, xs)})"
+            case ast.GtE():
+                return f"np.logical_not({_lex_lt(xs, ys)})"
+        raise _Unsupported()
+
+
+def _lex_eq(xs: list[str], ys: list[str]) -> str:
+    res = f"np.equal({xs[0]}, {ys[0]})"
+    for x, y in zip(xs[1:], ys[1:]):
+        res = f"np.logical_and({res}, np.equal({x}, {y}))"
+    return res
+
+
+def _lex_lt(xs: list[str], ys: list[str]) -> str:
+    if len(xs) == 1:
+        return f"np.less({xs[0]}, {ys[0]})"
+    rest = _lex_lt(xs[1:], ys[1:])
+    return (
+        f"np.logical_or(np.less({xs[0]}, {ys[0]}), "
+        f"np.logical_and(np.equal({xs[0]}, {ys[0]}), {rest}))"
+    )
+
+
+def _vectorize(expr: Any, var_types: list[VType | None]) -> tuple[Callable, VType]:
+    """NumPy function of columns of variable values `m` and its result type"""
+    src = getattr(expr, "src", None)
+    if src is None:  # opaque callable
+        raise _Unsupported()
+    vsrc, vt = _Translator(var_types)(ast.parse(src, mode="eval").body)
+    fn = eval(f"lambda m: {vsrc}", {"np": np})
+    return fn, vt
+
+
+def _target(prog: Prog, pos: int, lbl: str | None) -> int:
+    return pos + 1 if lbl is None else prog.labels[lbl]
+
+
+class _VecOp:
+    """Op applied to many states, see `_Engine.apply`"""
+
+    def __init__(self, prog: Prog, pos: int, op: Any, var_types: list[VType | None]):
+        self.kind: str
+        self.nxt = self.jump = _target(prog, pos, None)
+        self.fn: Callable | None = None
+        self.addrs: list[int] = []
+        match op:
+            case ops.Goto():
+                self.kind, self.nxt = "goto", _target(prog, pos, op.lbl)
+            case ops.Cond():
+                self.fn, vt = _vectorize(op.pred, var_types)
+                if vt != _BOOL:
+                    raise _Unsupported()
+                self.kind, self.jump = "cond", _target(prog, pos, op.lbl)
+                self.negate = op.negate
+            case ops.Assert():
+                self.fn, vt = _vectorize(op.pred, var_types)
+                if vt != _BOOL:
+                    raise _Unsupported()
+                self.kind = "assert"
+            case ops.Mov():
+                self.fn, vt = _vectorize(op.expr, var_types)
+                n = len(op.addrs)
+                if op.tpl != isinstance(vt, tuple) or (op.tpl and len(vt) != n):
+                    raise _Unsupported()
+                if len(set(op.addrs)) != n or any(
+                    var_types[a] is None for a in op.addrs
+                ):
+                    raise _Unsupported()
+                self.kind, self.addrs = "mov", op.addrs
+            case _:
+                raise _Unsupported()
+
+
+class _Columns:
+    """Values of variables in selected rows, extracted on demand"""
+
+    def __init__(self, engine: "_Engine", mem: np.ndarray):
+        self._engine = engine
+        self._mem = mem
+        self._cols: dict[int, np.ndarray] = {}
+
+    def digit(self, addr: int) -> np.ndarray:
+        return (self._mem // self._engine.mem_weight[addr]) % self._engine.size[addr]
+
+    def __getitem__(self, addr: int) -> np.ndarray:
+        if addr not in self._cols:
+            self._cols[addr] = self._engine.values[addr][self.digit(addr)]
+        return self._cols[addr]
+
+
+class _Engine:
+    def __init__(self, ctx: ProofCtx):
+        self.ctx = ctx
+        mm: MemMap = ctx.mm
+        self.pos_size = ctx.codec.pos_size
+        self.pos_weight = [ctx.codec.pos_weight(ip) for ip in ctx.all_progs]
+        self.pos_radix = [n + 1 for n in ctx.n_ops]
+        self.size, self.mem_weight = [], []
+        self.values: list[Any] = []  # arrays, `None` if not vectorizable
+        self.lut: list[tuple[int, np.ndarray] | None] = []
+        var_types: list[VType | None] = []
+        w = 1
+        for t in mm._types:
+            self.size.append(t.size)
+            self.mem_weight.append(w)
+            w *= t.size
+            vt, values, lut = _column(t._values)
+            var_types.append(vt)
+            self.values.append(values)
+            self.lut.append(lut)
+
+        self.vops: list[list[_VecOp | None]] = []
+        for prog in ctx.progs:
+            vops: list[_VecOp | None] = []
+            for pos, op in enumerate(prog.ops):
+                try:
+                    # Atomic blocks run as macro-steps, see `_macro`
+                    vops.append(
+                        None if prog.atomic[pos] else _VecOp(prog, pos, op, var_types)
+                    )
+                except _Unsupported:
+                    vops.append(None)
+            self.vops.append(vops)
+
+    def expand(
+        self, keys: np.ndarray, restricted: np.ndarray
+    ) -> tuple[list[np.ndarray], list[np.ndarray], list[np.ndarray]]:
+        """
+        Successors of states `keys` (only of program `restricted` if not -1):
+        lists of arrays of successor keys, restrictions and parents.
+        Raises `_Failed`.
+        """
+        succ: list[np.ndarray] = []
+        succ_restricted: list[np.ndarray] = []
+        parents: list[np.ndarray] = []
+        for ip, vops in enumerate(self.vops):
+            w = self.pos_weight[ip]
+            pos = (keys // w) % self.pos_radix[ip]
+            active = (restricted == -1) | (restricted == ip)
+            for k in np.unique(pos[active]):
+                if k >= len(vops):
+                    continue  # halted
+                rows = np.flatnonzero(active & (pos == k))
+                vop = vops[k]
+                if vop is None:
+                    res = self.scalar(keys[rows], ip)
+                else:
+                    res = self.apply(vop, keys[rows], ip, int(k))
+                succ.append(res[0])
+                succ_restricted.append(res[1])
+                parents.append(res[2])
+        return succ, succ_restricted, parents
+
+    def scalar(
+        self, keys: np.ndarray, ip: int
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        nxt, nxt_restricted = [], []
+        for key in keys.tolist():
+            res = _step(self.ctx, _decode(self.ctx, key), ip)
+            assert res is not None
+            nxt.append(res[0])
+            nxt_restricted.append(res[1][0] if res[1] else -1)
+        return (
+            np.array(nxt, dtype=np.int64),
+            np.array(nxt_restricted, dtype=np.int64),
+            keys,
+        )
+
+    def fail(self, keys: np.ndarray, bad: np.ndarray, ip: int) -> None:
+        """Runs the first failing state to raise its `_Failed`"""
+        key = int(keys[np.flatnonzero(bad)[0]])
+        _step(self.ctx, _decode(self.ctx, key), ip)
+        assert False, "Failure is not reproduced by the scalar step"
+
+    def apply(
+        self, vop: _VecOp, keys: np.ndarray, ip: int, k: int
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        w = self.pos_weight[ip]
+        n = len(keys)
+        nxt = keys + (vop.nxt - k) * w
+        if vop.kind == "goto":
+            return nxt, np.full(n, -1, dtype=np.int64), keys
+        assert vop.fn is not None
+        cols = _Columns(self, keys // self.pos_size)
+        res = vop.fn(cols)
+        match vop.kind:
+            case "cond":
+                taken = np.broadcast_to(res, (n,)) != vop.negate
+                nxt = np.where(taken, keys + (vop.jump - k) * w, nxt)
+            case "assert":
+                ok = np.broadcast_to(res, (n,))
+                if not ok.all():
+                    self.fail(keys, ~ok, ip)
+            case "mov":
+                vals = res if isinstance(res, tuple) else (res,)
+                delta = np.zeros(n, dtype=np.int64)
+                for addr, val in zip(vop.addrs, vals):
+                    lut = self.lut[addr]
+                    assert lut is not None
+                    lo, table = lut
+                    v = np.broadcast_to(np.asarray(val, dtype=np.int64), (n,)) - lo
+                    inside = (v >= 0) & (v < len(table))
+                    idx = np.where(inside, table[np.clip(v, 0, len(table) - 1)], -1)
+                    if (idx < 0).any():
+                        self.fail(keys, idx < 0, ip)
+                    delta += (idx - cols.digit(addr)) * self.mem_weight[addr]
+                nxt = nxt + delta * self.pos_size
+        return nxt, np.full(n, -1, dtype=np.int64), keys
+
+
+def _column(values: tuple[Any, ...]) -> tuple[VType | None, Any, Any]:
+    """Type, array of values and `value -> index` lookup of a domain"""
+    if all(isinstance(v, bool) for v in values):
+        vt = _BOOL
+    elif all(isinstance(v, int) and not isinstance(v, bool) for v in values):
+        vt = _INT
+    else:
+        return None, None, None
+    ints = [int(v) for v in values]
+    lo, hi = min(ints), max(ints)
+    if hi - lo > 1 << 20:
+        return None, None, None
+    table = np.full(hi - lo + 1, -1, dtype=np.int64)
+    table[np.array(ints) - lo] = np.arange(len(ints))
+    return vt, np.array(values), (lo, table)
+
+
+def run_vector(ctx: ProofCtx, init_state: State) -> None:
+    """
+    Runs BFS a level at a time. Affects ctx: sets failure, `ctx.parent` only
+    holds the failure's chain.
+    """
+    assert ctx.por is None, "Partial-order reduction is not vectorized"
+    assert ctx.canonizer is None, "Symmetry reduction is not vectorized"
+    assert not ctx.trans, "Cached transitions are not vectorized"
+    assert ctx.profiler is None, "Profiling is not supported when vectorized"
+    assert ctx.codec.size < 1 << 63, "Packed states don't fit into int64"
+
+    engine = _Engine(ctx)
+    key = init_key(ctx, init_state)
+    # Visited states, sorted, with their parents (-1 for none)
+    visited = np.array([key], dtype=np.int64)
+    parent = np.array([-1], dtype=np.int64)
+    frontier = visited.copy()
+    restricted = np.full(1, -1, dtype=np.int64)
+
+    mon = ctx.monitor
+    expanded = depth = 0
+
+    def stats() -> dict[str, int]:
+        return dict(
+            unique=len(visited),
+            queue=len(frontier),
+            depth=depth,
+            memory=visited.nbytes + parent.nbytes,
+        )
+
+    while len(frontier):
+        try:
+            succ, succ_restricted, parents = engine.expand(frontier, restricted)
+        except _Failed as f:
+            ctx.failure = f.failure
+            break
+        expanded += len(frontier)
+        depth += 1
+        if not succ:
+            break
+        keys = np.concatenate(succ)
+        # First occurrence of every new state
+        keys, first = np.unique(keys, return_index=True)
+        at = np.searchsorted(visited, keys)
+        new = visited[np.minimum(at, len(visited) - 1)] != keys
+        keys, first, at = keys[new], first[new], at[new]
+        frontier = keys
+        restricted = np.concatenate(succ_restricted)[first]
+        new_parent = np.concatenate(parents)[first]
+
+        # Both are sorted: insert the new keys at their positions in `visited`
+        visited = np.insert(visited, at, keys)
+        parent = np.insert(parent, at, new_parent)
+        if mon is not None:
+            mon.poll(expanded, **stats())
+
+    if mon is not None:
+        mon.report(expanded, done=True, **stats())
+
+    if ctx.failure is not None:
+        key = ctx.codec.encode(ctx.failure.state)
+        while True:
+            p = int(parent[np.searchsorted(visited, key)])
+            ctx.parent[key] = None if p < 0 else p
+            if p < 0:
+                break
+            key = p
@@ -0,0 +1,315 @@
+"""
+Compact visited-set storage.
+
+Python `set`/`dict` spend ~60-80 bytes per packed state (table slot plus an
+int object); `PackedSet` stores keys below 2**64 inline in a flat array,
+~16-24 bytes per state.
+
+Approximate sets trade completeness for memory, a state may be wrongly
+reported as visited (and its successors never explored):
+ * `BitState`: supertrace, a few bits per state in a large bit array;
+ * `HashCompact`: 64-bit fingerprints of states in a `PackedSet`.
+"""
+from array import array
+from typing import Iterator
+from hashlib import blake2b
+import math
+
+from bla.progress import dict_size
+
+_MASK = (1 << 64) - 1
+_MUL = 0x9E3779B97F4A7C15  # Fibonacci hashing
+
+
+def _hash64(key: int) -> int:
+    """Well-mixed 64-bit hash of a non-negative int"""
+    if key > _MASK:
+        raw = key.to_bytes((key.bit_length() + 7) // 8, "little")
+        key = int.from_bytes(blake2b(raw, digest_size=8).digest(), "little")
+    # splitmix64 finalizer
+    z = (key + _MUL) & _MASK
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & _MASK
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _MASK
+    return z ^ (z >> 31)
+
+
+class PackedSet:
+    """
+    Open-addressing (linear probing) hash set of ints in [0, 2**64 - 1).
+    """
+
+    def __init__(self, capacity: int = 1 << 12):
+        bits = max(capacity - 1, 1).bit_length()
+        self._alloc(bits)
+        self._len = 0
+
+    def _alloc(self, bits: int) -> None:
+        self._bits = bits
+        self._shift = 64 - bits
+        self._mask = (1 << bits) - 1
+        self._limit = (1 << bits) * 7 // 10
+        # Slots hold `key + 1`, 0 is empty
+        self._slots = array("Q", bytes(8 << bits))
+
+    def __len__(self) -> int:
+        return self._len
+
+    def _slot(self, key: int) -> int:
+        slots, mask = self._slots, self._mask
+        i = ((key * _MUL) & _MASK) >> self._shift
+        v = key + 1
+        while True:
+            s = slots[i]
+            if s == 0 or s == v:
+                return i
+            i = (i + 1) & mask
+
+    def __contains__(self, key: int) -> bool:
+        return self._slots[self._slot(key)] != 0
+
+    def add(self, key: int) -> bool:
+        """Adds key, returns False if it was already present"""
+        i = self._slot(key)
+        if self._slots[i]:
+            return False
+        self._slots[i] = key + 1
+        self._len += 1
+        if self._len > self._limit:
+            self._grow()
+        return True
+
+    def omission(self) -> float:
+        return 0.0
+
+    def nbytes(self) -> int:
+        return len(self._slots) * self._slots.itemsize
+
+    def _grow(self) -> None:
+        old = self._slots
+        self._alloc(self._bits + 1)
+        for v in old:
+            if v:
+                self._slots[self._slot(v - 1)] = v
+
+
+class PackedMap:
+    """
+    Open-addressing (linear probing) map of ints in [0, 2**64 - 1) to such
+    ints or `None`, e.g. parents of states (see `ProofCtx.parent`). Two flat
+    arrays, ~23-46 bytes per entry instead of ~90 of a `dict` of ints.
+    """
+
+    # Keys and values must be below this
+    LIMIT = _MASK
+
+    def __init__(self, capacity: int = 1 << 12):
+        bits = max(capacity - 1, 1).bit_length()
+        self._alloc(bits)
+        self._len = 0
+
+    def _alloc(self, bits: int) -> None:
+        self._bits = bits
+        self._shift = 64 - bits
+        self._mask = (1 << bits) - 1
+        self._limit = (1 << bits) * 7 // 10
+        # Slots hold `key + 1` and `value + 1`, 0 is empty and `None`
+        self._keys = array("Q", bytes(8 << bits))
+        self._values = array("Q", bytes(8 << bits))
+
+    def __len__(self) -> int:
+        return self._len
+
+    def _slot(self, key: int) -> int:
+        keys, mask = self._keys, self._mask
+        i = ((key * _MUL) & _MASK) >> self._shift
+        v = key + 1
+        while True:
+            s = keys[i]
+            if s == 0 or s == v:
+                return i
+            i = (i + 1) & mask
+
+    def __contains__(self, key: int) -> bool:
+        return self._keys[self._slot(key)] != 0
+
+    def __getitem__(self, key: int) -> int | None:
+        i = self._slot(key)
+        if not self._keys[i]:
+            raise KeyError(key)
+        v = self._values[i]
+        return v - 1 if v else None
+
+    def get(self, key: int, default: int | None = None) -> int | None:
+        i = self._slot(key)
+        if not self._keys[i]:
+            return default
+        v = self._values[i]
+        return v - 1 if v else None
+
+    def __setitem__(self, key: int, value: int | None) -> None:
+        i = self._slot(key)
+        self._values[i] = 0 if value is None else value + 1
+        if not self._keys[i]:
+            self._keys[i] = key + 1
+            self._len += 1
+            if self._len > self._limit:
+                self._grow()
+
+    def add(self, key: int, value: int | None) -> bool:
+        """Maps the key to value, returns False (keeping its value) if it was"""
+        i = self._slot(key)
+        if self._keys[i]:
+            return False
+        self._keys[i] = key + 1
+        self._values[i] = 0 if value is None else value + 1
+        self._len += 1
+        if self._len > self._limit:
+            self._grow()
+        return True
+
+    def __iter__(self) -> Iterator[int]:
+        return (k - 1 for k in self._keys if k)
+
+    def nbytes(self) -> int:
+        return 2 * len(self._keys) * self._keys.itemsize
+
+    def _grow(self) -> None:
+        keys, values = self._keys, self._values
+        self._alloc(self._bits + 1)
+        for k, v in zip(keys, values):
+            if k:
+                i = self._slot(k - 1)
+                self._keys[i], self._values[i] = k, v
+
+
+class KeyMap(dict[int, int | None]):
+    """Plain dict with `PackedMap`'s interface, for keys that don't fit 64 bits"""
+
+    def add(self, key: int, value: int | None) -> bool:
+        if key in self:
+            return False
+        self[key] = value
+        return True
+
+    def nbytes(self) -> int:
+        return dict_size(self)
+
+
+class KeySet(set[int]):
+    """Plain set with `PackedSet`'s interface, for keys that don't fit 64 bits"""
+
+    def add(self, key: int) -> bool:  # type: ignore[override]
+        if key in self:
+            return False
+        super().add(key)
+        return True
+
+    def omission(self) -> float:
+        return 0.0
+
+    def nbytes(self) -> int:
+        return dict_size(self)
+
+
+class BitState:
+    """
+    Bit array of `2**bits` bits, every state sets `k` of them, chosen by
+    double hashing. A state is considered visited if all its bits are set.
+    """
+
+    # 2**40 bits take 128 GiB
+    MAX_BITS = 40
+
+    def __init__(self, bits: int = 27, k: int = 3):
+        assert 3 <= bits <= self.MAX_BITS, (
+            f"Invalid bit array size 2**{bits}, "
+            f"expected 2**3 to 2**{self.MAX_BITS} ({1 << self.MAX_BITS - 33} GiB)"
+        )
+        self._bits = bits
+        self._k = k
+        self._shift = 64 - bits
+        self._arr = bytearray(1 << (bits - 3))
+        self._len = 0
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __contains__(self, key: int) -> bool:
+        arr, shift = self._arr, self._shift
+        h = _hash64(key)
+        step = _hash64(h) | 1
+        for _ in range(self._k):
+            i = h >> shift
+            if not arr[i >> 3] & 1 << (i & 7):
+                return False
+            h = (h + step) & _MASK
+        return True
+
+    def add(self, key: int) -> bool:
+        """Sets bits of the key, returns False if all of them were set"""
+        arr, shift = self._arr, self._shift
+        h = _hash64(key)
+        step = _hash64(h) | 1
+        new = False
+        for _ in range(self._k):
+            i = h >> shift
+            byte, bit = i >> 3, 1 << (i & 7)
+            if not arr[byte] & bit:
+                arr[byte] |= bit
+                new = True
+            h = (h + step) & _MASK
+        self._len += new
+        return new
+
+    def nbytes(self) -> int:
+        return len(self._arr)
+
+    def omission(self) -> float:
+        """
+        Estimated probability that some state was omitted: i-th new state
+        collides with probability (1 - e^(-k*i/m))^k, summed over insertions.
+        """
+        n, k, m = self._len, self._k, 1 << self._bits
+        parts = 64
+        expected = sum(
+            n / parts * (1 - math.exp(-k * n * (j + 0.5) / parts / m)) ** k
+            for j in range(parts)
+        )
+        return -math.expm1(-expected)
+
+
+class HashCompact:
+    """
+    Stores 64-bit fingerprints of keys. Exact if keys themselves fit 64 bits.
+    """
+
+    def __init__(self, size: int):
+        self._exact = size < _MASK
+        self._set = PackedSet()
+
+    def __len__(self) -> int:
+        return len(self._set)
+
+    def __contains__(self, key: int) -> bool:
+        return (key if self._exact else _hash64(key) % _MASK) in self._set
+
+    def add(self, key: int) -> bool:
+        return self._set.add(key if self._exact else _hash64(key) % _MASK)
+
+    def nbytes(self) -> int:
+        return self._set.nbytes()
+
+    def omission(self) -> float:
+        """Estimated probability that fingerprints of some two states collide"""
+        if self._exact:
+            return 0.0
+        n = len(self._set)
+        return -math.expm1(-n * (n - 1) / 2 / _MASK)
+
+
+Visited = PackedSet | KeySet | BitState | HashCompact
+
+
+def visited_set(size: int) -> PackedSet | KeySet:
+    """Most compact exact set for keys in [0, size)"""
+    return PackedSet() if size < _MASK else KeySet()
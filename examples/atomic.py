@@ -27,3 +27,15 @@ proof([setter_checker_non_atomic, corrupter], D)
 
 print("*** Passes")
 proof([setter_checker_atomic, corrupter], D)
+
+
+def setter_checker_late():
+    A = True
+    with atomic:
+        B = A
+        A = False
+        assert B
+
+
+print("*** Fails inside of atomic block")
+proof([setter_checker_late, corrupter], {"A": False, "B": False})
@@ -4,7 +4,7 @@ import sys
 sys.path.insert(0, "../bla")
 
 
-from bla import proof
+from bla import proof, HALTS_ASSERT
 
 D = {
     "wants_to_enter_0": False,
@@ -50,11 +50,12 @@ def p1():
     wants_to_enter_1 = False
 
 
-# TODO: HALTS_ASSERT to do a better job
-# proof([p0, p1], D, assertions=[HALTS_ASSERT])
-
 proof([p0, p1], D)  # OK
 
+# Both programs finish, unless one of them is never scheduled
+proof([p0, p1], D, assertions=[HALTS_ASSERT], fair=True)  # OK
+proof([p0, p1], D, assertions=[HALTS_ASSERT])  # busy waits forever
+
 
 def p1_brute():
     wants_to_enter_1 = True
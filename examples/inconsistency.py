@@ -26,3 +26,33 @@ proof(
     },
 )
 # Spoiler: it doesn't
+
+
+# Two clients of the same DB
+def client_a():
+    A_set = True
+    assert A_get == True
+
+
+def client_b():
+    B_set = True
+    assert B_get == True
+
+
+def server_ab():
+    while True:
+        A_get = A_set
+        B_get = B_set
+
+
+# Report every failing assertion, not only the first one
+proof(
+    [client_a, client_b, server_ab],
+    {
+        "A_set": False,
+        "A_get": False,
+        "B_set": False,
+        "B_get": False,
+    },
+    failures=0,
+)
@@ -4,7 +4,7 @@ import sys
 sys.path.insert(0, "../bla")
 
 
-from bla import proof
+from bla import proof, HALTS_ASSERT, instances, array
 
 D = {
     "flag_0": False,
@@ -42,7 +42,24 @@ def p1():
     flag_1 = False
 
 
-# TODO: HALTS_ASSERT to do a better job
-# proof([p0, p1], D, assertions=[HALTS_ASSERT])
-
 proof([p0, p1], D)  # OK
+
+# Both programs finish, unless one of them is never scheduled
+proof([p0, p1], D, assertions=[HALTS_ASSERT], fair=True)  # OK
+
+
+# One program for both processes, `i` is the process id
+def p(i):
+    flag[i] = True
+    turn = 1 - i
+    while flag[1 - i] and turn == 1 - i:
+        pass  # busy wait
+    # critical section
+    assert not cs_used
+    cs_used = True
+    cs_used = False
+    # end of critical section
+    flag[i] = False
+
+
+proof(instances(p, 2), {**array("flag", 2, False), "turn": [0, 1], "cs_used": False})
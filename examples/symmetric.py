@@ -0,0 +1,70 @@
+import sys
+
+sys.path.insert(0, "../bla")
+
+from bla import proof, Symmetry
+
+# Three identical processes guarding critical section with test-and-set lock.
+# Declaring them symmetric lets the proofer explore states up to
+# a permutation of processes.
+D = {
+    "lock": False,
+    "cs_0": False,
+    "cs_1": False,
+    "cs_2": False,
+}
+
+
+def p0():
+    while True:
+        with atomic:
+            if not lock:
+                lock = True
+                break
+    cs_0 = True
+    assert not cs_1 and not cs_2
+    cs_0 = False
+    lock = False
+
+
+def p1():
+    while True:
+        with atomic:
+            if not lock:
+                lock = True
+                break
+    cs_1 = True
+    assert not cs_0 and not cs_2
+    cs_1 = False
+    lock = False
+
+
+def p2():
+    while True:
+        with atomic:
+            if not lock:
+                lock = True
+                break
+    cs_2 = True
+    assert not cs_0 and not cs_1
+    cs_2 = False
+    lock = False
+
+
+symmetry = [Symmetry([p0, p1, p2], vars=[("cs_0", "cs_1", "cs_2")])]
+
+proof([p0, p1, p2], D, symmetry=symmetry)  # OK
+
+
+# Doesn't take the lock
+def p2_rogue():
+    while True:
+        with atomic:
+            if not lock:
+                break
+    cs_2 = True
+    assert not cs_0 and not cs_1
+    cs_2 = False
+
+
+proof([p0, p1, p2_rogue], D, symmetry=[Symmetry([p0, p1], vars=[("cs_0", "cs_1")])])
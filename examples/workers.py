@@ -0,0 +1,35 @@
+import sys
+
+sys.path.insert(0, "../bla")
+
+from bla import proof
+
+# Independent workers, each counting on its own variable.
+# Their steps commute, so with `por=True` only one interleaving is explored.
+domain = {
+    "a": range(0, 4),
+    "b": range(0, 4),
+    "c": range(0, 4),
+    "done": False,
+}
+
+
+def worker_a():
+    while a < 3:
+        a = a + 1
+    done = True
+
+
+def worker_b():
+    while b < 3:
+        b = b + 1
+
+
+def worker_c():
+    while c < 3:
+        c = c + 1
+    # Races with `worker_a`
+    assert not done
+
+
+proof([worker_a, worker_b, worker_c], domain, por=True)
@@ -2,13 +2,15 @@ import glob
 from os import path
 import subprocess
 import argparse
+import os
 
 
-def run_golden_test(script: str, update: bool) -> bool:
+def run_golden_test(script: str, update: bool, cache: str | None = None) -> bool:
     name = path.splitext(path.basename(script))[0]
     print(f"{name}", end="")
+    env = dict(os.environ, BLA_RESULT_CACHE=cache) if cache else None
     result = subprocess.run(
-        ["python", script], capture_output=True, text=True, check=False
+        ["python", script], capture_output=True, text=True, check=False, env=env
     )
     got = result.stdout + result.stderr
     if result.returncode:
@@ -37,19 +39,24 @@ def run_golden_test(script: str, update: bool) -> bool:
     return False
 
 
-def run_golden_tests(update: bool) -> bool:
+def run_golden_tests(update: bool, cache: str | None = None) -> bool:
     subjs = glob.glob("examples/*.py")
     assert subjs, "Can't find any examples/*.py"
     print("Running golden tests:")
-    return all([run_golden_test(subj, update=update) for subj in subjs])
+    return all([run_golden_test(subj, update=update, cache=cache) for subj in subjs])
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--update", action="store_true", help="Update expectations")
+    parser.add_argument(
+        "--cache",
+        metavar="DIR",
+        help="Reuse results of unchanged proofs, see bla.cache",
+    )
     args = parser.parse_args()
 
-    if not run_golden_tests(update=args.update):
+    if not run_golden_tests(update=args.update, cache=args.cache):
         exit(1)
     else:
         exit(0)
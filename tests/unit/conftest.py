@@ -0,0 +1,20 @@
+from bla.memory import make_mem_map
+from bla.parse import parse_program
+from bla.proofer import run_proof
+
+
+def parse(fns, domain):
+    """Programs of `fns` over variables of `domain` and their memory map"""
+    mm = make_mem_map(domain)
+    return [parse_program(fn, mm) for fn in fns], mm
+
+
+def prove(fns, domain, **options):
+    """Explores `fns` with `run_proof(**options)`"""
+    return run_proof(*parse(fns, domain), **options)
+
+
+def observe(fns, domain, **options):
+    """Like `prove`, also returns reported `Stats`"""
+    stats = []
+    return prove(fns, domain, observer=stats.append, **options), stats
@@ -0,0 +1,48 @@
+import pytest
+
+from bla.liveness import HALTS_ASSERT, LivenessFailure
+from bla.memory import Reference
+from bla.proofer import atomic_states, init_state
+from bla.ux import ShortStacktrace, traceback
+from conftest import prove
+
+D = {"x": range(3), "y": False}
+
+
+def spin():
+    with atomic:
+        y = True
+        while True:
+            x = (x + 1) % 3
+
+
+@pytest.mark.parametrize("compiled", [True, False])
+def test_endless_block_is_explored(compiled):
+    ctx = prove([spin], D, compiled=compiled)
+    assert ctx.failure is None
+    # The block never exits, exploration stops at a state inside of it
+    inside = [ctx.codec.decode(k) for k in ctx.parent]
+    inside = [s for s in inside if 0 < s.pos[0] < ctx.n_ops[0]]
+    y = ctx.mm.addr(Reference("y"))
+    assert inside and all(s.val[y] for s in inside)
+
+    # The macro step from the initial state
+    init = ctx.codec.encode(init_state(ctx))
+    (until,) = [s for s in inside if ctx.parent[ctx.codec.encode(s)] == init]
+    states = atomic_states(ctx, init_state(ctx), 0, until)
+    assert states[0] == init_state(ctx) and until not in states
+    # Consecutive ops up to the stored state
+    for cur, nxt in zip(states, states[1:] + [until]):
+        npos, nv, _ = ctx.steps[0](cur.pos[0], cur.val)
+        assert (npos,) == nxt.pos and nv == nxt.val
+
+
+def test_endless_block_is_rendered(capsys):
+    ctx = prove([spin], D, assertions=[HALTS_ASSERT])
+    assert isinstance(ctx.failure.error, LivenessFailure)
+    frames = traceback(ctx)
+    assert {f.state.pos[0] for f in frames} == {0, 1, 2, 3}
+    ShortStacktrace().render(ctx)
+    out = capsys.readouterr().out
+    assert "x = (x + 1) % 3" in out and "x=2;y=True" in out
+    assert "FAIL: doesn't halt" in out
@@ -0,0 +1,74 @@
+import json
+
+import pytest
+
+from bla.batch import BUDGET, ERROR, FAIL, PASS, compare, main, run_model
+
+MODEL = """
+from bla import proof
+
+def count():
+    while n < 7:
+        n = n + 1
+
+def check():
+    assert n {op} 7
+
+proof([count, check], {{"n": range(8)}}{options})
+"""
+
+
+@pytest.fixture(autouse=True)
+def no_budget(monkeypatch):
+    # `run_model` sets it for the rest of the worker process
+    monkeypatch.setenv("BLA_MAX_STATES", "")
+
+
+def model(tmp_path, name="model", op="<=", options=""):
+    path = tmp_path / f"{name}.py"
+    path.write_text(MODEL.format(op=op, options=options))
+    return str(path)
+
+
+def test_pass(tmp_path):
+    res = run_model(model(tmp_path), 0, 0)
+    assert (res.status, res.verdicts) == (PASS, [True])
+    assert res.output == "OK\n"
+
+
+def test_failed_proof(tmp_path):
+    res = run_model(model(tmp_path, op="<"), 0, 0)
+    assert (res.status, res.verdicts) == (FAIL, [False])
+    assert res.message == "1 of 1 proofs failed"
+
+
+def test_golden_expects_failure(tmp_path):
+    res = run_model(model(tmp_path, op="<"), 0, 0)
+    (tmp_path / "model.out").write_text(res.output)
+    assert compare(res, str(tmp_path), False).status == PASS
+
+    res = run_model(model(tmp_path, op="<="), 0, 0)
+    res = compare(res, str(tmp_path), False)
+    assert res.status == FAIL
+    assert "+OK" in res.message
+
+
+def test_max_states(tmp_path):
+    res = run_model(model(tmp_path), 0, 3)
+    assert res.status == BUDGET
+
+
+def test_max_states_with_workers(tmp_path):
+    res = run_model(model(tmp_path, options=", workers=2"), 0, 3)
+    assert res.status == ERROR
+    assert "not enforced with workers" in res.message
+
+
+def test_main(tmp_path):
+    model(tmp_path, "ok")
+    model(tmp_path, "failed", op="<")
+    report = tmp_path / "report.json"
+    assert main([str(tmp_path), "-j", "1", "--json", str(report)]) == 1
+    results = {r["name"]: r for r in json.loads(report.read_text())}
+    assert results["ok"]["status"] == PASS
+    assert results["failed"]["status"] == FAIL
@@ -0,0 +1,46 @@
+from bla import proof
+from bla.cache import ResultCache
+from bla.ux import traceback
+
+D = {"n": range(4)}
+
+
+def count():
+    while n < 3:
+        n = n + 1
+    assert n == 2
+
+
+# Rendered contexts
+CTXS = []
+
+
+class Steps:
+    """Renderer of the number of steps to the failure"""
+
+    def __init__(self, prefix):
+        self.prefix = prefix
+
+    def render(self, ctx):
+        CTXS.append(ctx)
+        print(self.prefix, len(traceback(ctx)))
+
+
+def test_hit_is_rendered(tmp_path, capsys):
+    cache = str(tmp_path)
+    render = Steps("steps:")
+    assert not proof([count], D, render=render, result_cache=cache)
+    assert not proof([count], D, render=render, result_cache=cache)
+    assert len(ResultCache(cache).keys()) == 1
+    first, hit = CTXS[-2:]
+    assert hit.failure.state == first.failure.state
+    assert traceback(hit) == traceback(first)
+    assert capsys.readouterr().out == "steps: 11\nsteps: 11\n"
+
+
+def test_renderer_configuration_is_keyed(tmp_path, capsys):
+    cache = str(tmp_path)
+    proof([count], D, render=Steps("a"), result_cache=cache)
+    proof([count], D, render=Steps("b"), result_cache=cache)
+    assert len(ResultCache(cache).keys()) == 2
+    assert capsys.readouterr().out == "a 11\nb 11\n"
@@ -0,0 +1,58 @@
+from itertools import product
+
+from bla.codec import StateCodec
+from bla.core import State
+from bla.memory import make_mem_map
+from bla.parse import parse_program
+
+D = {"x": range(3), "b": False, "c": [0, 5, 9]}
+
+
+def p0():
+    x = 1
+    b = True
+
+
+def p1():
+    while b:
+        c = 9
+
+
+def codec():
+    mm = make_mem_map(D)
+    progs = [parse_program(fn, mm) for fn in [p0, p1]]
+    return StateCodec(progs, mm), progs
+
+
+def states(progs):
+    positions = product(*(range(len(p.ops) + 1) for p in progs))
+    memories = list(product(range(3), [False, True], [0, 5, 9]))
+    return [State(pos, val) for pos in positions for val in memories]
+
+
+def test_round_trip():
+    c, progs = codec()
+    all_states = states(progs)
+    keys = [c.encode(st) for st in all_states]
+    assert [c.decode(k) for k in keys] == all_states
+    # Dense: every key below `size` is a state
+    assert sorted(keys) == list(range(c.size))
+
+
+def test_parts():
+    c, progs = codec()
+    st = State((2, 1), (2, True, 5))
+    key = c.encode(st)
+    pos_code, mem_code = c.unpack(key)
+    assert c.pack(pos_code, mem_code) == key
+    assert c.unpack_pos(pos_code) == st.pos
+    assert c.decode_mem(mem_code) == st.val
+    assert c.encode_mem(st.val) == mem_code
+
+
+def test_pos_weight():
+    # A step of a program changes only its digit, see `proofer._step`
+    c, _ = codec()
+    st = State((1, 0), (0, False, 0))
+    nxt = State((1, 2), (0, False, 0))
+    assert c.encode(nxt) == c.encode(st) + 2 * c.pos_weight(1)
@@ -0,0 +1,100 @@
+import asyncio
+import time
+
+import pytest
+
+from bla.explore import Limits, explore_async, exploration
+
+D = {"x": range(32), "y": range(32)}
+
+
+def inc_x():
+    while True:
+        x = (x + 1) % 32
+
+
+def inc_y():
+    while True:
+        y = (y + 1) % 32
+
+
+def check():
+    assert x != 31 or y != 31
+
+
+# Values of `x` and `y`, with 3 positions in each loop
+UNIQUE = 32 * 32 * 3 * 3
+
+
+def test_complete():
+    cov = exploration([inc_x, inc_y], D).run()
+    assert cov.ok and cov.complete and cov.stopped is None
+    assert cov.unique == UNIQUE
+
+
+def test_failure():
+    cov = exploration([inc_x, inc_y, check], D).run()
+    assert cov.ok is False and cov.done
+    assert cov.failure is not None
+
+
+def test_max_states_within_a_step():
+    # The limit is checked after every expanded state, not every `every`
+    ex = exploration([inc_x, inc_y], D, Limits(max_states=100), every=10**6)
+    cov = ex.run()
+    assert cov.stopped == "max_states" and cov.ok is None
+    assert 100 <= cov.unique < 100 + 2  # plus successors of the last state
+
+
+def test_resume():
+    ex = exploration([inc_x, inc_y], D, Limits(max_states=100))
+    first = ex.run()
+    assert first.stopped == "max_states"
+    # Stays stopped until the limit is raised
+    assert ex.run().expanded == first.expanded
+    ex.limits.max_states = None
+    cov = ex.run()
+    assert cov.ok and cov.unique == UNIQUE
+    assert cov.expanded == exploration([inc_x, inc_y], D).run().expanded
+
+
+def test_max_depth():
+    cov = exploration([inc_x, inc_y], D, Limits(max_depth=3)).run()
+    assert cov.stopped == "max_depth" and cov.depth == 3
+    # States at most 3 steps away, as sequences of steps of the 2 programs
+    assert cov.unique == 10
+
+
+def test_deadline():
+    cov = exploration([inc_x, inc_y], D, Limits(deadline=time.monotonic())).run()
+    assert cov.stopped == "deadline" and cov.expanded == 0
+
+
+def test_max_memory():
+    ex = exploration([inc_x, inc_y], D, Limits(max_memory=10_000), every=10**6)
+    cov = ex.run()
+    assert cov.stopped == "max_memory" and not cov.done
+    assert cov.unique < UNIQUE
+
+
+def test_cancel():
+    ex = exploration([inc_x, inc_y], D, every=10)
+    cov = next(iter(ex))
+    ex.cancel()
+    assert ex.run().expanded == cov.expanded
+    assert ex.coverage().stopped == "cancelled"
+
+
+def test_async_cancel():
+    ex = exploration([inc_x, inc_y], D, every=1)
+
+    async def main():
+        task = asyncio.create_task(explore_async(ex))
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+    cov = ex.coverage()
+    assert cov.stopped == "cancelled" and not cov.done
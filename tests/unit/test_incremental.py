@@ -0,0 +1,51 @@
+from bla.ux import traceback
+from conftest import observe
+
+D = {"n": range(8), "done": False}
+
+
+def count():
+    while n < 7:
+        n = n + 1
+    done = True
+
+
+def check():
+    assert not done or n == 6
+
+
+def check_fixed():
+    assert not done or n == 7
+
+
+def test_unchanged_model_isnt_explored(tmp_path):
+    ctx, stats = observe([count, check], D, cache_dir=str(tmp_path))
+    assert stats and ctx.failure is not None
+    expected = traceback(ctx)
+
+    ctx, stats = observe([count, check], D, cache_dir=str(tmp_path))
+    assert not stats  # restored
+    assert ctx.failure is not None
+    assert traceback(ctx) == expected
+
+    # Other options explore again
+    ctx, stats = observe([count, check], D, cache_dir=str(tmp_path), search="dfs")
+    assert stats and ctx.failure is not None
+
+
+def test_changed_program(tmp_path):
+    observe([count, check], D, cache_dir=str(tmp_path))
+    ctx, stats = observe([count, check_fixed], D, cache_dir=str(tmp_path))
+    assert stats and ctx.failure is None
+    # Transitions of `count` are reused, `check_fixed` runs
+    assert stats[-1].transitions[0] == 0
+    assert stats[-1].transitions[1] > 0
+
+
+def test_upgraded_bla(tmp_path, monkeypatch):
+    observe([count, check], D, cache_dir=str(tmp_path))
+    monkeypatch.setattr("bla.incremental.bla_version", lambda: "upgraded")
+    ctx, stats = observe([count, check], D, cache_dir=str(tmp_path))
+    # Neither the outcome nor transitions of another version are used
+    assert stats and ctx.failure is not None
+    assert all(t > 0 for t in stats[-1].transitions)
@@ -0,0 +1,52 @@
+from bla.lineprof import Profiler
+from bla.liveness import Eventually
+from bla.proofer import run_proof
+from conftest import parse
+
+D = {"x": False, "n": range(4)}
+
+
+def count():
+    while n < 3:
+        n = n + 1
+
+
+def flip():
+    x = True
+
+
+def profile(**options):
+    stats = []
+    progs, mm = parse([count, flip], D)
+    profiler = Profiler(progs)
+    ctx = run_proof(progs, mm, profiler=profiler, observer=stats.append, **options)
+    assert ctx.failure is None
+    return profiler, stats[-1]
+
+
+def totals(profiler):
+    return [
+        [sum(row) for row in table]
+        for table in (profiler.count, profiler.new, profiler.dup)
+    ]
+
+
+def test_counts():
+    profiler, last = profile()
+    count, new, dup = totals(profiler)
+    assert count == last.transitions
+    # Every state but the initial one is new once
+    assert sum(new) == last.unique - 1
+
+
+def test_search_engines_agree():
+    expected = totals(profile()[0])
+    assert totals(profile(search="dfs")[0]) == expected
+    assert totals(profile(storage="disk")[0])[0] == expected[0]
+
+
+def test_liveness_counts_the_exploration_once():
+    expected = totals(profile()[0])
+    # `x` is reached on the way, states are explored with two masks
+    profiler, _ = profile(assertions=[Eventually("x")], fair=True)
+    assert totals(profiler) == expected
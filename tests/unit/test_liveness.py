@@ -0,0 +1,65 @@
+import pytest
+
+from bla.liveness import HALTS_ASSERT, Eventually, LivenessFailure
+from bla.ux import traceback
+from conftest import observe, prove
+
+D = {"x": False, "y": False, "n": range(4)}
+
+
+def count():
+    while n < 3:
+        n = n + 1
+
+
+def flip():
+    x = True
+    y = True
+
+
+def test_single_exploration():
+    _, stats = observe([count, flip], D)
+    ops = stats[-1].transitions
+
+    ctx, stats = observe([count, flip], D, assertions=[HALTS_ASSERT])
+    assert ctx.failure is None
+    # Every transition is taken once, along with asserts
+    assert stats[-1].transitions == ops
+
+
+def late():
+    x = True
+    n = 1
+    assert n == 0
+
+
+def test_asserts_after_goal():
+    ctx = prove([late], D, assertions=[Eventually("x")])
+    assert ctx.failure is not None
+    assert not isinstance(ctx.failure.error, LivenessFailure)
+    assert str(ctx.failure.error) == "assert n == 0"
+    assert len(traceback(ctx)) == 3
+
+
+def toggle():
+    while True:
+        x = not x
+
+
+def test_properties_at_once():
+    ctx = prove([toggle], D, assertions=[Eventually("x"), Eventually("y")])
+    assert isinstance(ctx.failure.error, LivenessFailure)
+    assert str(ctx.failure.error) == "never y"
+    # The prefix doesn't repeat states, see `_simple`
+    keys = [k for k, _ in ctx.lasso]
+    assert len(set(keys)) == len(keys)
+    assert ctx.loop == 0  # loops from the initial state
+
+    ctx = prove([count], D, assertions=[HALTS_ASSERT, Eventually("n == 3")])
+    assert ctx.failure is None
+
+
+def test_unsupported_options():
+    for options in [dict(workers=2), dict(por=True), dict(storage="disk")]:
+        with pytest.raises(AssertionError):
+            prove([count], D, assertions=[HALTS_ASSERT], **options)
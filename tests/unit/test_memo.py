@@ -0,0 +1,51 @@
+import copy
+
+from bla.memo import _worth, memoize
+from bla.memory import make_mem_map
+from bla.parse import parse_program
+
+D = {"x": range(3), "y": range(3), "z": False}
+
+
+def prog():
+    while z:
+        x = y
+    x = (y + 1) % 3
+    z = x == 2
+    assert x != 2
+
+
+def memoized():
+    mm = make_mem_map(D)
+    p = parse_program(prog, mm)
+    return p, memoize(p, p.run, len(mm.init()), maxsize=16)
+
+
+def test_unread_variables_share_entry():
+    p, step = memoized()
+    # `x = (y + 1) % 3` only reads y
+    for m in [(0, 1, False), (2, 1, True)]:
+        assert step(3, m) == p.run(3, m)
+    info = step.cache_info()
+    assert info.currsize == 1 and info.hits == 1
+
+
+def test_read_variables_distinguish_entries():
+    p, step = memoized()
+    for m in [(0, 1, False), (0, 2, False)]:
+        assert step(3, m) == p.run(3, m)
+    info = step.cache_info()
+    assert info.currsize == 2 and info.hits == 0
+
+
+def test_worth():
+    p, step = memoized()
+    # Cond on a variable, copy of a variable, goto, then evaluated expressions
+    assert [_worth(op) for op in p.ops] == [False, False, False, True, True, True]
+    unknown = copy.copy(p.ops[3])
+    unknown.reads = None
+    assert not _worth(unknown)
+
+    for pos in range(3):
+        assert step(pos, (0, 1, True)) == p.run(pos, (0, 1, True))
+    assert step.cache_info().currsize == 0
@@ -0,0 +1,88 @@
+"""
+Every engine and optimization finds the same verdict, at the same failing op,
+on the proofs of `examples/`
+"""
+import contextlib
+import glob
+import io
+import os
+import runpy
+
+import pytest
+
+import bla
+from bla.proofer import failure_site
+from conftest import prove
+
+EXAMPLES = os.path.join(os.path.dirname(__file__), "..", "..", "examples")
+
+
+def calls():
+    """Arguments of `proof` calls of the examples"""
+    res = []
+
+    def record(fns, domain, **options):
+        res.append((fns, domain, options))
+        return True
+
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(bla, "proof", record)
+        for path in sorted(glob.glob(os.path.join(EXAMPLES, "*.py"))):
+            n = len(res)
+            with contextlib.redirect_stdout(io.StringIO()):
+                runpy.run_path(path)
+            name = os.path.splitext(os.path.basename(path))[0]
+            res[n:] = [
+                pytest.param(*call, id=f"{name}-{i}") for i, call in enumerate(res[n:])
+            ]
+    return res
+
+
+def exact(options):
+    return not options.get("assertions") and options.get("failures", 1) == 1
+
+
+def reducible(options):
+    return exact(options) and not options.get("por") and not options.get("symmetry")
+
+
+# Options of `run_proof`, whether they apply to options of a call and whether
+# states are explored in the same order (so the same failure is found first)
+MODES = {
+    "interpreted": (dict(compiled=False), lambda o: True, True),
+    "tables": (dict(tables=64), lambda o: True, True),
+    "memo": (dict(memo=1000), lambda o: True, True),
+    "disk": (dict(storage="disk"), exact, True),
+    "workers": (dict(workers=2), lambda o: exact(o) and not o.get("por"), True),
+    "por": (dict(por=True), lambda o: exact(o) and not o.get("symmetry"), False),
+    "no-symmetry": (dict(symmetry=None), exact, False),
+    "dfs": (dict(search="dfs"), exact, False),
+    "bitstate": (dict(mode="bitstate"), exact, False),
+    "hashcompact": (dict(mode="hashcompact"), exact, False),
+    "vectorized": (dict(vectorized=True), reducible, False),
+}
+
+
+def sites_of(fns, domain, options):
+    """Sites of failures, see `failure_site`"""
+    ctx = prove(fns, domain, **options)
+    return [failure_site(ctx, f) for f in ctx.failures or [ctx.failure] if f]
+
+
+@pytest.mark.parametrize("fns, domain, options", calls())
+def test_modes_agree(fns, domain, options):
+    expected = sites_of(fns, domain, options)
+    # Any of them may be found first in another order
+    sites = expected
+    if expected and exact(options):
+        full = {**options, "symmetry": None, "por": False, "failures": 0}
+        sites = sites_of(fns, domain, full)
+    for name, (mode, applies, same_order) in MODES.items():
+        if not applies(options):
+            continue
+        got = sites_of(fns, domain, {**options, **mode})
+        if same_order:
+            assert got == expected, name
+        else:
+            assert bool(got) == bool(expected), name
+            assert set(got) <= set(sites), name
@@ -0,0 +1,52 @@
+import os
+
+import pytest
+
+from bla import parallel
+from conftest import observe, prove
+
+D = {"x": range(3), "y": range(3)}
+
+
+def divide():
+    while True:
+        x = 1 // y
+        y = (y + 1) % 3
+
+
+def unset():
+    y = 2
+
+
+def count():
+    while x < 2:
+        x = x + 1
+
+
+def test_error_is_reraised():
+    with pytest.raises(ZeroDivisionError):
+        prove([divide, unset], D, workers=1)
+    with pytest.raises(ZeroDivisionError) as e:
+        prove([divide, unset], D, workers=2)
+    assert "Raised in worker" in e.value.__notes__[0]
+
+
+def test_dead_worker(monkeypatch):
+    def level(self):
+        os._exit(3)
+
+    monkeypatch.setattr(parallel, "_POLL", 0.1)
+    monkeypatch.setattr(parallel._Worker, "level", level)
+    with pytest.raises(RuntimeError, match="exited with code 3"):
+        prove([divide, unset], D, workers=2)
+
+
+def test_progress_is_reported():
+    ctx, stats = observe([count, unset], D, workers=1)
+    pctx, pstats = observe([count, unset], D, workers=2)
+    assert ctx.failure is None and pctx.failure is None
+    last, plast = stats[-1], pstats[-1]
+    assert plast.done and plast.queue == 0
+    assert plast.unique == last.unique == len(ctx.parent)
+    assert plast.expanded == last.expanded
+    assert plast.transitions == last.transitions
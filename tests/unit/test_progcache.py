@@ -0,0 +1,105 @@
+import importlib.util
+import os
+import time
+
+import pytest
+
+import bla.progcache
+from bla.core import FailedAssert
+from bla.memory import make_mem_map
+from bla.parse import parse_program
+from bla.progcache import ProgramCache, main
+
+SRC = """
+def prog():
+    while x < {n}:
+        x = x + 1
+        assert x != y, "met"
+    with atomic:
+        y = (x, y)[0]
+"""
+
+D = {"x": range(8), "y": range(8)}
+
+
+def module(tmp_path, n=7):
+    path = tmp_path / "model.py"
+    path.write_text(SRC.format(n=n))
+    spec = importlib.util.spec_from_file_location("model", path)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod.prog
+
+
+def outcomes(prog):
+    res = []
+    for pc in range(len(prog.ops)):
+        for m in [(x, y) for x in range(8) for y in range(8)]:
+            try:
+                res.append(prog.run(pc, m))
+            except FailedAssert as e:
+                res.append(str(e))
+    return res
+
+
+def no_parse(monkeypatch):
+    def fail(*args):
+        raise AssertionError("Parsed again")
+
+    monkeypatch.setattr(bla.progcache, "parse_program", fail)
+
+
+def test_round_trip(tmp_path, monkeypatch):
+    fn, mm = module(tmp_path), make_mem_map(D)
+    cache = ProgramCache(str(tmp_path / "cache"))
+    parsed = cache.program(fn, mm)
+    no_parse(monkeypatch)
+    loaded = cache.program(fn, mm)
+    assert loaded is not parsed
+    assert loaded.labels == parsed.labels and loaded.atomic == parsed.atomic
+    assert [loaded.render_op(i) for i in range(len(loaded.ops))] == [
+        parsed.render_op(i) for i in range(len(parsed.ops))
+    ]
+    assert outcomes(loaded) == outcomes(parse_program(fn, mm))
+
+
+def test_edited_source(tmp_path):
+    mm = make_mem_map(D)
+    cache = ProgramCache(str(tmp_path / "cache"))
+    cache.program(module(tmp_path, 7), mm)
+    # Same size and, possibly, modification time: only the contents differ
+    prog = cache.program(module(tmp_path, 5), mm)
+    assert outcomes(prog) == outcomes(parse_program(module(tmp_path, 5), mm))
+    assert len(cache.entries()) == 2
+
+
+def test_evict(tmp_path, capsys):
+    directory = str(tmp_path / "cache")
+    cache = ProgramCache(directory)
+    cache.program(module(tmp_path), make_mem_map(D))
+    [path] = cache.entries()
+    old = time.time() - 3 * 86400
+    os.utime(path, (old, old))
+
+    assert main(["--dir", directory, "evict", "--older-than", "4"]) == 0
+    assert cache.entries() == [path]
+    assert main(["--dir", directory, "evict", "--older-than", "2"]) == 0
+    assert cache.entries() == []
+    assert capsys.readouterr().out == "Evicted 0 entries\nEvicted 1 entries\n"
+
+
+def test_used_entries_are_kept(tmp_path):
+    fn, mm = module(tmp_path), make_mem_map(D)
+    cache = ProgramCache(str(tmp_path / "cache"))
+    cache.program(fn, mm)
+    [path] = cache.entries()
+    old = time.time() - 3 * 86400
+    os.utime(path, (old, old))
+    cache.program(fn, mm)
+    assert cache.evict(2 * 86400) == 0
+
+
+def test_cli_requires_directory(monkeypatch):
+    monkeypatch.delenv("BLA_PROGRAM_CACHE", raising=False)
+    with pytest.raises(SystemExit):
+        main(["list"])
@@ -0,0 +1,108 @@
+import pytest
+
+from bla import ops
+from bla.memory import Reference, make_mem_map
+from bla.parse import parse_program
+from bla.ranges import LIMIT, Interval, in_domain, report, values
+from conftest import prove
+
+# More combinations of `x` and `y` than `LIMIT`, evaluated abstractly
+D = {"x": range(40), "y": range(40), "b": False}
+assert 40 * 40 > LIMIT
+
+
+def movs(fn, domain=D):
+    mm = make_mem_map(domain)
+    prog = parse_program(fn, mm)
+    return mm, [op for op in prog.ops if isinstance(op, ops.Mov)]
+
+
+def wrap():
+    x = (x + 1) % 40
+
+
+def test_values_exact():
+    mm, [op] = movs(wrap)
+    assert values(op.expr, mm) == frozenset(range(40))
+    assert not op.checked
+
+
+def add():
+    x = x + y
+
+
+def test_values_interval():
+    mm, [op] = movs(add)
+    assert values(op.expr, mm) == Interval(0, 78)
+    assert op.checked
+
+
+def subscript():
+    x = [x, y][0] + 1
+
+
+def test_values_unknown():
+    mm, [op] = movs(subscript)
+    assert values(op.expr, mm) is None
+    assert not in_domain(mm, Reference("x"), op.expr)
+    assert op.checked
+
+
+def overflow():
+    while True:
+        x = [x, y][0] + 1
+
+
+@pytest.mark.parametrize("compiled", [True, False])
+def test_unknown_values_are_validated(compiled):
+    ctx = prove([overflow], D, compiled=compiled)
+    assert ctx.failure is not None
+    assert str(ctx.failure.error) == "Invalid value 40"
+
+
+def inc():
+    x = x + 1
+
+
+def test_unknown_out_of_limit():
+    mm, [op] = movs(inc, {"x": range(2 * LIMIT)})
+    assert op.checked
+    [finding] = report([parse_program(inc, mm)])
+    assert finding.values is None
+
+
+def tpl():
+    x, b = (x + y) // 2, [x][0]
+
+
+def test_tuples():
+    mm, [op] = movs(tpl)
+    assert op.tpl and op.checked
+    x, b = values(op.expr, mm)
+    assert x == frozenset(range(40))
+    assert b is None
+
+
+def swap():
+    x, y = y, x
+
+
+def test_tuples_in_domain():
+    mm, [op] = movs(swap)
+    assert not op.checked
+    assert in_domain(mm, (Reference("x"), Reference("y")), op.expr)
+
+
+def several():
+    x = x + 1
+    y = [x, y][0]
+    x = 0
+
+
+def test_report():
+    mm, _ = movs(several)
+    findings = report([parse_program(several, mm)])
+    assert [(f.target, f.values) for f in findings] == [
+        ("x", frozenset([40])),
+        ("y", None),
+    ]
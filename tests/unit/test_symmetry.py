@@ -0,0 +1,82 @@
+import itertools
+
+from bla import Symmetry, array, instances
+from bla.core import State
+from bla.memory import make_mem_map
+from bla.parse import parse_program
+from bla.proofer import run_proof
+from bla.symmetry import Canonizer
+
+# Peterson's algorithm, `turn` holds a process id
+D = {"flag_0": False, "flag_1": False, "turn": [0, 1], "cs": range(3)}
+
+
+def p0():
+    while True:
+        flag_0 = True
+        turn = 1
+        while flag_1 and turn == 1:
+            pass
+        cs = cs + 1
+        assert cs == 1
+        cs = cs - 1
+        flag_0 = False
+
+
+def p1():
+    while True:
+        flag_1 = True
+        turn = 0
+        while flag_0 and turn == 0:
+            pass
+        cs = cs + 1
+        assert cs == 1
+        cs = cs - 1
+        flag_1 = False
+
+
+SYM = Symmetry([p0, p1], vars=[("flag_0", "flag_1")], ids={"turn": [0, 1]})
+
+
+def states(progs, mm, **options):
+    ctx = run_proof(progs, mm, **options)
+    assert ctx.failure is None
+    return ctx, [ctx.codec.decode(k) for k in ctx.parent]
+
+
+def test_canonical_is_invariant():
+    mm = make_mem_map(D)
+    progs = [parse_program(fn, mm) for fn in (p0, p1)]
+    ctx, reachable = states(progs, mm)
+    canonizer = Canonizer([SYM], progs, mm, ctx.codec)
+    [g] = canonizer._groups
+
+    orbits = set()
+    for state in reachable:
+        canonical, _ = canonizer.canonical(state)
+        for p in itertools.permutations(range(2)):
+            pos, mem = g.apply(p, list(state.pos), list(state.val))
+            assert canonizer.canonical(State(tuple(pos), tuple(mem)))[0] == canonical
+        orbits.add(canonical)
+
+    # Explores one state per orbit
+    _, reduced = states(progs, mm, symmetry=[SYM])
+    assert len(reduced) == len(orbits) < len(reachable)
+
+
+def worker(i):
+    x[i] = (x[i] + 1) % 3
+
+
+def test_sorting_tries_one_permutation():
+    n = 8
+    mm = make_mem_map(array("x", n, range(3)))
+    progs = [parse_program(inst, mm) for inst in instances(worker, n)]
+    sym = Symmetry([p.name for p in progs], vars=[tuple(f"x[{i}]" for i in range(n))])
+    ctx = run_proof(progs, mm)
+    [g] = Canonizer([sym], progs, mm, ctx.codec)._groups
+
+    pos, mem = [1, 0, 1, 1, 0, 0, 1, 0], [2, 0, 1, 0, 2, 1, 0, 0]
+    [perm] = g.perms(pos, mem)
+    npos, nmem = g.apply(perm, pos, mem)
+    assert sorted(zip(npos, nmem)) == list(zip(npos, nmem))
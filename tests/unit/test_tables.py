@@ -0,0 +1,52 @@
+from bla.compile import compile_prog
+from bla.core import FailedAssert
+from bla.memory import make_mem_map
+from bla.parse import parse_program
+from bla.tables import tables_of
+
+D = {"x": range(8), "y": range(8)}
+
+
+def prog():
+    while x < 7:
+        x = x + 1
+        assert x != y
+
+
+def steps(fn):
+    mm = make_mem_map(D)
+    p = parse_program(fn, mm)
+    tables = tables_of(p, mm, 64)
+    return p, compile_prog(p), compile_prog(p, tables)
+
+
+def outcome(step, pc, m):
+    try:
+        return step(pc, m)
+    except FailedAssert as e:
+        return str(e)
+
+
+def test_lookups_inlined():
+    p, _, step = steps(prog)
+    src = step.__bla_source__
+    # The loop condition, the assignment and the assertion
+    assert src.count(".get(") == 3
+
+
+def test_same_outcomes():
+    p, plain, step = steps(prog)
+    for pc in range(len(p.ops)):
+        for m in [(x, y) for x in range(8) for y in range(8)]:
+            assert outcome(step, pc, m) == outcome(plain, pc, m)
+
+
+def test_persisted_per_version(tmp_path, monkeypatch):
+    mm = make_mem_map(D)
+    p = parse_program(prog, mm)
+    tables_of(p, mm, 64, str(tmp_path))
+    [path] = list(tmp_path.iterdir())
+    monkeypatch.setattr("bla.incremental.bla_version", lambda: "upgraded")
+    tables_of(p, mm, 64, str(tmp_path))
+    # Built again, not looked up in tables of another version
+    assert len(list(tmp_path.iterdir())) == 2
@@ -0,0 +1,105 @@
+from itertools import product
+import gc
+import weakref
+
+import pytest
+
+from bla.core import FailedAssert
+from bla.memory import make_mem_map
+from bla.parse import parse_program
+from bla.template import array, instances, template
+from conftest import prove
+
+D = {**array("flag", 2, False), "turn": [0, 1], "cs_used": False}
+
+
+def p(i):
+    flag[i] = True
+    turn = 1 - i
+    while flag[1 - i] and turn == 1 - i:
+        pass
+    assert not cs_used
+    cs_used = True
+    cs_used = False
+    flag[i] = False
+
+
+def p0():
+    flag[0] = True
+    turn = 1
+    while flag[1] and turn == 1:
+        pass
+    assert not cs_used
+    cs_used = True
+    cs_used = False
+    flag[0] = False
+
+
+def p1():
+    flag[1] = True
+    turn = 0
+    while flag[0] and turn == 0:
+        pass
+    assert not cs_used
+    cs_used = True
+    cs_used = False
+    flag[1] = False
+
+
+def no_turn(i):
+    flag[i] = True
+    while flag[1 - i]:
+        pass
+    assert not cs_used
+    cs_used = True
+    cs_used = False
+    flag[i] = False
+
+
+def outcomes(prog):
+    res = []
+    for pc in range(len(prog.ops)):
+        for m in product([False, True], [False, True], [0, 1], [False, True]):
+            try:
+                res.append(prog.run(pc, m))
+            except FailedAssert as e:
+                res.append(str(e))
+    return res
+
+
+def test_instances_as_functions():
+    mm = make_mem_map(D)
+    for inst, fn in zip(instances(p, 2), [p0, p1]):
+        prog, expected = parse_program(inst, mm), parse_program(fn, mm)
+        assert prog.name == f"p({inst.args[0]})"
+        assert prog.labels == expected.labels
+        assert outcomes(prog) == outcomes(expected)
+
+
+def test_parsed_once():
+    mm = make_mem_map(D)
+    a, b = [parse_program(inst, mm) for inst in instances(p, 2)]
+    assert template(p) is template(p)
+    # Instances share compiled expressions
+    assert a.ops[2].pred._code is b.ops[2].pred._code
+
+
+def test_freed_with_function():
+    def fn(i):
+        pass
+
+    t = weakref.ref(template(fn))
+    del fn
+    gc.collect()
+    assert t() is None
+
+
+def test_proof():
+    assert prove(instances(p, 2), D).failure is None
+    ctx = prove(instances(no_turn, 2), D)
+    assert ctx.failure is None  # deadlocks, but never both in the section
+
+
+def test_arguments_are_checked():
+    with pytest.raises(AssertionError, match="Expected 1 arguments"):
+        template(p)(0, 1)
@@ -0,0 +1,39 @@
+import pytest
+
+from conftest import observe, prove
+
+D = {"x": range(16), "y": range(16)}
+
+
+def inc_x():
+    while True:
+        x = (x + 3) % 16
+
+
+def inc_y():
+    while True:
+        y = (y + x) % 16
+
+
+def check():
+    assert x != 7 or y != 15
+
+
+def test_same_states_as_scalar():
+    ctx, stats = observe([inc_x, inc_y], D)
+    vctx, vstats = observe([inc_x, inc_y], D, vectorized=True)
+    assert ctx.failure is None and vctx.failure is None
+    assert vstats[-1].unique == stats[-1].unique == len(ctx.parent)
+    assert vstats[-1].expanded == stats[-1].expanded
+
+
+def test_failure_as_scalar():
+    ctx = prove([inc_x, inc_y, check], D)
+    vctx = prove([inc_x, inc_y, check], D, vectorized=True)
+    assert vctx.failure is not None
+    assert vctx.failure.state == ctx.failure.state
+
+
+def test_unsupported_options():
+    with pytest.raises(AssertionError, match="Partial-order"):
+        prove([inc_x, inc_y], D, vectorized=True, por=True)
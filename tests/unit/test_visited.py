@@ -0,0 +1,49 @@
+import pytest
+
+from bla.visited import BitState, HashCompact, KeyMap, PackedMap, PackedSet
+
+
+def test_packed_set():
+    s = PackedSet(capacity=4)
+    keys = [0, 1, 1 << 40, (1 << 64) - 2] + list(range(100, 200))
+    assert all(s.add(k) for k in keys)
+    assert not any(s.add(k) for k in keys)
+    assert len(s) == len(keys)
+    assert all(k in s for k in keys) and 2 not in s
+
+
+@pytest.mark.parametrize("cls", [PackedMap, KeyMap])
+def test_packed_map(cls):
+    m = cls()
+    keys = [0, 1, 1 << 40, (1 << 64) - 2] + list(range(100, 10_000))
+    assert m.add(keys[0], None)
+    assert all(m.add(k, p) for p, k in zip(keys, keys[1:]))
+    assert not m.add(1, 5) and m[1] == 0
+    assert len(m) == len(keys) and sorted(m) == sorted(keys)
+    assert m[0] is None and m[(1 << 64) - 2] == 1 << 40
+    m[0] = 7
+    assert m.get(0) == 7 and m.get(2) is None and 2 not in m
+    with pytest.raises(KeyError):
+        m[2]
+    assert m.nbytes() > 0
+
+
+def test_bitstate():
+    s = BitState(bits=16)
+    assert s.add(7) and 7 in s
+    assert not s.add(7)
+    assert 8 not in s
+
+
+def test_bitstate_size_is_capped():
+    with pytest.raises(
+        AssertionError, match="2\\*\\*64, expected 2\\*\\*3 to 2\\*\\*40"
+    ):
+        BitState(bits=64)
+
+
+def test_hash_compact():
+    for size in [1 << 10, 1 << 80]:
+        s = HashCompact(size)
+        assert s.add(5) and 5 in s and not s.add(5)
+        assert 6 not in s